@@ -0,0 +1,163 @@
+"""HTTP endpoints served alongside the Reflex app."""
+
+import asyncio
+import functools
+import hmac
+import os
+import queue
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.evals.runner import (
+    DEFAULT_CONCURRENCY,
+    BatchRunner,
+    parse_dataset,
+)
+from app.llm.providers import ProviderError
+from app.store.export import EXPORT_FORMATS, export_runs, parquet_available
+from app.store.ingest import INGEST_BATCH_SIZE, PARSERS, LineSplitter, ingest
+from app.store.run_store import get_run_store
+
+EXPORT_FILTERS = ("search", "model", "status", "tag")
+IMPORT_QUEUE_SIZE = 64
+# Bearer token for the endpoints that write runs or spend model calls. They
+# are disabled while it is unset.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+MAX_CONCURRENCY = int(os.environ.get("MAX_EXPERIMENT_CONCURRENCY", "32"))
+
+_experiments: set[asyncio.Task] = set()
+
+
+def admin_only(endpoint):
+    @functools.wraps(endpoint)
+    async def guarded(request: Request):
+        if not ADMIN_TOKEN:
+            return PlainTextResponse("set ADMIN_TOKEN to enable", status_code=403)
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            token.encode(), ADMIN_TOKEN.encode()
+        ):
+            return PlainTextResponse("admin token required", status_code=401)
+        return await endpoint(request)
+
+    return guarded
+
+
+async def export(request: Request):
+    params = request.query_params
+    format = params.get("format", "jsonl")
+    if format not in EXPORT_FORMATS:
+        return PlainTextResponse(f"unknown export format: {format}", status_code=400)
+    if format == "parquet" and not parquet_available():
+        return PlainTextResponse("parquet export requires pyarrow", status_code=501)
+    filters = {name: params.get(name) or None for name in EXPORT_FILTERS}
+    transcripts = params.get("transcripts", "") in ("1", "true")
+    spec = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_runs(get_run_store(), format, transcripts, **filters),
+        media_type=spec.media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="evaluation_runs.{spec.extension}"'
+            )
+        },
+    )
+
+
+def _drain(lines: queue.Queue):
+    while (chunk := lines.get()) is not None:
+        yield from chunk
+
+
+def _put(lines: queue.Queue, chunk, worker: asyncio.Future):
+    while not worker.done():
+        try:
+            lines.put(chunk, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+@admin_only
+async def import_runs(request: Request):
+    """Stream a JSONL or CSV request body into the store.
+
+    The body is split into lines as it arrives and handed to a worker
+    thread through a bounded queue, so uploads of any size are ingested
+    with constant memory.
+    """
+    params = request.query_params
+    content_type = request.headers.get("content-type", "")
+    format = params.get("format") or ("csv" if "csv" in content_type else "jsonl")
+    if format not in PARSERS:
+        return PlainTextResponse(f"unknown import format: {format}", status_code=400)
+    try:
+        batch_size = int(params.get("batch_size", INGEST_BATCH_SIZE))
+    except ValueError:
+        return PlainTextResponse("batch_size must be an integer", status_code=400)
+    lines = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+    worker = loop.run_in_executor(
+        None, ingest, get_run_store(), _drain(lines), format, max(batch_size, 1)
+    )
+    splitter = LineSplitter()
+    try:
+        async for chunk in request.stream():
+            if worker.done():
+                break
+            if chunk_lines := splitter.feed(chunk):
+                await asyncio.to_thread(_put, lines, chunk_lines, worker)
+        await asyncio.to_thread(_put, lines, splitter.close(), worker)
+    finally:
+        # Always end the stream, even if the client disconnects mid-upload,
+        # so the worker flushes what it has and returns.
+        await asyncio.to_thread(_put, lines, None, worker)
+    report = await worker
+    return JSONResponse(report.to_dict())
+
+
+@admin_only
+async def start_experiment(request: Request):
+    """Run a JSONL dataset against ``models`` in this worker's event loop.
+
+    Returns as soon as the experiment is scheduled; its progress is saved to
+    the store and pushed to open dashboards while it runs. ``concurrency``
+    is capped at ``MAX_CONCURRENCY``.
+    """
+    params = request.query_params
+    models = [m.strip() for m in params.get("models", "").split(",") if m.strip()]
+    if not models:
+        return PlainTextResponse("models is required", status_code=400)
+    try:
+        concurrency = int(params.get("concurrency", DEFAULT_CONCURRENCY))
+    except ValueError:
+        return PlainTextResponse("concurrency must be an integer", status_code=400)
+    if concurrency < 1:
+        return PlainTextResponse("concurrency must be positive", status_code=400)
+    try:
+        dataset = parse_dataset((await request.body()).decode().splitlines())
+        runner = BatchRunner(
+            dataset,
+            models,
+            experiment_id=params.get("experiment") or None,
+            concurrency=min(concurrency, MAX_CONCURRENCY),
+            dataset_name=params.get("dataset", ""),
+        )
+    except (ValueError, ProviderError) as e:
+        return PlainTextResponse(str(e), status_code=400)
+    task = asyncio.create_task(runner.run())
+    _experiments.add(task)
+    task.add_done_callback(_experiments.discard)
+    return JSONResponse(runner.experiment.dict(), status_code=202)
+
+
+api = Starlette(
+    routes=[
+        Route("/api/runs/export", export),
+        Route("/api/runs/import", import_runs, methods=["POST"]),
+        Route("/api/experiments", start_experiment, methods=["POST"]),
+    ]
+)
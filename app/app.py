@@ -1,8 +1,10 @@
 import reflex as rx
+from app.api import api
 from app.components.chat import chat_interface
 from app.components.evaluation import evaluation_dashboard
 from app.components.sidebar import layout
-from app.states.evaluation_state import EvaluationState
+from app.states.chat_state import ChatState
+from app.states.evaluation_state import EVALUATIONS_ROUTE, EvaluationState
 
 
 def index() -> rx.Component:
@@ -23,6 +25,7 @@ app = rx.App(
             rel="stylesheet",
         ),
     ],
+    api_transformer=api,
 )
-app.add_page(index, route="/")
-app.add_page(evaluations, route="/evaluations", on_load=EvaluationState.on_load)
\ No newline at end of file
+app.add_page(index, route="/", on_load=ChatState.on_load)
+app.add_page(evaluations, route=EVALUATIONS_ROUTE, on_load=EvaluationState.on_load)
\ No newline at end of file
@@ -1,22 +1,32 @@
 import reflex as rx
-from app.states.chat_state import ChatState, Message
+from app.states.chat_state import ChatState, Message, ModelReply
 
 
 def message_bubble(message: Message) -> rx.Component:
+    return chat_bubble(message.role, message.content, message.created_at)
+
+
+def chat_bubble(
+    role: rx.Var[str] | str, content: rx.Var[str] | str, created_at: rx.Var[str] | str
+) -> rx.Component:
     return rx.el.div(
         rx.el.div(
             rx.el.div(
-                message.content,
+                rx.cond(
+                    content == "",
+                    rx.el.span("...", class_name="animate-pulse"),
+                    content,
+                ),
                 class_name=rx.cond(
-                    message.role == "user",
+                    role == "user",
                     "bg-blue-600 text-white rounded-2xl rounded-tr-sm px-4 py-2",
                     "bg-gray-100 text-gray-800 rounded-2xl rounded-tl-sm px-4 py-2",
                 ),
             ),
             rx.el.span(
-                message.created_at,
+                created_at,
                 class_name=rx.cond(
-                    message.role == "user",
+                    role == "user",
                     "text-xs text-gray-400 mt-1 mr-1 text-right block",
                     "text-xs text-gray-400 mt-1 ml-1 text-left block",
                 ),
@@ -24,7 +34,7 @@ def message_bubble(message: Message) -> rx.Component:
             class_name="max-w-[80%]",
         ),
         class_name=rx.cond(
-            message.role == "user",
+            role == "user",
             "flex justify-end w-full mb-4",
             "flex justify-start w-full mb-4",
         ),
@@ -43,6 +53,85 @@ def empty_state() -> rx.Component:
     )
 
 
+def model_toggle(model: str) -> rx.Component:
+    return rx.el.label(
+        rx.el.input(
+            type="checkbox",
+            checked=ChatState.compare_models.contains(model),
+            on_change=lambda checked: ChatState.toggle_compare_model(model, checked),
+            class_name="mr-1.5",
+        ),
+        model,
+        class_name="flex items-center text-xs font-mono text-gray-600 cursor-pointer",
+    )
+
+
+def reply_column(reply: ModelReply) -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(reply.model, class_name="text-sm font-mono font-medium"),
+            rx.el.span(
+                reply.status,
+                class_name=rx.cond(
+                    reply.status == "error",
+                    "text-xs px-2 py-0.5 rounded-full bg-red-100 text-red-800",
+                    "text-xs px-2 py-0.5 rounded-full bg-gray-100 text-gray-600",
+                ),
+            ),
+            class_name="flex items-center justify-between mb-3",
+        ),
+        rx.el.div(
+            rx.cond(
+                reply.content == "",
+                rx.el.span("...", class_name="animate-pulse"),
+                reply.content,
+            ),
+            class_name="flex-1 text-sm text-gray-800 whitespace-pre-wrap",
+        ),
+        rx.cond(
+            reply.duration > 0,
+            rx.el.div(
+                f"{reply.duration}ms · first token {reply.first_token_ms}ms · "
+                f"{reply.prompt_tokens + reply.completion_tokens} tokens · "
+                f"${reply.cost:.4f}",
+                class_name="text-xs text-gray-400 mt-3 pt-3 border-t",
+            ),
+        ),
+        class_name="flex flex-col flex-1 min-w-[260px] bg-white border border-gray-200 rounded-xl p-4",
+    )
+
+
+def comparison_view() -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.foreach(ChatState.models, model_toggle),
+            class_name="flex flex-wrap gap-4 mb-4",
+        ),
+        rx.cond(
+            ChatState.model_replies.length() > 0,
+            rx.el.div(
+                chat_bubble("user", ChatState.compare_prompt, ""),
+                rx.el.div(
+                    rx.foreach(ChatState.model_replies, reply_column),
+                    class_name="flex gap-4 overflow-x-auto pb-2",
+                ),
+                rx.el.button(
+                    rx.icon("columns-2", class_name="h-4 w-4 mr-2"),
+                    "Open in run comparison",
+                    on_click=ChatState.open_comparison,
+                    disabled=ChatState.is_streaming,
+                    class_name="flex items-center mt-4 text-sm text-blue-600 hover:text-blue-700 disabled:opacity-40",
+                ),
+            ),
+            rx.el.p(
+                "Send a message to every selected model at once.",
+                class_name="text-sm text-gray-500 text-center mt-8",
+            ),
+        ),
+        class_name="w-full max-w-6xl mx-auto",
+    )
+
+
 def chat_interface() -> rx.Component:
     return rx.el.div(
         rx.el.div(
@@ -53,22 +142,67 @@ def chat_interface() -> rx.Component:
                 ),
                 class_name="flex items-center",
             ),
-            rx.el.button(
-                rx.icon("trash-2", class_name="h-4 w-4 mr-2"),
-                "Clear Chat",
-                on_click=ChatState.clear_chat,
-                class_name="flex items-center text-sm text-gray-500 hover:text-red-600 transition-colors",
+            rx.el.div(
+                rx.el.select(
+                    rx.foreach(ChatState.models, lambda m: rx.el.option(m, value=m)),
+                    value=ChatState.model,
+                    on_change=ChatState.set_model,
+                    class_name="px-3 py-1.5 border border-gray-200 rounded-lg text-sm focus:ring-2 focus:ring-blue-500 outline-none bg-white",
+                ),
+                rx.el.label(
+                    rx.el.input(
+                        type="checkbox",
+                        checked=ChatState.use_cache,
+                        on_change=ChatState.set_use_cache,
+                        class_name="mr-2",
+                    ),
+                    "Cache responses",
+                    class_name="flex items-center text-sm text-gray-500 cursor-pointer",
+                ),
+                rx.el.label(
+                    rx.el.input(
+                        type="checkbox",
+                        checked=ChatState.compare_mode,
+                        on_change=ChatState.set_compare_mode,
+                        class_name="mr-2",
+                    ),
+                    "Compare models",
+                    class_name="flex items-center text-sm text-gray-500 cursor-pointer",
+                ),
+                rx.el.button(
+                    rx.icon("trash-2", class_name="h-4 w-4 mr-2"),
+                    "Clear Chat",
+                    on_click=ChatState.clear_chat,
+                    class_name="flex items-center text-sm text-gray-500 hover:text-red-600 transition-colors",
+                ),
+                class_name="flex items-center gap-4",
             ),
             class_name="flex items-center justify-between px-6 py-4 border-b bg-white/80 backdrop-blur-md sticky top-0 z-10",
         ),
         rx.el.div(
             rx.cond(
-                ChatState.messages.length() > 0,
-                rx.el.div(
-                    rx.foreach(ChatState.messages, message_bubble),
-                    class_name="w-full max-w-3xl mx-auto",
+                ChatState.compare_mode,
+                comparison_view(),
+                rx.cond(
+                    ChatState.messages.length() > 0,
+                    rx.el.div(
+                        rx.cond(
+                            ChatState.has_older,
+                            rx.el.button(
+                                "Load older messages",
+                                on_click=ChatState.load_older,
+                                class_name="block mx-auto mb-4 text-xs text-gray-500 hover:text-blue-600",
+                            ),
+                        ),
+                        rx.foreach(ChatState.messages, message_bubble),
+                        rx.cond(
+                            ChatState.is_streaming,
+                            chat_bubble("assistant", ChatState.streaming_reply, ""),
+                        ),
+                        class_name="w-full max-w-3xl mx-auto",
+                    ),
+                    empty_state(),
                 ),
-                empty_state(),
             ),
             id="chat-scroll-area",
             class_name="flex-1 overflow-y-auto p-4 bg-gray-50/50",
@@ -81,6 +215,16 @@ def chat_interface() -> rx.Component:
                         placeholder="Type your message...",
                         class_name="flex-1 bg-gray-100 border-0 rounded-xl px-4 py-3 focus:ring-2 focus:ring-blue-500 focus:bg-white transition-all outline-none",
                     ),
+                    rx.cond(
+                        ChatState.is_streaming | ChatState.is_queued,
+                        rx.el.button(
+                            rx.icon("square", class_name="h-5 w-5"),
+                            type="button",
+                            on_click=ChatState.stop_generation,
+                            title="Stop generating",
+                            class_name="bg-gray-200 text-gray-700 p-3 rounded-xl hover:bg-gray-300 transition-colors",
+                        ),
+                    ),
                     rx.el.button(
                         rx.icon("send", class_name="h-5 w-5"),
                         type="submit",
@@ -92,6 +236,13 @@ def chat_interface() -> rx.Component:
                 reset_on_submit=True,
                 class_name="w-full",
             ),
+            rx.cond(
+                ChatState.is_queued,
+                rx.el.p(
+                    "All slots for this model are busy; your message is queued.",
+                    class_name="text-xs text-amber-600 text-center mt-2",
+                ),
+            ),
             class_name="p-4 border-t bg-white",
         ),
         class_name="flex flex-col h-full w-full bg-white",
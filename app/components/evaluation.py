@@ -1,12 +1,22 @@
 import reflex as rx
-from app.states.evaluation_state import EvaluationState, Run
+from app.states.evaluation_state import (
+    EvaluationState,
+    Experiment,
+    Run,
+    PAGE_SIZES,
+    CHART_RANGES,
+)
+from app.store.export import EXPORT_FORMATS
 
 
-def metric_card(title: str, value: str, icon: str, color: str) -> rx.Component:
+def metric_card(
+    title: str, value: str, icon: str, color: str, subtitle: str = ""
+) -> rx.Component:
     return rx.el.div(
         rx.el.div(
             rx.el.p(title, class_name="text-sm font-medium text-gray-500"),
             rx.el.h3(value, class_name="text-2xl font-bold text-gray-900 mt-1"),
+            rx.el.p(subtitle, class_name="text-xs text-gray-400 mt-1"),
             class_name="flex-1",
         ),
         rx.el.div(
@@ -28,18 +38,19 @@ def status_badge(status: str) -> rx.Component:
     )
 
 
-def tag_badge(run: Run, tag: str) -> rx.Component:
+def tag_badge(run_id: str, tag: str) -> rx.Component:
     return rx.el.span(
         tag,
         rx.el.button(
             rx.icon("x", class_name="h-3 w-3 ml-1.5 hover:text-gray-900"),
-            on_click=EvaluationState.remove_tag(run.id, tag),
+            on_click=EvaluationState.remove_tag(run_id, tag),
         ),
         class_name="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-gray-100 text-gray-700 border border-gray-200 mr-2 mb-2",
     )
 
 
 def feedback_section(run: Run) -> rx.Component:
+    feedback = EvaluationState.expanded_feedback
     return rx.el.div(
         rx.el.div(
             rx.el.span(
@@ -51,7 +62,7 @@ def feedback_section(run: Run) -> rx.Component:
                     rx.icon(
                         "star",
                         class_name=rx.cond(
-                            run.rating >= i,
+                            feedback.rating >= i,
                             "h-5 w-5 fill-yellow-400 text-yellow-400",
                             "h-5 w-5 text-gray-300",
                         ),
@@ -70,7 +81,7 @@ def feedback_section(run: Run) -> rx.Component:
                 rx.icon(
                     "thumbs-up",
                     class_name=rx.cond(
-                        run.feedback_thumb == "up",
+                        feedback.feedback_thumb == "up",
                         "h-5 w-5 fill-green-500 text-green-500",
                         "h-5 w-5 text-gray-400",
                     ),
@@ -82,7 +93,7 @@ def feedback_section(run: Run) -> rx.Component:
                 rx.icon(
                     "thumbs-down",
                     class_name=rx.cond(
-                        run.feedback_thumb == "down",
+                        feedback.feedback_thumb == "down",
                         "h-5 w-5 fill-red-500 text-red-500",
                         "h-5 w-5 text-gray-400",
                     ),
@@ -95,7 +106,7 @@ def feedback_section(run: Run) -> rx.Component:
         rx.el.div(
             rx.el.textarea(
                 placeholder="Add specific feedback comments...",
-                default_value=run.feedback_comment,
+                default_value=feedback.feedback_comment,
                 on_blur=lambda val: EvaluationState.update_comment(run.id, val),
                 class_name="w-full p-3 text-sm border rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent outline-none resize-none h-24 bg-white",
             ),
@@ -106,7 +117,7 @@ def feedback_section(run: Run) -> rx.Component:
                 "Tags:", class_name="text-sm font-medium text-gray-700 block mb-2"
             ),
             rx.el.div(
-                rx.foreach(run.tags, lambda t: tag_badge(run, t)),
+                rx.foreach(feedback.tags, lambda t: tag_badge(run.id, t)),
                 class_name="flex flex-wrap",
             ),
             rx.el.div(
@@ -119,6 +130,26 @@ def feedback_section(run: Run) -> rx.Component:
                 class_name="mt-1",
             ),
         ),
+        rx.cond(
+            EvaluationState.expanded_scores.length() > 0,
+            rx.el.div(
+                rx.el.span(
+                    "Automatic Scores:",
+                    class_name="text-sm font-medium text-gray-700 block mb-2",
+                ),
+                rx.foreach(
+                    EvaluationState.expanded_scores,
+                    lambda score: rx.el.div(
+                        rx.el.span(score["evaluator"], class_name="text-gray-600"),
+                        rx.el.span(
+                            score["score"], class_name="font-mono text-gray-900"
+                        ),
+                        class_name="flex justify-between text-xs py-0.5",
+                    ),
+                ),
+                class_name="mt-4 pt-4 border-t border-gray-100",
+            ),
+        ),
         class_name="bg-white p-4 rounded-lg border border-gray-200 h-full",
     )
 
@@ -146,9 +177,10 @@ def transcript_view(run: Run) -> rx.Component:
             class_name="text-sm font-semibold text-gray-900 mb-4 flex items-center gap-2",
         ),
         rx.cond(
-            run.transcript,
+            EvaluationState.expanded_transcript,
             rx.el.div(
-                rx.foreach(run.transcript, transcript_message), class_name="space-y-2"
+                rx.foreach(EvaluationState.expanded_transcript, transcript_message),
+                class_name="space-y-2",
             ),
             rx.el.div(
                 rx.el.div(
@@ -197,7 +229,7 @@ def run_row(run: Run) -> rx.Component:
                 class_name="px-2 py-4 whitespace-nowrap text-sm font-medium text-gray-900",
             ),
             rx.el.td(
-                run.timestamp,
+                rx.moment(run.timestamp, unix=True, format="YYYY-MM-DD HH:mm"),
                 class_name="px-6 py-4 whitespace-nowrap text-sm text-gray-500",
             ),
             rx.el.td(
@@ -217,6 +249,13 @@ def run_row(run: Run) -> rx.Component:
             ),
             rx.el.td(
                 f"${run.cost:.4f}",
+                rx.cond(
+                    run.cached,
+                    rx.el.span(
+                        "cached",
+                        class_name="ml-2 text-xs font-medium px-1.5 py-0.5 rounded bg-teal-50 text-teal-700",
+                    ),
+                ),
                 class_name="px-6 py-4 whitespace-nowrap text-sm text-gray-500",
             ),
             rx.el.td(
@@ -254,44 +293,43 @@ def run_row(run: Run) -> rx.Component:
     )
 
 
+def chart_range_selector() -> rx.Component:
+    return rx.el.div(
+        *[
+            rx.el.button(
+                chart_range,
+                on_click=EvaluationState.set_chart_range(chart_range),
+                class_name=rx.cond(
+                    EvaluationState.chart_range == chart_range,
+                    "px-2.5 py-1 rounded-md text-xs font-medium bg-blue-600 text-white",
+                    "px-2.5 py-1 rounded-md text-xs font-medium text-gray-600 hover:bg-gray-100",
+                ),
+            )
+            for chart_range in CHART_RANGES
+        ],
+        class_name="flex gap-1",
+    )
+
+
 def analytics_charts() -> rx.Component:
     return rx.el.div(
         rx.el.div(
-            rx.el.h3(
-                "Run Volume (Last 30 Days)",
-                class_name="text-sm font-semibold text-gray-700 mb-4",
-            ),
-            rx.recharts.bar_chart(
-                rx.recharts.cartesian_grid(stroke_dasharray="3 3", vertical=False),
-                rx.recharts.x_axis(
-                    data_key="date", font_size=10, tick_line=False, axis_line=False
-                ),
-                rx.recharts.y_axis(font_size=10, tick_line=False, axis_line=False),
-                rx.recharts.tooltip(),
-                rx.recharts.bar(
-                    data_key="runs", fill="#3b82f6", radius=[4, 4, 0, 0], bar_size=20
-                ),
-                data=EvaluationState.chart_data_daily_volume,
-                height=200,
-                width="100%",
-            ),
-            class_name="bg-white p-6 rounded-xl border border-gray-200 shadow-sm",
+            rx.el.h3("Analytics", class_name="text-sm font-semibold text-gray-700"),
+            chart_range_selector(),
+            class_name="lg:col-span-2 flex items-center justify-between",
         ),
         rx.el.div(
             rx.el.h3(
-                "Recent Latency & Tokens",
+                "Run Volume & Tokens",
                 class_name="text-sm font-semibold text-gray-700 mb-4",
             ),
             rx.recharts.composed_chart(
                 rx.recharts.cartesian_grid(stroke_dasharray="3 3", vertical=False),
-                rx.recharts.x_axis(data_key="name", hide=True),
+                rx.recharts.x_axis(
+                    data_key="bucket", font_size=10, tick_line=False, axis_line=False
+                ),
                 rx.recharts.y_axis(
-                    y_axis_id="left",
-                    orientation="left",
-                    font_size=10,
-                    tick_line=False,
-                    axis_line=False,
-                    label={"value": "ms", "angle": -90, "position": "insideLeft"},
+                    y_axis_id="left", font_size=10, tick_line=False, axis_line=False
                 ),
                 rx.recharts.y_axis(
                     y_axis_id="right",
@@ -299,16 +337,14 @@ def analytics_charts() -> rx.Component:
                     font_size=10,
                     tick_line=False,
                     axis_line=False,
-                    label={"value": "tok", "angle": 90, "position": "insideRight"},
                 ),
                 rx.recharts.tooltip(),
                 rx.recharts.bar(
-                    data_key="latency",
+                    data_key="runs",
                     y_axis_id="left",
-                    fill="#f97316",
+                    fill="#3b82f6",
                     radius=[4, 4, 0, 0],
-                    bar_size=10,
-                    name="Latency (ms)",
+                    name="Runs",
                 ),
                 rx.recharts.line(
                     data_key="tokens",
@@ -318,7 +354,40 @@ def analytics_charts() -> rx.Component:
                     dot=False,
                     name="Tokens",
                 ),
-                data=EvaluationState.chart_data_latency,
+                data=EvaluationState.chart_data,
+                height=200,
+                width="100%",
+            ),
+            class_name="bg-white p-6 rounded-xl border border-gray-200 shadow-sm",
+        ),
+        rx.el.div(
+            rx.el.h3(
+                "Latency Percentiles",
+                class_name="text-sm font-semibold text-gray-700 mb-4",
+            ),
+            rx.recharts.line_chart(
+                rx.recharts.cartesian_grid(stroke_dasharray="3 3", vertical=False),
+                rx.recharts.x_axis(
+                    data_key="bucket", font_size=10, tick_line=False, axis_line=False
+                ),
+                rx.recharts.y_axis(
+                    font_size=10,
+                    tick_line=False,
+                    axis_line=False,
+                    label={"value": "ms", "angle": -90, "position": "insideLeft"},
+                ),
+                rx.recharts.tooltip(),
+                rx.recharts.legend(),
+                rx.recharts.line(
+                    data_key="p50", stroke="#22c55e", stroke_width=2, dot=False
+                ),
+                rx.recharts.line(
+                    data_key="p95", stroke="#f97316", stroke_width=2, dot=False
+                ),
+                rx.recharts.line(
+                    data_key="p99", stroke="#ef4444", stroke_width=2, dot=False
+                ),
+                data=EvaluationState.chart_data,
                 height=200,
                 width="100%",
             ),
@@ -328,6 +397,169 @@ def analytics_charts() -> rx.Component:
     )
 
 
+def experiment_row(experiment: Experiment) -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.button(
+                experiment.id,
+                on_click=EvaluationState.set_tag_filter(experiment.id),
+                class_name=rx.cond(
+                    EvaluationState.tag_filter == experiment.id,
+                    "text-sm font-mono font-medium text-blue-700 underline",
+                    "text-sm font-mono font-medium text-gray-900 hover:text-blue-600",
+                ),
+            ),
+            rx.el.span(
+                experiment.models.join(", "), class_name="text-xs text-gray-500"
+            ),
+            class_name="flex flex-col w-64 shrink-0",
+        ),
+        rx.el.div(
+            rx.el.div(
+                class_name=rx.cond(
+                    experiment.failed > 0,
+                    "h-2 bg-orange-400 rounded-full",
+                    "h-2 bg-blue-500 rounded-full",
+                ),
+                style={
+                    "width": rx.cond(
+                        experiment.total > 0,
+                        f"{experiment.completed * 100 / experiment.total}%",
+                        "0%",
+                    )
+                },
+            ),
+            class_name="flex-1 h-2 bg-gray-100 rounded-full overflow-hidden",
+        ),
+        rx.el.span(
+            f"{experiment.completed}/{experiment.total}",
+            class_name="text-sm text-gray-700 w-24 text-right",
+        ),
+        rx.el.span(
+            f"{experiment.runs_per_second} runs/s",
+            class_name="text-sm text-gray-500 w-24 text-right",
+        ),
+        rx.el.span(
+            f"{experiment.failed} failed",
+            class_name="text-sm text-gray-500 w-20 text-right",
+        ),
+        rx.el.span(
+            experiment.status,
+            class_name=rx.cond(
+                experiment.status == "running",
+                "text-xs font-medium px-2 py-0.5 rounded-full bg-blue-100 text-blue-800",
+                "text-xs font-medium px-2 py-0.5 rounded-full bg-gray-100 text-gray-700",
+            ),
+        ),
+        class_name="flex items-center gap-4 py-2",
+    )
+
+
+def experiments_panel() -> rx.Component:
+    return rx.cond(
+        EvaluationState.experiments.length() > 0,
+        rx.el.div(
+            rx.el.h2(
+                "Batch Experiments",
+                class_name="text-base font-semibold text-gray-900 mb-2",
+            ),
+            rx.foreach(EvaluationState.experiments, experiment_row),
+            class_name="bg-white p-6 rounded-xl border border-gray-200 shadow-sm mb-8",
+        ),
+    )
+
+
+def cohort_select(value: rx.Var, on_change) -> rx.Component:
+    return rx.el.select(
+        rx.foreach(
+            EvaluationState.cohort_options,
+            lambda option: rx.el.option(option, value=option),
+        ),
+        value=value,
+        on_change=on_change,
+        class_name="px-3 py-1.5 border border-gray-200 rounded-lg text-sm font-mono focus:ring-2 focus:ring-blue-500 outline-none bg-white",
+    )
+
+
+def cohort_row(row: dict[str, str]) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(row["label"], class_name="py-2 pr-4 text-sm text-gray-900"),
+        rx.el.td(row["a"], class_name="py-2 pr-4 text-sm text-gray-700 text-right"),
+        rx.el.td(row["b"], class_name="py-2 pr-4 text-sm text-gray-700 text-right"),
+        rx.el.td(
+            row["delta"],
+            class_name=rx.cond(
+                row["significant"] != "",
+                "py-2 pr-4 text-sm font-semibold text-blue-700 text-right",
+                "py-2 pr-4 text-sm text-gray-500 text-right",
+            ),
+        ),
+        rx.el.td(
+            row["interval"],
+            class_name="py-2 pr-4 text-xs font-mono text-gray-500 text-right",
+        ),
+        rx.el.td(row["counts"], class_name="py-2 text-xs text-gray-400 text-right"),
+        class_name="border-t border-gray-100",
+    )
+
+
+def cohort_comparison_panel() -> rx.Component:
+    return rx.cond(
+        EvaluationState.cohort_options.length() > 1,
+        rx.el.div(
+            rx.el.div(
+                rx.el.h2(
+                    "A/B Comparison", class_name="text-base font-semibold text-gray-900"
+                ),
+                rx.el.div(
+                    cohort_select(
+                        EvaluationState.cohort_a, EvaluationState.set_cohort_a
+                    ),
+                    rx.el.span("vs", class_name="text-sm text-gray-500"),
+                    cohort_select(
+                        EvaluationState.cohort_b, EvaluationState.set_cohort_b
+                    ),
+                    rx.el.button(
+                        rx.icon("refresh-cw", class_name="h-4 w-4"),
+                        on_click=EvaluationState.refresh_comparison,
+                        class_name="p-1.5 border border-gray-200 rounded-lg text-gray-600 hover:bg-gray-50",
+                    ),
+                    class_name="flex items-center gap-2",
+                ),
+                class_name="flex items-center justify-between mb-4",
+            ),
+            rx.el.table(
+                rx.el.thead(
+                    rx.el.tr(
+                        *(
+                            rx.el.th(
+                                header,
+                                class_name="pb-2 pr-4 text-xs font-medium text-gray-500 uppercase "
+                                + ("text-left" if header == "Metric" else "text-right"),
+                            )
+                            for header in (
+                                "Metric",
+                                "A (mean)",
+                                "B (mean)",
+                                "Δ",
+                                "95% CI of B - A",
+                                "Runs A / B",
+                            )
+                        )
+                    )
+                ),
+                rx.el.tbody(rx.foreach(EvaluationState.cohort_rows, cohort_row)),
+                class_name="w-full",
+            ),
+            rx.el.p(
+                "Bold deltas are significant: the bootstrap interval excludes zero.",
+                class_name="text-xs text-gray-400 mt-3",
+            ),
+            class_name="bg-white p-6 rounded-xl border border-gray-200 shadow-sm mb-8",
+        ),
+    )
+
+
 def comparison_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.portal(
@@ -371,6 +603,14 @@ def comparison_modal() -> rx.Component:
                                         f"{r.duration}ms",
                                         class_name="text-sm font-medium mb-2",
                                     ),
+                                    rx.el.p(
+                                        "Time to First Token",
+                                        class_name="text-xs text-gray-500",
+                                    ),
+                                    rx.el.p(
+                                        f"{r.first_token_ms}ms",
+                                        class_name="text-sm font-medium mb-2",
+                                    ),
                                     rx.el.p("Cost", class_name="text-xs text-gray-500"),
                                     rx.el.p(
                                         f"${r.cost:.4f}",
@@ -419,6 +659,53 @@ def comparison_modal() -> rx.Component:
     )
 
 
+def pagination_controls() -> rx.Component:
+    return rx.el.div(
+        rx.el.p(
+            f"Showing {EvaluationState.page_start}-{EvaluationState.page_end} of {EvaluationState.total_count}",
+            class_name="text-sm text-gray-500",
+        ),
+        rx.el.div(
+            rx.cond(
+                EvaluationState.new_runs > 0,
+                rx.el.button(
+                    rx.icon("arrow-up", class_name="h-3 w-3 mr-1"),
+                    f"{EvaluationState.new_runs} new",
+                    on_click=EvaluationState.show_new_runs,
+                    class_name="flex items-center px-2.5 py-1 text-xs font-medium text-blue-700 bg-blue-50 rounded-full hover:bg-blue-100",
+                ),
+            ),
+            rx.el.select(
+                *[
+                    rx.el.option(f"{size} / page", value=str(size))
+                    for size in PAGE_SIZES
+                ],
+                value=EvaluationState.page_size.to_string(),
+                on_change=EvaluationState.set_page_size,
+                class_name="px-3 py-1.5 border border-gray-200 rounded-lg text-sm focus:ring-2 focus:ring-blue-500 outline-none bg-white",
+            ),
+            rx.el.button(
+                rx.icon("chevron-left", class_name="h-4 w-4"),
+                on_click=EvaluationState.prev_page,
+                disabled=EvaluationState.page_number <= 1,
+                class_name="p-1.5 border border-gray-200 rounded-lg text-gray-600 hover:bg-gray-50 disabled:opacity-40 disabled:cursor-not-allowed",
+            ),
+            rx.el.span(
+                f"Page {EvaluationState.page_number}",
+                class_name="text-sm font-medium text-gray-700",
+            ),
+            rx.el.button(
+                rx.icon("chevron-right", class_name="h-4 w-4"),
+                on_click=EvaluationState.next_page,
+                disabled=~EvaluationState.has_next_page,
+                class_name="p-1.5 border border-gray-200 rounded-lg text-gray-600 hover:bg-gray-50 disabled:opacity-40 disabled:cursor-not-allowed",
+            ),
+            class_name="flex items-center gap-3",
+        ),
+        class_name="flex items-center justify-between px-6 py-3 border-t border-gray-200 bg-gray-50",
+    )
+
+
 def evaluation_dashboard() -> rx.Component:
     return rx.el.div(
         comparison_modal(),
@@ -438,12 +725,14 @@ def evaluation_dashboard() -> rx.Component:
                 EvaluationState.total_runs.to_string(),
                 "activity",
                 "text-blue-600",
+                f"{EvaluationState.cache_hit_rate}% served from cache",
             ),
             metric_card(
                 "Avg. Latency",
                 f"{EvaluationState.average_latency}ms",
                 "clock",
                 "text-orange-600",
+                f"p95 {EvaluationState.latency_p95}ms",
             ),
             metric_card(
                 "Total Tokens",
@@ -460,6 +749,8 @@ def evaluation_dashboard() -> rx.Component:
             class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-8",
         ),
         analytics_charts(),
+        experiments_panel(),
+        cohort_comparison_panel(),
         rx.el.div(
             rx.el.div(
                 rx.el.div(
@@ -468,7 +759,7 @@ def evaluation_dashboard() -> rx.Component:
                         class_name="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-gray-400",
                     ),
                     rx.el.input(
-                        placeholder="Search by ID or content...",
+                        placeholder='Search runs, transcripts, comments or "a phrase"...',
                         on_change=EvaluationState.set_search_query.debounce(500),
                         class_name="pl-10 pr-4 py-2 w-full border border-gray-200 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent outline-none text-sm",
                     ),
@@ -490,6 +781,17 @@ def evaluation_dashboard() -> rx.Component:
                         on_change=EvaluationState.set_model_filter,
                         class_name="px-4 py-2 border border-gray-200 rounded-lg text-sm focus:ring-2 focus:ring-blue-500 outline-none bg-white",
                     ),
+                    rx.cond(
+                        EvaluationState.tag_filter != "",
+                        rx.el.button(
+                            EvaluationState.tag_filter,
+                            rx.icon("x", class_name="h-3 w-3 ml-1.5"),
+                            on_click=EvaluationState.set_tag_filter(
+                                EvaluationState.tag_filter
+                            ),
+                            class_name="flex items-center px-3 py-2 rounded-lg text-sm font-medium bg-blue-50 text-blue-700 border border-blue-200",
+                        ),
+                    ),
                     class_name="flex gap-3",
                 ),
                 class_name="flex flex-col md:flex-row gap-4 justify-between items-center mb-6",
@@ -504,9 +806,28 @@ def evaluation_dashboard() -> rx.Component:
                         class_name="flex items-center px-4 py-2 bg-blue-600 text-white rounded-lg text-sm font-medium hover:bg-blue-700 transition-colors shadow-sm",
                     ),
                 ),
+                rx.el.label(
+                    rx.el.input(
+                        type="checkbox",
+                        checked=EvaluationState.export_transcripts,
+                        on_change=EvaluationState.set_export_transcripts,
+                        class_name="rounded border-gray-300 text-blue-600 focus:ring-blue-500",
+                    ),
+                    "Transcripts",
+                    class_name="flex items-center gap-2 text-sm text-gray-600",
+                ),
+                rx.el.select(
+                    *[
+                        rx.el.option(format.upper(), value=format)
+                        for format in EXPORT_FORMATS
+                    ],
+                    value=EvaluationState.export_format,
+                    on_change=EvaluationState.set_export_format,
+                    class_name="px-3 py-2 border border-gray-200 rounded-lg text-sm focus:ring-2 focus:ring-blue-500 outline-none bg-white",
+                ),
                 rx.el.button(
                     rx.icon("download", class_name="h-4 w-4 mr-2"),
-                    "Export JSON",
+                    "Export",
                     on_click=EvaluationState.export_data,
                     class_name="flex items-center px-4 py-2 bg-white border border-gray-200 rounded-lg text-sm font-medium text-gray-700 hover:bg-gray-50 transition-colors",
                 ),
@@ -559,6 +880,7 @@ def evaluation_dashboard() -> rx.Component:
                 ),
                 class_name="min-w-full divide-y divide-gray-200",
             ),
+            pagination_controls(),
             class_name="bg-white border border-gray-200 rounded-xl overflow-hidden shadow-sm overflow-x-auto",
         ),
         class_name="p-8 max-w-[1600px] mx-auto",
@@ -0,0 +1,181 @@
+"""A/B comparison of two run cohorts with bootstrap confidence intervals.
+
+A cohort is a set of filters on the columnar run table, such as one model
+or one experiment tag. Confidence intervals come from a Poisson bootstrap
+over at most ``BOOTSTRAP_BINS`` quantile bins of each metric: a replicate
+draws one weight per bin rather than one per run, so the cost does not grow
+with cohort size, and cohorts smaller than the bin count are bootstrapped
+run by run. Replicates are cached per cohort fingerprint, so a comparison
+only recomputes the cohorts whose runs or scores changed.
+"""
+
+import functools
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from app.store.run_store import get_run_store
+
+METRICS = {
+    "duration": "Latency (ms)",
+    "first_token_ms": "Time to first token (ms)",
+    "tokens": "Tokens",
+    "cost": "Cost ($)",
+    "error": "Error rate",
+}
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_BINS = 512
+CONFIDENCE = 0.95
+COHORT_CACHE_SIZE = 32
+COHORT_FIELDS = ("model", "tag", "status")
+
+
+class CohortStats:
+    """Point estimates and bootstrap replicates of one metric in one cohort."""
+
+    def __init__(self, values: np.ndarray, seed: int):
+        values = np.sort(values[~np.isnan(values)])
+        self.count = len(values)
+        if not self.count:
+            self.mean = self.p50 = self.p95 = np.nan
+            self.means = self.p95s = np.full(BOOTSTRAP_SAMPLES, np.nan)
+            return
+        self.mean = float(values.mean())
+        self.p50, self.p95 = (float(v) for v in np.percentile(values, [50, 95]))
+        starts, counts, weights = _bootstrap_weights(self.count, seed)
+        bin_means = np.add.reduceat(values, starts) / counts
+        totals = np.maximum(weights.sum(axis=1), 1)
+        self.means = weights @ bin_means / totals
+        # The p95 of a replicate is the bin where its cumulative weight
+        # crosses 95% of the total.
+        cumulative = np.cumsum(weights, axis=1)
+        self.p95s = bin_means[np.argmax(cumulative >= 0.95 * totals[:, None], axis=1)]
+
+
+@functools.lru_cache(maxsize=8)
+def _bootstrap_weights(count: int, seed: int):
+    """Bin boundaries and replicate weights for a cohort of ``count`` runs.
+
+    Each run gets a Poisson(1) weight; summed over a bin that is one
+    Poisson(bin size) draw, so a replicate costs one draw per bin. The
+    weights only depend on the cohort, so its metrics share one draw.
+    """
+    bins = min(count, BOOTSTRAP_BINS)
+    starts = np.linspace(0, count, bins, endpoint=False).astype(np.int64)
+    counts = np.diff(np.append(starts, count))
+    weights = np.random.default_rng(seed).poisson(counts, (BOOTSTRAP_SAMPLES, bins))
+    return starts, counts, weights
+
+
+def _cohort_seed(filters: tuple) -> int:
+    return zlib.crc32(repr(filters).encode())
+
+
+@functools.lru_cache(maxsize=4)
+def _score_column(size: int, scores_version: int, evaluator: str) -> np.ndarray:
+    # Runs are only ever appended to the columnar table, so its size and
+    # the scores version identify one alignment of scores to rows.
+    store = get_run_store()
+    return store.score_column(store.columns(), evaluator)
+
+
+def _fingerprint(columns, mask: np.ndarray) -> tuple[int, int, int]:
+    """Changes whenever a run joins, leaves or is edited in the cohort."""
+    if not mask.any():
+        return 0, 0, 0
+    return (
+        int(mask.sum()),
+        int(columns.column("seq")[mask].max()),
+        int(columns.column("updated_version")[mask].max()),
+    )
+
+
+_cohorts: OrderedDict[tuple, CohortStats] = OrderedDict()
+_cohorts_lock = threading.Lock()
+
+
+def cohort_stats(metric: str, **filters: str | None) -> CohortStats:
+    store = get_run_store()
+    columns = store.columns()
+    key = tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+    mask = columns.mask(**dict(key))
+    scores_version = store.scores_version if metric.startswith("score:") else 0
+    cache_key = (_fingerprint(columns, mask), scores_version, key, metric)
+    with _cohorts_lock:
+        stats = _cohorts.get(cache_key)
+        if stats is not None:
+            _cohorts.move_to_end(cache_key)
+            return stats
+    if metric == "error":
+        status = columns.interners["status"].ids_matching("success", ignore_case=True)
+        values = (~np.isin(columns.column("status"), status)).astype(np.float64)
+    elif metric.startswith("score:"):
+        values = _score_column(
+            columns.size, scores_version, metric.removeprefix("score:")
+        )
+    else:
+        values = columns.column(metric).astype(np.float64)
+    stats = CohortStats(values[mask], _cohort_seed(key))
+    with _cohorts_lock:
+        _cohorts[cache_key] = stats
+        while len(_cohorts) > COHORT_CACHE_SIZE:
+            _cohorts.popitem(last=False)
+    return stats
+
+
+def _interval(replicates: np.ndarray) -> tuple[float, float]:
+    if np.isnan(replicates).all():
+        return np.nan, np.nan
+    tail = (1 - CONFIDENCE) / 2 * 100
+    low, high = np.nanpercentile(replicates, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def compare_cohorts(
+    a: dict[str, str | None], b: dict[str, str | None], evaluators: list[str] = ()
+) -> list[dict]:
+    """Per-metric statistics of cohorts ``a`` and ``b`` and of ``b - a``.
+
+    ``delta_low`` and ``delta_high`` bound the difference in means at the
+    ``CONFIDENCE`` level; the difference is significant when they share a sign.
+    """
+    metrics = [*METRICS, *(f"score:{name}" for name in evaluators)]
+    rows = []
+    for metric in metrics:
+        left, right = cohort_stats(metric, **a), cohort_stats(metric, **b)
+        row = {
+            "metric": metric,
+            "label": METRICS.get(metric) or f"Score: {metric[6:]}",
+            "a_count": left.count,
+            "b_count": right.count,
+            "a_mean": left.mean,
+            "b_mean": right.mean,
+            "a_p50": left.p50,
+            "b_p50": right.p50,
+            "a_p95": left.p95,
+            "b_p95": right.p95,
+            "delta": right.mean - left.mean,
+            "delta_pct": (right.mean - left.mean) / left.mean * 100
+            if left.mean
+            else np.nan,
+        }
+        row["a_low"], row["a_high"] = _interval(left.means)
+        row["b_low"], row["b_high"] = _interval(right.means)
+        row["delta_low"], row["delta_high"] = _interval(right.means - left.means)
+        row["p95_delta_low"], row["p95_delta_high"] = _interval(right.p95s - left.p95s)
+        row["significant"] = bool(row["delta_low"] > 0 or row["delta_high"] < 0)
+        rows.append(row)
+    return rows
+
+
+def parse_cohort(spec: str) -> dict[str, str]:
+    """Filters for a ``field:value`` cohort, such as ``model:gpt-4o``.
+
+    Experiment ids are tags, so ``tag:exp-...`` selects one experiment.
+    """
+    field, _, value = spec.partition(":")
+    if field not in COHORT_FIELDS or not value:
+        raise ValueError(f"invalid cohort {spec!r}, expected one of {COHORT_FIELDS}")
+    return {field: value}
@@ -0,0 +1,219 @@
+"""Automatic evaluators that score a run's output between 0 and 1.
+
+Evaluators are plain picklable objects so the scoring engine can run them
+in worker processes. Each has a ``name`` and a ``version``; bump the version
+whenever an evaluator's logic changes so that its cached scores are
+recomputed. Evaluators backed by a model also name it in ``cache_version``,
+so switching models recomputes their scores too. A score of ``None`` means
+the evaluator does not apply to the run, for example a reference-based
+check on a run without ``expected``.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "")
+HASHED_EMBEDDING_SIZE = 512
+JUDGE_MODEL = os.environ.get("JUDGE_MODEL", "")
+JUDGE_MARKER = "Score: <1-10>"
+JUDGE_PROMPT = f"""You grade answers from an AI assistant.
+Rate how well the answer responds to the question{{reference}}.
+Reply with a single line of the form "{JUDGE_MARKER}"."""
+
+ScoringInput = namedtuple("ScoringInput", "run_id input_text output_text expected")
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+_JUDGE_SCORE = re.compile(r"Score:\s*(\d+(?:\.\d+)?)")
+_WORD = re.compile(r"\w+")
+
+
+def output_hash(item: ScoringInput) -> str:
+    """Hash of everything an evaluator may look at."""
+    text = json.dumps([item.input_text, item.output_text, item.expected])
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class Evaluator:
+    name = ""
+    version = 1
+    # Remote evaluators wait on a model API, so the engine runs them as
+    # concurrent coroutines instead of in the process pool.
+    remote = False
+
+    @property
+    def cache_version(self) -> str:
+        """Version stored with each score; cached scores at another are stale."""
+        return str(self.version)
+
+    def score(self, item: ScoringInput) -> float | None:
+        raise NotImplementedError
+
+    def score_many(self, items: list[ScoringInput]) -> list[float | None]:
+        return [self.score(item) for item in items]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class ExactMatch(Evaluator):
+    name = "exact"
+
+    def score(self, item):
+        if not item.expected:
+            return None
+        return float(_normalize(item.output_text) == _normalize(item.expected))
+
+
+class RegexMatch(Evaluator):
+    """Treats ``expected`` as a regular expression searched for in the output."""
+
+    name = "regex"
+
+    def score(self, item):
+        if not item.expected:
+            return None
+        try:
+            pattern = re.compile(item.expected, re.IGNORECASE)
+        except re.error:
+            return None
+        return float(pattern.search(item.output_text) is not None)
+
+
+class JsonValid(Evaluator):
+    """Whether the output parses as JSON, allowing a fenced code block."""
+
+    name = "json"
+
+    def score(self, item):
+        text = item.output_text.strip()
+        if fenced := _CODE_FENCE.match(text):
+            text = fenced.group(1)
+        try:
+            json.loads(text)
+        except ValueError:
+            return 0.0
+        return 1.0
+
+
+_embedding_model = None
+
+
+def embedding_backend() -> str:
+    """Name of the model ``embed`` uses, without loading it."""
+    if EMBEDDING_MODEL and importlib.util.find_spec("sentence_transformers"):
+        return EMBEDDING_MODEL
+    return f"hashed-{HASHED_EMBEDDING_SIZE}"
+
+
+def embed(texts: list[str]) -> np.ndarray:
+    """Unit-length embeddings from the local model named by ``EMBEDDING_MODEL``.
+
+    Without sentence-transformers or a configured model, falls back to a
+    hashed bag of words, which still ranks lexical overlap sensibly.
+    """
+    global _embedding_model
+    if EMBEDDING_MODEL and _embedding_model is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            _embedding_model = False
+        else:
+            _embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    if _embedding_model:
+        return _embedding_model.encode(texts, normalize_embeddings=True)
+    vectors = np.zeros((len(texts), HASHED_EMBEDDING_SIZE), np.float32)
+    for row, text in enumerate(texts):
+        for word in _WORD.findall(text.casefold()):
+            digest = hashlib.md5(word.encode()).digest()
+            vectors[
+                row, int.from_bytes(digest[:4], "little") % HASHED_EMBEDDING_SIZE
+            ] += 1
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingSimilarity(Evaluator):
+    """Cosine similarity between the output and ``expected``, clipped to 0..1."""
+
+    name = "embedding"
+
+    @property
+    def cache_version(self):
+        return f"{self.version}:{embedding_backend()}"
+
+    def score_many(self, items):
+        scored = [i for i, item in enumerate(items) if item.expected]
+        scores: list[float | None] = [None] * len(items)
+        if scored:
+            vectors = embed(
+                [items[i].output_text for i in scored]
+                + [items[i].expected for i in scored]
+            )
+            outputs, references = np.split(vectors, 2)
+            similarity = np.clip((outputs * references).sum(axis=1), 0.0, 1.0)
+            for i, value in zip(scored, similarity):
+                scores[i] = round(float(value), 4)
+        return scores
+
+    def score(self, item):
+        return self.score_many([item])[0]
+
+
+class LLMJudge(Evaluator):
+    """Asks a judge model to grade the answer from 1 to 10."""
+
+    name = "judge"
+    remote = True
+
+    def __init__(self, model: str = JUDGE_MODEL):
+        self.model = model
+        # Grades from different judge models are not interchangeable.
+        if model:
+            self.name = f"judge:{model}"
+
+    def judge_model(self) -> str:
+        """The configured judge, or the first available model by default."""
+        from app.llm.providers import available_models
+
+        return self.model or available_models()[0]
+
+    @property
+    def cache_version(self):
+        return f"{self.version}:{self.judge_model()}"
+
+    async def score_async(self, item: ScoringInput) -> float | None:
+        """Grade one run. Provider errors propagate so they are not cached."""
+        from app.llm.providers import get_provider
+
+        model = self.judge_model()
+        reference = (
+            f", given the reference answer: {item.expected}" if item.expected else ""
+        )
+        messages = [
+            {"role": "system", "content": JUDGE_PROMPT.format(reference=reference)},
+            {
+                "role": "user",
+                "content": f"Question: {item.input_text}\n\nAnswer: {item.output_text}",
+            },
+        ]
+        chunks = []
+        async for event in get_provider(model).stream_chat(model, messages):
+            if isinstance(event, str):
+                chunks.append(event)
+        match = _JUDGE_SCORE.search("".join(chunks))
+        if match is None:
+            return None
+        return min(max((float(match.group(1)) - 1) / 9, 0.0), 1.0)
+
+
+EVALUATORS = {
+    evaluator.name: evaluator
+    for evaluator in (ExactMatch, RegexMatch, JsonValid, EmbeddingSimilarity, LLMJudge)
+}
@@ -0,0 +1,329 @@
+"""Batch evaluation: replay a dataset of prompts against one or more models.
+
+Every (item, model) pair becomes a job for a pool of asyncio workers. Each
+model has its own request rate limit, the pool bounds how many requests
+are in flight overall, and the provider's own semaphore still applies.
+Results are written as :class:`Run` records tagged with the experiment id,
+in batches, and the experiment's progress is saved and announced about once
+a second so open dashboards can follow it.
+
+Usage::
+
+    python -m app.evals.runner prompts.jsonl --model stub-small --model stub-large \\
+        [--concurrency 16] [--rpm stub-large=120] [--experiment my-run]
+
+Dataset lines are JSON objects with a ``prompt`` string or a ``messages``
+list, and optionally an ``id``, ``expected`` output and extra ``tags``.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import sys
+import time
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from app.llm.pricing import completion_cost
+from app.llm.providers import ProviderError, Usage, get_provider
+from app.llm.tokenizer import count_prompt_tokens, count_tokens, encoding_for_model
+from app.store.models import Experiment, Run
+from app.store.run_store import RunStore, get_run_store
+
+DEFAULT_CONCURRENCY = 8
+PROGRESS_INTERVAL = 1.0
+WRITE_BATCH_SIZE = 200
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetError(ValueError):
+    pass
+
+
+@dataclass
+class DatasetItem:
+    id: str
+    messages: list[dict[str, str]]
+    expected: str = ""
+    tags: list[str] = field(default_factory=list)
+
+    @property
+    def prompt(self) -> str:
+        return self.messages[-1]["content"] if self.messages else ""
+
+
+def parse_dataset(lines: Iterable[str]) -> list[DatasetItem]:
+    items = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise DatasetError(f"line {number}: invalid JSON: {e}") from None
+        if not isinstance(record, dict):
+            raise DatasetError(f"line {number}: expected an object")
+        messages = record.get("messages")
+        if messages is None and isinstance(record.get("prompt"), str):
+            messages = [{"role": "user", "content": record["prompt"]}]
+        if not messages:
+            raise DatasetError(f"line {number}: needs a prompt or messages")
+        items.append(
+            DatasetItem(
+                id=str(record.get("id", len(items) + 1)),
+                messages=messages,
+                expected=str(record.get("expected", "")),
+                tags=list(record.get("tags", [])),
+            )
+        )
+    return items
+
+
+def new_experiment_id() -> str:
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"exp-{stamp}-{uuid.uuid4().hex[:4]}"
+
+
+class RateLimiter:
+    """Spaces requests evenly to at most ``per_minute`` per minute."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        dataset: list[DatasetItem],
+        models: list[str],
+        experiment_id: str | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_limits: dict[str, float] | None = None,
+        store: RunStore | None = None,
+        dataset_name: str = "",
+        on_progress=None,
+    ):
+        self.dataset = dataset
+        self.models = models
+        self.concurrency = max(concurrency, 1)
+        self.store = store if store is not None else get_run_store()
+        self.on_progress = on_progress
+        rate_limits = rate_limits or {}
+        self._limiters = {
+            model: RateLimiter(
+                rate_limits.get(model, get_provider(model).config.requests_per_minute)
+            )
+            for model in models
+        }
+        self.experiment = Experiment(
+            id=experiment_id or new_experiment_id(),
+            dataset=dataset_name,
+            models=models,
+            total=len(dataset) * len(models),
+            started=int(time.time()),
+        )
+        self._pending: list[Run] = []
+        self._writes: set[asyncio.Future] = set()
+        self._started = time.perf_counter()
+
+    async def run(self) -> Experiment:
+        """Run every job and return the experiment with its final status.
+
+        Workers run in a task group, so if one fails the jobs stop being
+        queued and the failure is raised here instead of leaving the feeder
+        blocked on a full queue.
+        """
+        jobs = asyncio.Queue(maxsize=self.concurrency * 2)
+        reporter = asyncio.create_task(self._report_periodically())
+        status = "failed"
+        try:
+            async with asyncio.TaskGroup() as workers:
+                for _ in range(self.concurrency):
+                    workers.create_task(self._worker(jobs))
+                for item in self.dataset:
+                    for model in self.models:
+                        await jobs.put((item, model))
+                for _ in range(self.concurrency):
+                    await jobs.put(None)
+            status = "finished"
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            reporter.cancel()
+            self.experiment.status = status
+            await asyncio.shield(self._finish())
+        return self.experiment
+
+    async def _worker(self, jobs: asyncio.Queue):
+        while (job := await jobs.get()) is not None:
+            run = await self._execute(*job)
+            self._pending.append(run)
+            experiment = self.experiment
+            experiment.completed += 1
+            experiment.failed += run.status != "success"
+            experiment.tokens += run.tokens
+            experiment.cost += run.cost
+            if len(self._pending) >= WRITE_BATCH_SIZE:
+                await self._flush()
+
+    async def _execute(self, item: DatasetItem, model: str) -> Run:
+        await self._limiters[model].acquire()
+        started = time.perf_counter()
+        first_token_ms = None
+        chunks = []
+        usage = None
+        status = "success"
+        try:
+            async for event in get_provider(model).stream_chat(model, item.messages):
+                if isinstance(event, Usage):
+                    usage = event
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = int((time.perf_counter() - started) * 1000)
+                chunks.append(event)
+        except ProviderError as exc:
+            status = "error"
+            chunks.append(f"[Error: {exc}]")
+        except Exception as exc:
+            # A provider bug fails its own job, not the whole experiment.
+            logger.exception("%s failed on %s", model, item.id)
+            status = "error"
+            chunks.append(f"[Error: {exc!r}]")
+        duration = int((time.perf_counter() - started) * 1000)
+        reply = "".join(chunks)
+        if usage is None:
+            usage = Usage(
+                prompt_tokens=count_prompt_tokens(model, item.messages),
+                completion_tokens=count_tokens(reply, encoding_for_model(model)),
+            )
+        created_at = datetime.datetime.now().strftime("%H:%M")
+        return Run(
+            id=f"{self.experiment.id}-{item.id}-{model}",
+            timestamp=int(time.time()),
+            status=status,
+            duration=duration,
+            tokens=usage.total_tokens,
+            cost=round(
+                completion_cost(model, usage.prompt_tokens, usage.completion_tokens),
+                6,
+            ),
+            model=model,
+            input_text=item.prompt,
+            output_text=reply,
+            expected=item.expected,
+            tags=[self.experiment.id, *item.tags],
+            transcript=[
+                *({**m, "created_at": created_at} for m in item.messages),
+                {"role": "assistant", "content": reply, "created_at": created_at},
+            ],
+            first_token_ms=first_token_ms or duration,
+        )
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            await self._flush()
+
+    async def _flush(self):
+        runs, self._pending = self._pending, []
+        experiment = self.experiment
+        experiment.elapsed = round(time.perf_counter() - self._started, 3)
+        experiment.runs_per_second = round(
+            experiment.completed / experiment.elapsed if experiment.elapsed else 0.0, 1
+        )
+        snapshot = experiment.copy()
+        # A cancelled caller cannot stop the write thread, so writes are
+        # tracked and shielded until they finish.
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, runs, snapshot))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+        await asyncio.shield(write)
+        if self.on_progress is not None:
+            self.on_progress(snapshot)
+
+    async def _finish(self):
+        # Earlier progress snapshots must not land after the final status.
+        await asyncio.gather(*self._writes, return_exceptions=True)
+        await self._flush()
+
+    def _write(self, runs: list[Run], experiment: Experiment):
+        if runs:
+            self.store.add_many(runs, batch_size=len(runs))
+        self.store.save_experiment(experiment)
+
+
+async def run_experiment(
+    dataset: list[DatasetItem], models: list[str], **options
+) -> Experiment:
+    return await BatchRunner(dataset, models, **options).run()
+
+
+def _rate_limit(value: str) -> tuple[str, float]:
+    model, _, per_minute = value.rpartition("=")
+    if not model:
+        raise argparse.ArgumentTypeError("expected MODEL=REQUESTS_PER_MINUTE")
+    return model, float(per_minute)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dataset", help="JSONL file of prompts, - for stdin")
+    parser.add_argument("--model", dest="models", action="append", required=True)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument(
+        "--rpm", type=_rate_limit, action="append", default=[], metavar="MODEL=N"
+    )
+    parser.add_argument("--experiment", help="experiment id, generated by default")
+    args = parser.parse_args()
+    if args.dataset == "-":
+        dataset = parse_dataset(sys.stdin)
+    else:
+        with open(args.dataset, encoding="utf-8") as f:
+            dataset = parse_dataset(f)
+
+    def progress(experiment: Experiment):
+        print(
+            f"\r  {experiment.completed}/{experiment.total} runs, "
+            f"{experiment.failed} failed, {experiment.runs_per_second:,.1f} runs/s",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    experiment = asyncio.run(
+        run_experiment(
+            dataset,
+            args.models,
+            experiment_id=args.experiment,
+            concurrency=args.concurrency,
+            rate_limits=dict(args.rpm),
+            dataset_name=args.dataset,
+            on_progress=progress,
+        )
+    )
+    print(file=sys.stderr)
+    print(
+        f"{experiment.id}: {experiment.completed} runs, {experiment.failed} failed "
+        f"in {experiment.elapsed:.1f}s ({experiment.runs_per_second:,.1f} runs/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
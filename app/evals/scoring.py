@@ -0,0 +1,252 @@
+"""Scores runs with automatic evaluators, reusing earlier results.
+
+Each score is stored with the evaluator's version and a hash of the run's
+input, output and expected answer. Re-scoring skips runs whose key is
+unchanged, reuses the score of any run with an identical output, and only
+computes what is left: local evaluators in a process pool, judge models as
+concurrent requests.
+
+Usage::
+
+    python -m app.evals.scoring [--evaluator exact --evaluator json ...]
+        [--tag exp-...] [--processes 4] [--follow]
+
+``--follow`` keeps running and scores runs as they are created or changed.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from app.evals.evaluators import (
+    EVALUATORS,
+    Evaluator,
+    ScoringInput,
+    output_hash,
+)
+from app.llm.providers import ProviderError
+from app.store.events import get_run_events
+from app.store.models import Run
+from app.store.run_store import RunStore, get_run_store
+
+DEFAULT_EVALUATORS = ("exact", "regex", "json", "embedding")
+SCORE_BATCH_SIZE = 1000
+POOL_CHUNK_SIZE = 100
+JUDGE_CONCURRENCY = 8
+FOLLOW_INTERVAL = 1.0
+
+# Stands in for the score of a judge request that failed, so that run is
+# left unscored and retried next time instead of caching a non-answer.
+_FAILED = object()
+
+
+@dataclass
+class ScoringReport:
+    runs: int = 0
+    computed: int = 0
+    reused: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.runs} runs: {self.computed} scores computed, {self.reused} "
+            f"reused, {self.unchanged} unchanged, {self.failed} failed "
+            f"in {self.seconds:.1f}s"
+        )
+
+
+def _scoring_input(run: Run) -> ScoringInput:
+    return ScoringInput(run.id, run.input_text, run.output_text, run.expected)
+
+
+class ScoringEngine:
+    def __init__(
+        self,
+        evaluators: list[Evaluator],
+        store: RunStore | None = None,
+        processes: int | None = None,
+        judge_concurrency: int = JUDGE_CONCURRENCY,
+    ):
+        self.evaluators = evaluators
+        self.store = store if store is not None else get_run_store()
+        self.processes = processes
+        self.report = ScoringReport()
+        self._judges = asyncio.Semaphore(judge_concurrency)
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the parent may be a threaded server.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def score_runs(self, runs: list[Run]) -> ScoringReport:
+        started = time.perf_counter()
+        items = [_scoring_input(run) for run in runs]
+        hashes = {item.run_id: output_hash(item) for item in items}
+        self.report.runs += len(items)
+        for evaluator in self.evaluators:
+            rows = await self._score(evaluator, items, hashes)
+            await asyncio.to_thread(self.store.save_scores, rows)
+        self.report.seconds += time.perf_counter() - started
+        return self.report
+
+    async def _score(
+        self, evaluator: Evaluator, items: list[ScoringInput], hashes: dict[str, str]
+    ) -> list[tuple]:
+        name, version = evaluator.name, evaluator.cache_version
+        keys = await asyncio.to_thread(
+            self.store.score_keys, name, [item.run_id for item in items]
+        )
+        stale = [i for i in items if keys.get(i.run_id) != (version, hashes[i.run_id])]
+        self.report.unchanged += len(items) - len(stale)
+        cached = await asyncio.to_thread(
+            self.store.cached_scores,
+            name,
+            version,
+            list({hashes[item.run_id] for item in stale}),
+        )
+        todo = {}
+        for item in stale:
+            if hashes[item.run_id] not in cached:
+                todo.setdefault(hashes[item.run_id], item)
+        if todo:
+            scores = await self._compute(evaluator, list(todo.values()))
+            cached.update(
+                (output, score)
+                for output, score in zip(todo, scores)
+                if score is not _FAILED
+            )
+        rows = []
+        for item in stale:
+            output = hashes[item.run_id]
+            if output not in cached:
+                self.report.failed += 1
+                continue
+            if output in todo and todo.pop(output) is item:
+                self.report.computed += 1
+            else:
+                self.report.reused += 1
+            rows.append((item.run_id, name, version, output, cached[output]))
+        return rows
+
+    async def _compute(self, evaluator: Evaluator, items: list[ScoringInput]) -> list:
+        """Scores for ``items`` in order, ``_FAILED`` where a judge call failed."""
+        if evaluator.remote:
+            return await asyncio.gather(
+                *(self._judge(evaluator, item) for item in items)
+            )
+        loop = asyncio.get_running_loop()
+        chunks = [
+            items[start : start + POOL_CHUNK_SIZE]
+            for start in range(0, len(items), POOL_CHUNK_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(self.pool, evaluator.score_many, chunk)
+                for chunk in chunks
+            )
+        )
+        return [score for chunk in results for score in chunk]
+
+    async def _judge(self, evaluator: Evaluator, item: ScoringInput):
+        async with self._judges:
+            try:
+                return await evaluator.score_async(item)
+            except ProviderError:
+                return _FAILED
+
+    async def score_all(
+        self, batch_size: int = SCORE_BATCH_SIZE, **filters
+    ) -> ScoringReport:
+        """Score every run matching ``filters``, newest first."""
+        runs = self.store.iter_runs(batch_size, transcripts=False, **filters)
+        while batch := await asyncio.to_thread(_take, runs, batch_size):
+            await self.score_runs(batch)
+        return self.report
+
+    async def follow(self, on_batch=None):
+        """Score runs as they are created or changed, until cancelled."""
+        async for events in get_run_events().batches(FOLLOW_INTERVAL):
+            run_ids = {
+                run_id
+                for event in events
+                if event["kind"] in ("created", "updated")
+                for run_id in event["run_ids"]
+            }
+            if not run_ids:
+                continue
+            runs = await asyncio.to_thread(self.store.get_many, sorted(run_ids), False)
+            await self.score_runs(runs)
+            if on_batch is not None:
+                on_batch(self.report)
+
+
+def _take(iterator, count: int) -> list:
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) >= count:
+            break
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--evaluator",
+        dest="evaluators",
+        action="append",
+        choices=sorted(EVALUATORS),
+        help=f"default: {', '.join(DEFAULT_EVALUATORS)}",
+    )
+    parser.add_argument("--judge-model", default=None)
+    parser.add_argument("--tag", help="only score runs with this tag")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--follow", action="store_true")
+    args = parser.parse_args()
+    evaluators = []
+    for name in args.evaluators or DEFAULT_EVALUATORS:
+        if name == "judge" and args.judge_model:
+            evaluators.append(EVALUATORS[name](args.judge_model))
+        else:
+            evaluators.append(EVALUATORS[name]())
+
+    def progress(report: ScoringReport):
+        print(f"\r  {report.summary()}", end="", file=sys.stderr, flush=True)
+
+    async def run():
+        engine = ScoringEngine(evaluators, processes=args.processes)
+        try:
+            await engine.score_all(tag=args.tag)
+            progress(engine.report)
+            if args.follow:
+                await engine.follow(progress)
+        finally:
+            engine.close()
+        return engine.report
+
+    try:
+        report = asyncio.run(run())
+    except KeyboardInterrupt:
+        return
+    print(file=sys.stderr)
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
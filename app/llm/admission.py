@@ -0,0 +1,110 @@
+"""Admission control for chat requests in one backend worker.
+
+Every chat request passes through :meth:`AdmissionController.admit` before
+it reaches a provider. At most ``MAX_IN_FLIGHT_PER_MODEL`` requests per
+model run at once; others wait in a queue bounded by ``MAX_PENDING_REQUESTS``
+across all models and are turned away with :class:`Overloaded` when it is
+full or when they have waited ``QUEUE_TIMEOUT`` seconds. A session has one
+generation at a time: starting another cancels the one still running.
+"""
+
+import asyncio
+import contextlib
+import os
+from collections.abc import AsyncIterator
+
+from app.llm.providers import ProviderError
+
+MAX_PENDING_REQUESTS = int(os.environ.get("MAX_PENDING_REQUESTS", "64"))
+MAX_IN_FLIGHT_PER_MODEL = int(os.environ.get("MAX_IN_FLIGHT_PER_MODEL", "8"))
+QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", "30"))
+RETRY_AFTER = 5
+
+
+class Overloaded(ProviderError):
+    """The request was not admitted; the client should retry later."""
+
+    def __init__(self, message: str, retry_after: int = RETRY_AFTER):
+        super().__init__(message, status_code=429)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_pending: int = MAX_PENDING_REQUESTS,
+        max_in_flight: int = MAX_IN_FLIGHT_PER_MODEL,
+        queue_timeout: float = QUEUE_TIMEOUT,
+    ):
+        self.max_pending = max_pending
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._pending = 0
+        self._models: dict[str, asyncio.Semaphore] = {}
+        self._sessions: dict[str, asyncio.Task] = {}
+
+    async def supersede(self, session: str):
+        """Cancel the session's running generation and make this task current.
+
+        Waits for the cancelled generation to finish cleaning up, so the
+        caller never interleaves its messages with the previous turn.
+        """
+        task = asyncio.current_task()
+        previous = self._sessions.get(session)
+        self._sessions[session] = task
+        if previous is not None and previous is not task and not previous.done():
+            previous.cancel()
+            await asyncio.wait({previous})
+
+    def release(self, session: str):
+        """Forget the session's generation if it is the calling task."""
+        if self._sessions.get(session) is asyncio.current_task():
+            del self._sessions[session]
+
+    def cancel(self, session: str) -> bool:
+        task = self._sessions.pop(session, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def waiting(self, model: str) -> bool:
+        """Whether a request for ``model`` would have to queue right now."""
+        semaphore = self._models.get(model)
+        return semaphore is not None and semaphore.locked()
+
+    @contextlib.asynccontextmanager
+    async def admit(self, model: str) -> AsyncIterator[None]:
+        """Hold one of ``model``'s in-flight slots, queueing for it if needed."""
+        semaphore = self._models.setdefault(
+            model, asyncio.Semaphore(self.max_in_flight)
+        )
+        if not semaphore.locked():
+            await semaphore.acquire()
+        else:
+            # Only requests waiting for a slot count as pending.
+            if self._pending >= self.max_pending:
+                raise Overloaded(f"{self._pending} requests are already queued")
+            self._pending += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+            except TimeoutError:
+                raise Overloaded(
+                    f"{model} stayed busy for {self.queue_timeout:.0f}s"
+                ) from None
+            finally:
+                self._pending -= 1
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+_admission: AdmissionController | None = None
+
+
+def get_admission() -> AdmissionController:
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController()
+    return _admission
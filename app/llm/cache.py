@@ -0,0 +1,126 @@
+"""Cache of chat completions for prompts that were already answered.
+
+Responses are keyed by model, message history and request parameters, with
+whitespace in message contents normalized so trivially different resends
+still hit. Lookups go through a size-bounded in-memory LRU and then an
+SQLite file shared by every worker process; entries in both tiers expire
+after ``RESPONSE_CACHE_TTL`` seconds. Only successful replies are stored.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", "response_cache.db")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "86400"))
+PURGE_INTERVAL = 60.0
+
+CachedResponse = namedtuple(
+    "CachedResponse", "reply prompt_tokens completion_tokens created"
+)
+
+_CREATE_RESPONSES = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    reply TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    created REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def cache_key(model: str, messages: list[dict[str, str]], **params) -> str:
+    normalized = [[m["role"], " ".join(m["content"].split())] for m in messages]
+    text = json.dumps([model, normalized, params], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        size: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+    ):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self._memory: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._purged = 0.0
+        with self._conn:
+            self._conn.execute(_CREATE_RESPONSES)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> CachedResponse | None:
+        expired = time.time() - self.ttl
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None and response.created < expired:
+                del self._memory[key]
+                response = None
+            if response is not None:
+                self._memory.move_to_end(key)
+        if response is None:
+            row = self._conn.execute(
+                "SELECT reply, prompt_tokens, completion_tokens, created "
+                "FROM responses WHERE key = ? AND created >= ?",
+                (key, expired),
+            ).fetchone()
+            if row is not None:
+                response = CachedResponse(*row)
+                self._remember(key, response)
+        return response
+
+    def put(self, key: str, reply: str, prompt_tokens: int, completion_tokens: int):
+        response = CachedResponse(reply, prompt_tokens, completion_tokens, time.time())
+        self._remember(key, response)
+        conn = self._conn
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, *response),
+            )
+            if response.created - self._purged >= PURGE_INTERVAL:
+                self._purged = response.created
+                conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (response.created - self.ttl,),
+                )
+
+    def _remember(self, key: str, response: CachedResponse):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,96 @@
+"""Keeps a chat's model context within a per-model token budget.
+
+The context is the run of most recent messages whose token count fits the
+model's window less a reserve for the reply. When a new message pushes it
+over, the oldest messages are evicted one at a time. With the
+``"summarize"`` strategy each evicted message is folded into a short
+extractive summary that is sent ahead of the remaining messages; with
+``"truncate"`` it is simply dropped. Eviction is incremental, so each turn
+costs the same however long the conversation has been running.
+"""
+
+import os
+
+from app.llm.pricing import lookup_model
+from app.llm.tokenizer import (
+    REPLY_PRIMING_TOKENS,
+    count_message_tokens,
+    count_tokens,
+    encoding_for_model,
+)
+
+CONTEXT_STRATEGY = os.environ.get("CONTEXT_STRATEGY", "summarize")
+# Caps every model's budget, for example to bound the cost of long chats.
+MAX_CONTEXT_TOKENS = int(os.environ.get("MAX_CONTEXT_TOKENS", "0"))
+DEFAULT_CONTEXT_WINDOW = 8192
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "claude-3": 200000,
+    "stub-": 4096,
+}
+REPLY_TOKEN_RESERVE = 1024
+SUMMARY_TOKENS = 256
+SUMMARY_WORDS_PER_MESSAGE = 24
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+
+def context_window(model: str) -> int:
+    return lookup_model(CONTEXT_WINDOWS, model, DEFAULT_CONTEXT_WINDOW)
+
+
+def context_budget(model: str, strategy: str = CONTEXT_STRATEGY) -> int:
+    """Tokens available to the context messages of one request."""
+    budget = context_window(model) - REPLY_TOKEN_RESERVE - REPLY_PRIMING_TOKENS
+    if MAX_CONTEXT_TOKENS:
+        budget = min(budget, MAX_CONTEXT_TOKENS)
+    if strategy == "summarize":
+        budget -= SUMMARY_TOKENS
+    return max(budget, 0)
+
+
+def _summarize(summary: str, message: dict[str, str], model: str) -> str:
+    words = message["content"].split()
+    line = " ".join(words[:SUMMARY_WORDS_PER_MESSAGE])
+    if len(words) > SUMMARY_WORDS_PER_MESSAGE:
+        line += " ..."
+    lines = [*summary.splitlines(), f"{message['role']}: {line}"]
+    # Keep the most recent lines that fit, so the summary stays bounded.
+    encoding = encoding_for_model(model)
+    while len(lines) > 1 and count_tokens("\n".join(lines), encoding) > SUMMARY_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def fit_context(
+    model: str,
+    messages: list[dict[str, str]],
+    tokens: int,
+    summary: str = "",
+    strategy: str = CONTEXT_STRATEGY,
+) -> tuple[list[dict[str, str]], int, str]:
+    """Evict the oldest of ``messages`` until their ``tokens`` fit the budget.
+
+    Returns the kept messages, their token count and the updated summary.
+    The newest message is always kept.
+    """
+    budget = context_budget(model, strategy)
+    evicted = 0
+    while tokens > budget and evicted < len(messages) - 1:
+        message = messages[evicted]
+        tokens -= count_message_tokens(model, message)
+        if strategy == "summarize":
+            summary = _summarize(summary, message, model)
+        evicted += 1
+    return messages[evicted:], tokens, summary
+
+
+def context_prompt(
+    messages: list[dict[str, str]], summary: str = ""
+) -> list[dict[str, str]]:
+    """The messages to send: the summary, if any, then the kept messages."""
+    if not summary:
+        return list(messages)
+    return [{"role": "system", "content": f"{SUMMARY_PREFIX}\n{summary}"}, *messages]
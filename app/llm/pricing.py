@@ -0,0 +1,46 @@
+import dataclasses
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass(frozen=True)
+class ModelPrice:
+    input_per_1k: float
+    output_per_1k: float
+
+
+DEFAULT_PRICE = ModelPrice(0.002, 0.002)
+MODEL_PRICES = {
+    "gpt-4o-mini": ModelPrice(0.00015, 0.0006),
+    "gpt-4o": ModelPrice(0.0025, 0.01),
+    "gpt-4-turbo": ModelPrice(0.01, 0.03),
+    "gpt-4": ModelPrice(0.03, 0.06),
+    "gpt-3.5-turbo": ModelPrice(0.0005, 0.0015),
+    "claude-3-opus": ModelPrice(0.015, 0.075),
+    "claude-3-sonnet": ModelPrice(0.003, 0.015),
+    "claude-3-haiku": ModelPrice(0.00025, 0.00125),
+    "stub-": ModelPrice(0.0, 0.0),
+}
+
+
+def lookup_model(table: dict[str, T], model: str, default: T) -> T:
+    """Exact match first, then the longest key of ``table`` prefixing ``model``."""
+    if model in table:
+        return table[model]
+    matches = [name for name in table if model.startswith(name)]
+    if not matches:
+        return default
+    return table[max(matches, key=len)]
+
+
+def price_for(model: str) -> ModelPrice:
+    return lookup_model(MODEL_PRICES, model, DEFAULT_PRICE)
+
+
+def completion_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price = price_for(model)
+    return (
+        prompt_tokens / 1000 * price.input_per_1k
+        + completion_tokens / 1000 * price.output_per_1k
+    )
@@ -0,0 +1,269 @@
+import asyncio
+import dataclasses
+import json
+import os
+import random
+import re
+from collections.abc import AsyncIterator
+
+import httpx
+
+SIMULATED_MODEL = "gpt-3.5-turbo-sim"
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+@dataclasses.dataclass
+class ProviderConfig:
+    name: str
+    base_url: str = ""
+    api_key: str = ""
+    models: list[str] = dataclasses.field(default_factory=list)
+    max_concurrency: int = 8
+    timeout: float = 60.0
+    connect_timeout: float = 5.0
+    max_retries: int = 3
+    backoff: float = 0.5
+    requests_per_minute: float = 0.0
+
+    @classmethod
+    def from_env(cls, name: str) -> "ProviderConfig":
+        prefix = f"LLM_{name.upper()}_"
+
+        def env(key: str, default: str = "") -> str:
+            return os.environ.get(prefix + key, default)
+
+        return cls(
+            name=name,
+            base_url=env("BASE_URL"),
+            api_key=env("API_KEY"),
+            models=[m.strip() for m in env("MODELS").split(",") if m.strip()],
+            max_concurrency=int(env("MAX_CONCURRENCY", "8")),
+            timeout=float(env("TIMEOUT", "60")),
+            connect_timeout=float(env("CONNECT_TIMEOUT", "5")),
+            max_retries=int(env("MAX_RETRIES", "3")),
+            backoff=float(env("BACKOFF", "0.5")),
+            requests_per_minute=float(env("REQUESTS_PER_MINUTE", "0")),
+        )
+
+
+@dataclasses.dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Provider:
+    """A chat model backend.
+
+    ``stream_chat`` yields text deltas as they arrive, followed by a single
+    ``Usage`` once the provider has reported token counts.
+    """
+
+    def __init__(self, config: ProviderConfig):
+        self.config = config
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        return self._semaphore
+
+    def stream_chat(
+        self, model: str, messages: list[dict[str, str]], **params
+    ) -> AsyncIterator[str | Usage]:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class SimulatedProvider(Provider):
+    """Offline provider that echoes the prompt back, one word at a time.
+
+    It reports no ``Usage``, so callers fall back to the local tokenizer.
+    """
+
+    async def stream_chat(self, model, messages, **params):
+        prompt = messages[-1]["content"] if messages else ""
+        reply = f"I received your message: '{prompt}'. This is a simulated response from the ChatState."
+        tokens = re.findall(r"\S+\s*", reply)
+        async with self.semaphore:
+            await asyncio.sleep(0.3)
+            for token in tokens:
+                await asyncio.sleep(0.02)
+                yield token
+
+
+class OpenAICompatibleProvider(Provider):
+    """Streams chat completions from an OpenAI-compatible HTTP endpoint.
+
+    One pooled keep-alive ``httpx.AsyncClient`` is shared by all requests to
+    the provider, and at most ``max_concurrency`` requests are in flight.
+    Connection errors and retryable statuses are retried with exponential
+    backoff until the first byte of the response arrives; errors after that,
+    including malformed chunks, are raised as ``ProviderError``.
+    """
+
+    def __init__(self, config: ProviderConfig):
+        super().__init__(config)
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {}
+            if self.config.api_key:
+                headers["Authorization"] = f"Bearer {self.config.api_key}"
+            self._client = httpx.AsyncClient(
+                base_url=self.config.base_url,
+                headers=headers,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_concurrency,
+                    max_keepalive_connections=self.config.max_concurrency,
+                ),
+                timeout=httpx.Timeout(
+                    self.config.timeout, connect=self.config.connect_timeout
+                ),
+            )
+        return self._client
+
+    async def stream_chat(self, model, messages, **params):
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": m["role"], "content": m["content"]} for m in messages
+            ],
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            **params,
+        }
+        usage = None
+        async with self.semaphore:
+            response = await self._open_stream(payload)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = self._parse_chunk(data)
+                    if chunk.get("usage"):
+                        usage = Usage(
+                            prompt_tokens=chunk["usage"].get("prompt_tokens", 0),
+                            completion_tokens=chunk["usage"].get(
+                                "completion_tokens", 0
+                            ),
+                        )
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+            except httpx.HTTPError as exc:
+                raise ProviderError(f"{self.config.name}: {exc!r}") from exc
+            finally:
+                await response.aclose()
+        if usage is not None:
+            yield usage
+
+    def _parse_chunk(self, data: str) -> dict:
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            chunk = None
+        if not isinstance(chunk, dict):
+            raise ProviderError(f"{self.config.name}: malformed chunk {data[:200]!r}")
+        return chunk
+
+    async def _open_stream(self, payload: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                request = self.client.build_request(
+                    "POST", "/chat/completions", json=payload
+                )
+                response = await self.client.send(request, stream=True)
+            except httpx.TransportError as exc:
+                error = ProviderError(f"{self.config.name}: {exc!r}")
+            else:
+                if response.status_code < 400:
+                    return response
+                body = (await response.aread()).decode(errors="replace")
+                await response.aclose()
+                error = ProviderError(
+                    f"{self.config.name}: HTTP {response.status_code} {body[:200]}",
+                    response.status_code,
+                )
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise error
+                retry_after = response.headers.get("retry-after")
+            if attempt >= self.config.max_retries:
+                raise error
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        delay = self.config.backoff * 2**attempt
+        return delay + random.uniform(0, delay)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_providers: dict[str, Provider] | None = None
+_model_providers: dict[str, Provider] = {}
+
+
+def _load_providers() -> dict[str, Provider]:
+    global _providers
+    if _providers is None:
+        names = [
+            n.strip()
+            for n in os.environ.get("LLM_PROVIDERS", "").split(",")
+            if n.strip()
+        ]
+        providers = {}
+        for name in names:
+            config = ProviderConfig.from_env(name)
+            providers[name] = OpenAICompatibleProvider(config)
+            for model in config.models:
+                _model_providers.setdefault(model, providers[name])
+        if not providers:
+            config = ProviderConfig(name="simulated", models=[SIMULATED_MODEL])
+            providers["simulated"] = SimulatedProvider(config)
+            _model_providers[SIMULATED_MODEL] = providers["simulated"]
+        _providers = providers
+    return _providers
+
+
+def available_models() -> list[str]:
+    _load_providers()
+    return list(_model_providers)
+
+
+def get_provider(model: str) -> Provider:
+    _load_providers()
+    provider = _model_providers.get(model)
+    if provider is None:
+        msg = f"No LLM provider is configured for model {model!r}"
+        raise ProviderError(msg)
+    return provider
@@ -0,0 +1,147 @@
+"""Local OpenAI-compatible chat completions server for offline load testing.
+
+Run it with ``python -m app.llm.stub_server --port 8001`` and point a
+provider at it::
+
+    LLM_PROVIDERS=stub
+    LLM_STUB_BASE_URL=http://127.0.0.1:8001/v1
+    LLM_STUB_MODELS=stub-small,stub-large
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+import zlib
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+FIRST_TOKEN_DELAY = float(os.environ.get("STUB_FIRST_TOKEN_DELAY", "0.2"))
+TOKEN_DELAY = float(os.environ.get("STUB_TOKEN_DELAY", "0.01"))
+ERROR_RATE = float(os.environ.get("STUB_ERROR_RATE", "0"))
+MODELS = os.environ.get("STUB_MODELS", "stub-small,stub-large").split(",")
+# Requests whose system message contains this marker are answered with a
+# grade, as the LLM judge evaluator asks for.
+JUDGE_MARKER = os.environ.get("STUB_JUDGE_MARKER", "Score: <1-10>")
+
+
+def _count_tokens(text: str) -> int:
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def _reply_for(messages: list[dict]) -> str:
+    prompt = messages[-1]["content"] if messages else ""
+    if messages and JUDGE_MARKER in messages[0].get("content", ""):
+        # Deterministic grade so judge scores are stable across runs.
+        return f"Score: {zlib.crc32(prompt.encode()) % 10 + 1}"
+    return f"Stub reply to: {prompt}"
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish: str | None = None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < ERROR_RATE:
+        return JSONResponse(
+            {"error": {"message": "stub overloaded", "type": "server_error"}},
+            status_code=503,
+        )
+    model = body.get("model", MODELS[0])
+    messages = body.get("messages", [])
+    reply = _reply_for(messages)
+    usage = {
+        "prompt_tokens": sum(_count_tokens(m.get("content", "")) for m in messages),
+        "completion_tokens": _count_tokens(reply),
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    if not body.get("stream"):
+        await asyncio.sleep(
+            FIRST_TOKEN_DELAY + TOKEN_DELAY * usage["completion_tokens"]
+        )
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def events():
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        yield f"data: {json.dumps(_chunk(completion_id, model, {'role': 'assistant'}))}\n\n"
+        for token in re.findall(r"\S+\s*", reply):
+            await asyncio.sleep(TOKEN_DELAY)
+            chunk = _chunk(completion_id, model, {"content": token})
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield f"data: {json.dumps(_chunk(completion_id, model, {}, 'stop'))}\n\n"
+        if include_usage:
+            chunk = {**_chunk(completion_id, model, {}), "choices": [], "usage": usage}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def list_models(request: Request):
+    return JSONResponse(
+        {
+            "object": "list",
+            "data": [{"id": m, "object": "model", "owned_by": "stub"} for m in MODELS],
+        }
+    )
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/models", list_models),
+    ]
+)
+
+
+def main():
+    from granian import Granian
+    from granian.constants import Interfaces
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    Granian(
+        "app.llm.stub_server:app",
+        address=args.host,
+        port=args.port,
+        workers=args.workers,
+        interface=Interfaces.ASGI,
+    ).serve()
+
+
+if __name__ == "__main__":
+    main()
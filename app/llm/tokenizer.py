@@ -0,0 +1,107 @@
+"""Token counting with per-model BPE encodings loaded from local files.
+
+Encodings are read lazily from ``TOKENIZER_DIR/<encoding>.tiktoken`` (the
+tiktoken rank file format) the first time a model that uses them is
+counted. When ``tiktoken`` is not installed or the file is missing, counts
+fall back to a word/punctuation approximation. Per-message counts are kept
+in an LRU cache so earlier turns of a conversation are never re-tokenized.
+"""
+
+import functools
+import os
+import re
+import threading
+
+TOKENIZER_DIR = os.environ.get("TOKENIZER_DIR", "tokenizers")
+TOKEN_CACHE_SIZE = 65536
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+DEFAULT_ENCODING = "cl100k_base"
+
+_ENCODING_SPECS = {
+    "cl100k_base": {
+        "pat_str": r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s""",
+        "special_tokens": {
+            "<|endoftext|>": 100257,
+            "<|fim_prefix|>": 100258,
+            "<|fim_middle|>": 100259,
+            "<|fim_suffix|>": 100260,
+            "<|endofprompt|>": 100276,
+        },
+    },
+    "o200k_base": {
+        "pat_str": (
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?"""
+            r"""|[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?"""
+            r"""|\p{N}{1,3}"""
+            r"""| ?[^\s\p{L}\p{N}]+[\r\n/]*"""
+            r"""|\s*[\r\n]+"""
+            r"""|\s+(?!\S)"""
+            r"""|\s+"""
+        ),
+        "special_tokens": {"<|endoftext|>": 199999, "<|endofprompt|>": 200018},
+    },
+}
+_MODEL_ENCODINGS = [
+    ("gpt-4o", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+]
+_APPROXIMATE_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+_encodings: dict[str, object | None] = {}
+_encodings_lock = threading.Lock()
+
+
+def encoding_for_model(model: str) -> str:
+    for prefix, encoding in _MODEL_ENCODINGS:
+        if model.startswith(prefix):
+            return encoding
+    return DEFAULT_ENCODING
+
+
+def _load_encoding(name: str):
+    with _encodings_lock:
+        if name in _encodings:
+            return _encodings[name]
+        encoding = None
+        path = os.path.join(TOKENIZER_DIR, f"{name}.tiktoken")
+        spec = _ENCODING_SPECS.get(name)
+        if spec is not None and os.path.exists(path):
+            try:
+                import tiktoken
+                from tiktoken.load import load_tiktoken_bpe
+            except ImportError:
+                pass
+            else:
+                encoding = tiktoken.Encoding(
+                    name=name,
+                    pat_str=spec["pat_str"],
+                    mergeable_ranks=load_tiktoken_bpe(path),
+                    special_tokens=spec["special_tokens"],
+                )
+        _encodings[name] = encoding
+        return encoding
+
+
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    tokenizer = _load_encoding(encoding)
+    if tokenizer is None:
+        return len(_APPROXIMATE_TOKEN.findall(text))
+    return len(tokenizer.encode_ordinary(text))
+
+
+def count_message_tokens(model: str, message: dict[str, str]) -> int:
+    encoding = encoding_for_model(model)
+    return (
+        MESSAGE_OVERHEAD_TOKENS
+        + count_tokens(message.get("role", ""), encoding)
+        + count_tokens(message.get("content", ""), encoding)
+    )
+
+
+def count_prompt_tokens(model: str, messages: list[dict[str, str]]) -> int:
+    return REPLY_PRIMING_TOKENS + sum(count_message_tokens(model, m) for m in messages)
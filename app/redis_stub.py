@@ -0,0 +1,36 @@
+"""In-process Redis stand-in for running several workers locally.
+
+Needs the ``fakeredis`` package. Start it, then point the app at it::
+
+    python -m app.redis_stub --port 6379
+    REDIS_URL=redis://127.0.0.1:6379 reflex run --env prod
+
+Reflex runs one backend worker per CPU when Redis is configured (override
+with ``GRANIAN_WORKERS``). Sessions, locks and run events all go through
+this server, and runs are shared through the SQLite file at
+``RUN_STORE_PATH``. Data lives in memory and is lost when it stops.
+"""
+
+import argparse
+
+
+def main():
+    from fakeredis import TcpFakeServer
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = TcpFakeServer((args.host, args.port), server_type="redis")
+    server.daemon_threads = True
+    print(f"Redis stand-in listening on redis://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
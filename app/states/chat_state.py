@@ -1,6 +1,31 @@
 import reflex as rx
 import asyncio
 import datetime
+import time
+import uuid
+from app.llm.admission import Overloaded, get_admission
+from app.llm.cache import RESPONSE_CACHE_ENABLED, cache_key, get_response_cache
+from app.llm.context import context_prompt, fit_context
+from app.llm.pricing import completion_cost
+from app.llm.providers import (
+    ProviderError,
+    Usage,
+    available_models,
+    get_provider,
+)
+from app.llm.tokenizer import (
+    count_message_tokens,
+    count_prompt_tokens,
+    count_tokens,
+    encoding_for_model,
+)
+from app.store.models import Run
+from app.store.run_store import get_run_store
+
+STREAM_FLUSH_INTERVAL = 0.05
+MESSAGE_WINDOW = 40
+OLDER_PAGE_SIZE = 20
+SCROLL_TO_BOTTOM = "var el = document.getElementById('chat-scroll-area'); if(el) el.scrollTop = el.scrollHeight;"
 
 
 class Message(rx.Base):
@@ -9,43 +34,376 @@ class Message(rx.Base):
     created_at: str
 
 
+class ModelReply(rx.Base):
+    """One model's answer to a prompt sent to several models at once."""
+
+    model: str
+    content: str = ""
+    status: str = "pending"
+    duration: int = 0
+    first_token_ms: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+
+async def _stream_reply(reply: ModelReply, messages: list[dict[str, str]]):
+    """Stream ``reply.model``'s answer into ``reply`` as it arrives."""
+    model = reply.model
+    usage = None
+    started = time.perf_counter()
+    try:
+        async with get_admission().admit(model):
+            started = time.perf_counter()
+            reply.status = "streaming"
+            async for event in get_provider(model).stream_chat(model, messages):
+                if isinstance(event, Usage):
+                    usage = event
+                    continue
+                if not reply.first_token_ms:
+                    reply.first_token_ms = int((time.perf_counter() - started) * 1000)
+                reply.content += event
+        reply.status = "success"
+    except Overloaded as exc:
+        reply.status = "rejected"
+        reply.content = f"[Busy: {exc}. Retry in {exc.retry_after}s.]"
+        return
+    except ProviderError as exc:
+        reply.status = "error"
+        reply.content += f"\n[Error: {exc}]" if reply.content else f"[Error: {exc}]"
+    reply.duration = int((time.perf_counter() - started) * 1000)
+    if usage is None:
+        usage = Usage(
+            prompt_tokens=count_prompt_tokens(model, messages),
+            completion_tokens=count_tokens(reply.content, encoding_for_model(model)),
+        )
+    reply.prompt_tokens = usage.prompt_tokens
+    reply.completion_tokens = usage.completion_tokens
+    reply.cost = round(
+        completion_cost(model, usage.prompt_tokens, usage.completion_tokens), 6
+    )
+
+
 class ChatState(rx.State):
-    messages: list[Message] = []
+    """One chat session.
+
+    ``messages`` holds only the most recent ``MESSAGE_WINDOW`` messages shown
+    on screen; earlier ones are paged back in from the session's stored
+    transcript on request. What is sent to the model is tracked separately
+    in ``_context`` and kept within the model's token budget. The reply
+    being streamed lives in ``streaming_reply`` until it completes, so each
+    flush sends one string rather than the message list.
+
+    Generations run as background tasks through the process's admission
+    controller, so sending again or pressing Stop cancels the one in
+    progress, and requests the server cannot take are turned away.
+    """
+
+    messages: list[Message] = rx.field(default_factory=list)
+    streaming_reply: str = ""
+    is_streaming: bool = False
+    is_queued: bool = False
+    has_older: bool = False
+    model: str = ""
+    models: list[str] = rx.field(default_factory=list)
+    session_id: str = ""
+    use_cache: bool = RESPONSE_CACHE_ENABLED
+    compare_mode: bool = False
+    compare_models: list[str] = rx.field(default_factory=list)
+    compare_prompt: str = ""
+    model_replies: list[ModelReply] = rx.field(default_factory=list)
+    _compare_run_ids: list[str] = rx.field(default_factory=list)
+    _first_position: int = 0
+    _context: list[dict[str, str]] = rx.field(default_factory=list)
+    _context_tokens: int = 0
+    _summary: str = ""
+
+    def _ensure_model(self):
+        if not self.models:
+            self.models = available_models()
+        if self.model not in self.models:
+            self.model = self.models[0]
+
+    @rx.event
+    def on_load(self):
+        self._ensure_model()
+
+    @rx.event
+    def set_model(self, model: str):
+        self.model = model
+        self._context_tokens = sum(
+            count_message_tokens(model, m) for m in self._context
+        )
+        self._fit_context()
+
+    def _add_to_context(self, role: str, content: str):
+        message = {"role": role, "content": content}
+        self._context.append(message)
+        self._context_tokens += count_message_tokens(self.model, message)
+        self._fit_context()
+
+    def _fit_context(self):
+        self._context, self._context_tokens, self._summary = fit_context(
+            self.model, self._context, self._context_tokens, self._summary
+        )
+
+    def _trim_window(self):
+        excess = len(self.messages) - MESSAGE_WINDOW
+        if excess > 0:
+            self.messages = self.messages[excess:]
+            self._first_position += excess
+            self.has_older = True
+
+    @rx.event
+    def load_older(self):
+        if not self.has_older:
+            return
+        older = get_run_store().messages(
+            f"chat_{self.session_id}", self._first_position, OLDER_PAGE_SIZE
+        )
+        self.messages = [Message(**m) for m in older] + self.messages
+        self._first_position -= len(older)
+        self.has_older = self._first_position > 0 and bool(older)
 
     @rx.event
+    def set_use_cache(self, value: bool):
+        self.use_cache = value
+
+    @rx.event
+    def set_compare_mode(self, value: bool):
+        self.compare_mode = value
+        if value and not self.compare_models:
+            self._ensure_model()
+            self.compare_models = [self.model]
+
+    @rx.event
+    def toggle_compare_model(self, model: str, checked: bool):
+        if checked and model not in self.compare_models:
+            self.compare_models.append(model)
+        elif not checked and model in self.compare_models:
+            self.compare_models.remove(model)
+
+    def _model_prompt(self, model: str) -> list[dict[str, str]]:
+        """The conversation so far, fitted to ``model``'s own budget."""
+        tokens = sum(count_message_tokens(model, m) for m in self._context)
+        messages, _, summary = fit_context(model, self._context, tokens, self._summary)
+        return context_prompt(messages, summary)
+
+    async def _fan_out(self, content: str):
+        """Send one prompt to every model in ``compare_models`` concurrently.
+
+        Replies stream into ``model_replies`` side by side; the turn takes as
+        long as the slowest model. Each answered reply is stored as its own
+        run, all tagged with one comparison group id.
+        """
+        created_at = datetime.datetime.now().strftime("%H:%M")
+        group = f"cmp-{uuid.uuid4().hex[:8]}"
+        async with self:
+            self._ensure_model()
+            self._context.append({"role": "user", "content": content})
+            replies = [ModelReply(model=model) for model in self.compare_models]
+            prompts = [self._model_prompt(reply.model) for reply in replies]
+            self._context.pop()
+            self.compare_prompt = content
+            self.model_replies = list(replies)
+            self._compare_run_ids = []
+            self.is_streaming = True
+        gathered = asyncio.ensure_future(
+            asyncio.gather(
+                *(
+                    _stream_reply(reply, prompt)
+                    for reply, prompt in zip(replies, prompts)
+                )
+            )
+        )
+        try:
+            while not gathered.done():
+                await asyncio.wait({gathered}, timeout=STREAM_FLUSH_INTERVAL)
+                async with self:
+                    self.model_replies = list(replies)
+            gathered.result()
+        finally:
+            gathered.cancel()
+            async with self:
+                self.model_replies = list(replies)
+                self.is_streaming = False
+        runs = [
+            Run(
+                id=f"{group}-{index}",
+                timestamp=int(time.time()),
+                status=reply.status,
+                duration=reply.duration,
+                tokens=reply.prompt_tokens + reply.completion_tokens,
+                cost=reply.cost,
+                model=reply.model,
+                input_text=content,
+                output_text=reply.content,
+                tags=["playground", group],
+                transcript=[
+                    {"role": "user", "content": content, "created_at": created_at},
+                    {
+                        "role": "assistant",
+                        "content": reply.content,
+                        "created_at": created_at,
+                    },
+                ],
+                first_token_ms=reply.first_token_ms or reply.duration,
+            )
+            for index, reply in enumerate(replies)
+            if reply.status != "rejected"
+        ]
+        get_run_store().add_many(runs)
+        async with self:
+            self._compare_run_ids = [run.id for run in runs]
+
+    @rx.event
+    async def open_comparison(self):
+        from app.states.evaluation_state import EVALUATIONS_ROUTE, EvaluationState
+
+        eval_state = await self.get_state(EvaluationState)
+        eval_state.show_comparison(self._compare_run_ids)
+        return rx.redirect(EVALUATIONS_ROUTE)
+
+    @rx.event(background=True)
     async def send_message(self, form_data: dict):
         message_content = form_data.get("message", "").strip()
         if not message_content:
             return
-        current_time = datetime.datetime.now().strftime("%H:%M")
-        user_msg = Message(
-            role="user", content=message_content, created_at=current_time
-        )
-        self.messages.append(user_msg)
-        yield rx.call_script(
-            "var el = document.getElementById('chat-scroll-area'); if(el) el.scrollTop = el.scrollHeight;"
-        )
-        yield
-        await asyncio.sleep(0.8)
-        bot_time = datetime.datetime.now().strftime("%H:%M")
-        bot_msg = Message(
-            role="assistant",
-            content=f"I received your message: '{user_msg.content}'. This is a simulated response from the ChatState.",
-            created_at=bot_time,
-        )
-        self.messages.append(bot_msg)
+        async with self:
+            token = self.router.session.client_token
+            compare = self.compare_mode and bool(self.compare_models)
+        admission = get_admission()
+        await admission.supersede(token)
+        try:
+            if compare:
+                await self._fan_out(message_content)
+            else:
+                async for update in self._chat_turn(message_content):
+                    yield update
+        except Overloaded as exc:
+            async with self:
+                self.is_queued = False
+                self.is_streaming = False
+            yield rx.toast.warning(
+                f"The server is busy ({exc}). Try again in {exc.retry_after}s."
+            )
+        finally:
+            admission.release(token)
+
+    @rx.event
+    def stop_generation(self):
+        get_admission().cancel(self.router.session.client_token)
+        self.is_queued = False
+
+    async def _chat_turn(self, message_content: str):
+        admission = get_admission()
+        async with self:
+            self._ensure_model()
+            model = self.model
+            self.is_queued = admission.waiting(model)
+        async with admission.admit(model):
+            async with self:
+                self.is_queued = False
+                self.messages.append(
+                    Message(
+                        role="user",
+                        content=message_content,
+                        created_at=datetime.datetime.now().strftime("%H:%M"),
+                    )
+                )
+                self._add_to_context("user", message_content)
+                history = context_prompt(self._context, self._summary)
+                if not self.session_id:
+                    self.session_id = uuid.uuid4().hex[:12]
+                session_id = self.session_id
+                use_cache = self.use_cache
+                self.streaming_reply = ""
+                self.is_streaming = True
+            prompt_tokens = count_prompt_tokens(model, history)
+            started = time.perf_counter()
+            reply_created_at = datetime.datetime.now().strftime("%H:%M")
+            yield rx.call_script(SCROLL_TO_BOTTOM)
+            key = cache_key(model, history) if use_cache else None
+            hit = get_response_cache().get(key) if key else None
+            first_token_ms = None
+            chunks = []
+            usage = None
+            status = "success"
+            last_flush = time.perf_counter()
+            try:
+                if hit is not None:
+                    first_token_ms = int((time.perf_counter() - started) * 1000)
+                    chunks.append(hit.reply)
+                    usage = Usage(hit.prompt_tokens, hit.completion_tokens)
+                else:
+                    async for event in get_provider(model).stream_chat(model, history):
+                        if isinstance(event, Usage):
+                            usage = event
+                            continue
+                        if first_token_ms is None:
+                            first_token_ms = int((time.perf_counter() - started) * 1000)
+                        chunks.append(event)
+                        if time.perf_counter() - last_flush >= STREAM_FLUSH_INTERVAL:
+                            async with self:
+                                self.streaming_reply = "".join(chunks)
+                            last_flush = time.perf_counter()
+            except ProviderError as exc:
+                status = "error"
+                chunks.append(f"\n[Error: {exc}]" if chunks else f"[Error: {exc}]")
+            except asyncio.CancelledError:
+                # Superseded or stopped: keep what arrived so the transcript
+                # still alternates between user and assistant messages.
+                status = "cancelled"
+                chunks.append("\n[Stopped]" if chunks else "[Stopped]")
+        reply = "".join(chunks)
+        completion_tokens = count_tokens(reply, encoding_for_model(model))
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+        if key and hit is None and status == "success":
+            get_response_cache().put(key, reply, prompt_tokens, completion_tokens)
+        duration_ms = int((time.perf_counter() - started) * 1000)
         from app.states.evaluation_state import EvaluationState
 
-        eval_state = await self.get_state(EvaluationState)
-        transcript = [
-            {"role": m.role, "content": m.content, "created_at": m.created_at}
-            for m in self.messages
-        ]
-        eval_state.add_run_from_chat(transcript, model="gpt-3.5-turbo-sim")
-        yield rx.call_script(
-            "var el = document.getElementById('chat-scroll-area'); if(el) el.scrollTop = el.scrollHeight;"
-        )
+        async with self:
+            if self.session_id != session_id:
+                # The chat was cleared mid-turn; there is nothing to append to.
+                self.streaming_reply = ""
+                self.is_streaming = False
+                return
+            self.messages.append(
+                Message(role="assistant", content=reply, created_at=reply_created_at)
+            )
+            self.streaming_reply = ""
+            self._add_to_context("assistant", reply)
+            self.is_streaming = False
+            eval_state = await self.get_state(EvaluationState)
+            turn = [
+                {"role": m.role, "content": m.content, "created_at": m.created_at}
+                for m in self.messages[-2:]
+            ]
+            eval_state.add_run_from_chat(
+                turn,
+                model=model,
+                duration=duration_ms,
+                first_token_ms=first_token_ms or duration_ms,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                status=status,
+                session_id=self.session_id,
+                cached=hit is not None,
+            )
+            self._trim_window()
+        yield rx.call_script(SCROLL_TO_BOTTOM)
 
     @rx.event
     def clear_chat(self):
-        self.messages = []
\ No newline at end of file
+        get_admission().cancel(self.router.session.client_token)
+        self.is_queued = False
+        self.messages = []
+        self.has_older = False
+        self.session_id = ""
+        self._first_position = 0
+        self._context = []
+        self._context_tokens = 0
+        self._summary = ""
\ No newline at end of file
@@ -1,181 +1,483 @@
 import reflex as rx
 from typing import Any
+import asyncio
 import datetime
 import random
 import json
+import math
+import threading
+from urllib.parse import urlencode
+from reflex.utils import prerequisites
+from app.evals.compare import compare_cohorts, parse_cohort
+from app.llm.pricing import completion_cost
+from app.llm.tokenizer import count_prompt_tokens, count_tokens, encoding_for_model
+from app.store.events import get_run_events
+from app.store.models import Experiment, Run, RunFeedback
+from app.store.run_store import get_run_store
+from app.store.rollups import DAY, GRANULARITIES, HOUR, bucket_start
+from app.store.views import filtered_view, time_series
 
+PAGE_SIZE = 25
+PAGE_SIZES = [10, 25, 50, 100]
+TRANSCRIPT_CACHE_SIZE = 16
+CHART_RANGES = {
+    "24h": (HOUR, 24),
+    "7d": (HOUR, 7 * 24),
+    "30d": (DAY, 30),
+    "90d": (DAY, 90),
+    "all": (DAY, None),
+}
+EVALUATIONS_ROUTE = "/evaluations"
+LIVE_UPDATE_INTERVAL = 0.5
+EXPERIMENT_LIMIT = 5
+# Run fields shown in the table, summarized by the metric cards and bucketed
+# by the charts. Edits to anything else, such as feedback, reload none of them.
+TABLE_FIELDS = {"timestamp", "status", "duration", "model", "tokens", "cost", "cached"}
+METRIC_FIELDS = {"duration", "tokens", "cost", "turns", "cached_turns"}
+CHART_FIELDS = {"timestamp", "model", "status", "duration", "tokens", "cost"}
+SEARCHED_FIELDS = {"input_text", "output_text", "feedback_comment", "transcript"}
 
-class Run(rx.Base):
-    id: str
-    timestamp: str
-    status: str
-    duration: int
-    tokens: int
-    cost: float
-    model: str
-    input_text: str
-    output_text: str
-    tags: list[str]
-    transcript: list[dict[str, str]] = []
-    feedback_thumb: str = "none"
-    rating: int = 0
-    feedback_comment: str = ""
+
+def _generate_mock_data():
+    models = ["gpt-4-turbo", "gpt-3.5-turbo", "claude-3-opus"]
+    statuses = ["success", "success", "success", "error", "success"]
+    prompts = [
+        "Explain quantum computing",
+        "Write a python script for scraping",
+        "Summarize this article",
+        "Translate to Spanish",
+        "Debug this code snippet",
+    ]
+    mock_runs = []
+    for i in range(15):
+        status = random.choice(statuses)
+        model = random.choice(models)
+        tokens = random.randint(150, 2000)
+        duration = random.randint(500, 5000)
+        prompt_tokens = tokens // 3
+        cost = completion_cost(model, prompt_tokens, tokens - prompt_tokens)
+        prompt_text = prompts[i % len(prompts)]
+        response_text = "This is a simulated response content for the run..." * 3
+        transcript = [
+            {"role": "user", "content": prompt_text, "created_at": "10:00"},
+            {"role": "assistant", "content": response_text, "created_at": "10:01"},
+        ]
+        mock_runs.append(
+            Run(
+                id=f"run_{1000 + i}",
+                timestamp=int(
+                    (
+                        datetime.datetime.now() - datetime.timedelta(hours=i * 2)
+                    ).timestamp()
+                ),
+                status=status,
+                duration=duration,
+                tokens=tokens,
+                cost=round(cost, 4),
+                model=model,
+                input_text=prompt_text,
+                output_text=response_text,
+                tags=["production"] if i % 2 == 0 else ["test"],
+                transcript=transcript,
+                feedback_thumb=random.choice(["up", "down", "none"]),
+                rating=random.randint(0, 5),
+            )
+        )
+    return sorted(mock_runs, key=lambda x: x.timestamp, reverse=True)
+
+
+_seed_lock = threading.Lock()
+_seeded = False
+
+
+def _seed_demo_runs():
+    """Fill an empty store with demo runs, once per process.
+
+    The store is shared by every session and worker, and inserts skip ids
+    that already exist, so concurrent first loads cannot duplicate runs.
+    """
+    global _seeded
+    with _seed_lock:
+        if not _seeded:
+            store = get_run_store()
+            if store.is_empty():
+                store.add_many(reversed(_generate_mock_data()))
+            _seeded = True
+
+
+def _format_metric(metric: str, value: float) -> str:
+    if math.isnan(value):
+        return "-"
+    if metric == "cost":
+        return f"${value:.5f}"
+    if metric == "error":
+        return f"{value * 100:.2f}%"
+    if metric.startswith("score:"):
+        return f"{value:.3f}"
+    return f"{value:,.1f}"
+
+
+def _format_comparison(row: dict) -> dict[str, str]:
+    metric = row["metric"]
+    return {
+        "label": row["label"],
+        "a": _format_metric(metric, row["a_mean"]),
+        "b": _format_metric(metric, row["b_mean"]),
+        "counts": f"{row['a_count']:,} / {row['b_count']:,}",
+        "delta": "-"
+        if math.isnan(row["delta_pct"])
+        else f"{row['delta_pct']:+.1f}%",
+        "interval": f"[{_format_metric(metric, row['delta_low'])}, "
+        f"{_format_metric(metric, row['delta_high'])}]",
+        "significant": "yes" if row["significant"] else "",
+    }
 
 
 class EvaluationState(rx.State):
-    runs: list[Run] = []
+    filtered_runs: list[Run] = rx.field(default_factory=list)
+    total_runs: int = 0
+    average_latency: int = 0
+    latency_p95: int = 0
+    total_tokens: int = 0
+    total_cost: float = 0.0
+    cache_hit_rate: float = 0.0
+    chart_data: list[dict[str, str | int | float]] = rx.field(default_factory=list)
+    chart_range: str = "30d"
+    selected_runs_data: list[Run] = rx.field(default_factory=list)
+    page_size: int = PAGE_SIZE
+    page_number: int = 1
+    total_count: int = 0
+    has_next_page: bool = False
     search_query: str = ""
     status_filter: str = "All"
     model_filter: str = "All"
+    tag_filter: str = ""
     expanded_run_id: str = ""
-    selected_run_ids: list[str] = []
+    expanded_transcript: list[dict[str, str]] = rx.field(default_factory=list)
+    expanded_feedback: RunFeedback = RunFeedback()
+    expanded_scores: list[dict[str, str]] = rx.field(default_factory=list)
+    selected_run_ids: list[str] = rx.field(default_factory=list)
     is_comparison_open: bool = False
     new_tag_input: str = ""
     temp_comment: str = ""
+    export_format: str = "csv"
+    export_transcripts: bool = False
+    experiments: list[Experiment] = rx.field(default_factory=list)
+    cohort_options: list[str] = rx.field(default_factory=list)
+    cohort_a: str = ""
+    cohort_b: str = ""
+    cohort_rows: list[dict[str, str]] = rx.field(default_factory=list)
+    _page_cursors: list[tuple[int, int] | None] = rx.field(default_factory=lambda: [None])
+    _next_cursor: tuple[int, int] | None = None
+    new_runs: int = 0
+    _transcripts: dict[str, list[dict[str, str]]] = rx.field(default_factory=dict)
+    _watcher: int = 0
 
-    def _generate_mock_data(self):
-        models = ["gpt-4-turbo", "gpt-3.5-turbo", "claude-3-opus"]
-        statuses = ["success", "success", "success", "error", "success"]
-        prompts = [
-            "Explain quantum computing",
-            "Write a python script for scraping",
-            "Summarize this article",
-            "Translate to Spanish",
-            "Debug this code snippet",
-        ]
-        mock_runs = []
-        for i in range(15):
-            status = random.choice(statuses)
-            model = random.choice(models)
-            tokens = random.randint(150, 2000)
-            duration = random.randint(500, 5000)
-            cost = tokens / 1000 * (0.03 if "gpt-4" in model else 0.002)
-            prompt_text = prompts[i % len(prompts)]
-            response_text = "This is a simulated response content for the run..." * 3
-            transcript = [
-                {"role": "user", "content": prompt_text, "created_at": "10:00"},
-                {"role": "assistant", "content": response_text, "created_at": "10:01"},
-            ]
-            mock_runs.append(
-                Run(
-                    id=f"run_{1000 + i}",
-                    timestamp=(
-                        datetime.datetime.now() - datetime.timedelta(hours=i * 2)
-                    ).strftime("%Y-%m-%d %H:%M"),
-                    status=status,
-                    duration=duration,
-                    tokens=tokens,
-                    cost=round(cost, 4),
-                    model=model,
-                    input_text=prompt_text,
-                    output_text=response_text,
-                    tags=["production"] if i % 2 == 0 else ["test"],
-                    transcript=transcript,
-                    feedback_thumb=random.choice(["up", "down", "none"]),
-                    rating=random.randint(0, 5),
-                )
-            )
-        return sorted(mock_runs, key=lambda x: x.timestamp, reverse=True)
+    @rx.event
+    async def on_load(self):
+        _seed_demo_runs()
+        # The first columnar load reads every run, so it runs in a thread.
+        await asyncio.to_thread(get_run_store().columns)
+        self._transcripts = {}
+        self.experiments = get_run_store().experiments(EXPERIMENT_LIMIT)
+        self._refresh()
+        self._load_cohort_options()
+        return EvaluationState.watch_runs
+
+    @rx.event(background=True)
+    async def watch_runs(self):
+        """Apply runs created or edited in any session while the page is open.
+
+        Store events are collected for ``LIVE_UPDATE_INTERVAL`` and applied
+        in one state update, so a burst of chat completions or an import
+        costs a single delta per dashboard rather than one per run. Each
+        page load starts a new watcher and the previous one exits at its next
+        batch. Empty intervals only check that the client is still connected,
+        without taking the state lock.
+        """
+        async with self:
+            self._watcher += 1
+            watcher = self._watcher
+            token = self.router.session.client_token
+        namespace = prerequisites.get_and_validate_app().app.event_namespace
+        batches = get_run_events().batches(LIVE_UPDATE_INTERVAL)
+        try:
+            async for batch in batches:
+                if namespace is not None and token not in namespace.token_to_sid:
+                    return
+                if not batch:
+                    continue
+                # Catch the columnar table up with other workers' writes
+                # before taking the state lock.
+                await asyncio.to_thread(get_run_store().columns)
+                async with self:
+                    if (
+                        self._watcher != watcher
+                        or self.router.route_id != EVALUATIONS_ROUTE
+                    ):
+                        return
+                    self._apply_run_events(batch)
+        finally:
+            await batches.aclose()
+
+    def _apply_run_events(self, events: list[dict]):
+        progress = [e["experiment"] for e in events if e["kind"] == "experiment"]
+        if progress:
+            self._update_experiments(progress)
+        if any(
+            self.expanded_run_id in e["run_ids"]
+            for e in events
+            if e["kind"] == "scored"
+        ):
+            self._load_scores()
+        created = [i for e in events if e["kind"] == "created" for i in e["run_ids"]]
+        updated = {}
+        for event in events:
+            if event["kind"] == "updated":
+                for run_id in event["run_ids"]:
+                    updated.setdefault(run_id, set()).update(event["fields"])
+        if not created and not updated:
+            return
+        for run_id, fields in updated.items():
+            if "transcript" in fields:
+                self._transcripts.pop(run_id, None)
+        # Fields that decide which runs match the current filters.
+        filters = self._filters()
+        matched = {name for name in ("model", "status") if filters[name]}
+        if filters["tag"]:
+            matched.add("tags")
+        if filters["search"]:
+            matched |= SEARCHED_FIELDS
+        changed = set().union(*updated.values())
+        shown = {run.id for run in self.filtered_runs}.intersection(updated)
+        if (created and self.page_number == 1) or any(
+            not updated[run_id].isdisjoint(TABLE_FIELDS | matched) for run_id in shown
+        ):
+            self._load_runs()
+        elif created:
+            total_count = filtered_view(**self._filters()).total_count
+            self.new_runs += max(total_count - self.total_count, 0)
+            self.total_count = total_count
+        if self.expanded_run_id in updated:
+            run = get_run_store().get(self.expanded_run_id, transcripts=False)
+            self._patch_feedback(run)
+            if "transcript" in updated[self.expanded_run_id]:
+                self.expanded_transcript = self._transcript(self.expanded_run_id)
+        if created or not changed.isdisjoint(METRIC_FIELDS | matched):
+            self._load_metrics()
+        if created or not changed.isdisjoint(CHART_FIELDS | matched):
+            self._load_charts()
+
+    def _update_experiments(self, progress: list[dict]):
+        experiments = {e.id: e for e in self.experiments}
+        for values in progress:
+            experiments[values["id"]] = Experiment(**values)
+        self.experiments = sorted(
+            experiments.values(), key=lambda e: e.started, reverse=True
+        )[:EXPERIMENT_LIMIT]
 
     @rx.event
-    def on_load(self):
-        if not self.runs:
-            self.runs = self._generate_mock_data()
+    def show_new_runs(self):
+        self._reset_page()
 
-    @rx.var
-    def filtered_runs(self) -> list[Run]:
-        filtered = self.runs
-        if self.search_query:
-            q = self.search_query.lower()
-            filtered = [
-                r for r in filtered if q in r.id.lower() or q in r.input_text.lower()
-            ]
-        if self.status_filter != "All":
-            filtered = [
-                r for r in filtered if r.status.lower() == self.status_filter.lower()
-            ]
-        if self.model_filter != "All":
-            filtered = [r for r in filtered if r.model == self.model_filter]
-        return filtered
+    def _refresh(self):
+        self._load_runs()
+        self._load_metrics()
+        self._load_charts()
 
-    @rx.var
-    def total_runs(self) -> int:
-        return len(self.runs)
+    def _filters(self) -> dict[str, str | None]:
+        return {
+            "search": self.search_query or None,
+            "model": None if self.model_filter == "All" else self.model_filter,
+            "status": None if self.status_filter == "All" else self.status_filter,
+            "tag": self.tag_filter or None,
+        }
+
+    def _load_runs(self):
+        view = filtered_view(**self._filters())
+        runs, self._next_cursor = view.page(
+            self.page_size, before=self._page_cursors[-1]
+        )
+        self.filtered_runs = runs
+        self.has_next_page = self._next_cursor is not None
+        self.total_count = view.total_count
+        if self.page_number == 1:
+            self.new_runs = 0
+
+    def _reset_page(self):
+        self._page_cursors = [None]
+        self.page_number = 1
+        self._load_runs()
 
     @rx.var
-    def average_latency(self) -> int:
-        if not self.runs:
+    def page_start(self) -> int:
+        if not self.filtered_runs:
             return 0
-        return int(sum((r.duration for r in self.runs)) / len(self.runs))
+        return (self.page_number - 1) * self.page_size + 1
 
     @rx.var
-    def total_tokens(self) -> int:
-        return sum((r.tokens for r in self.runs))
+    def page_end(self) -> int:
+        return (self.page_number - 1) * self.page_size + len(self.filtered_runs)
 
-    @rx.var
-    def total_cost(self) -> float:
-        return round(sum((r.cost for r in self.runs)), 4)
+    @rx.event
+    def next_page(self):
+        if self.has_next_page:
+            self._page_cursors.append(self._next_cursor)
+            self.page_number += 1
+            self._load_runs()
+
+    @rx.event
+    def prev_page(self):
+        if self.page_number > 1:
+            self._page_cursors.pop()
+            self.page_number -= 1
+            self._load_runs()
+
+    @rx.event
+    def set_page_size(self, size: str):
+        self.page_size = int(size)
+        self._reset_page()
+
+    def _load_metrics(self):
+        summary = filtered_view(**self._filters()).summary()
+        self.total_runs = summary["count"]
+        self.average_latency = int(summary["average_duration"])
+        self.latency_p95 = round(summary["p95"])
+        self.total_tokens = summary["tokens"]
+        self.total_cost = round(summary["cost"], 4)
+        self.cache_hit_rate = (
+            round(summary["cached_turns"] * 100 / summary["turns"], 1)
+            if summary["turns"]
+            else 0.0
+        )
+
+    def _load_charts(self):
+        granularity, buckets = CHART_RANGES[self.chart_range]
+        start = end = None
+        if buckets is not None:
+            now = datetime.datetime.now()
+            step = GRANULARITIES[granularity][1]
+            start = bucket_start(now - step * (buckets - 1), granularity)
+            end = bucket_start(now, granularity)
+        self.chart_data = time_series(granularity, start, end, **self._filters())
+
+    @rx.event
+    def set_chart_range(self, chart_range: str):
+        self.chart_range = chart_range
+        self._load_charts()
 
     @rx.event
     def set_search_query(self, query: str):
         self.search_query = query
+        self._reset_page()
+        self._load_metrics()
+        self._load_charts()
 
     @rx.event
     def set_status_filter(self, status: str):
         self.status_filter = status
+        self._reset_page()
+        self._load_metrics()
+        self._load_charts()
 
     @rx.event
     def set_model_filter(self, model: str):
         self.model_filter = model
+        self._reset_page()
+        self._load_metrics()
+        self._load_charts()
+
+    @rx.event
+    def set_tag_filter(self, tag: str):
+        self.tag_filter = "" if tag == self.tag_filter else tag
+        self._reset_page()
+        self._load_metrics()
+        self._load_charts()
+
+    def _load_cohort_options(self):
+        store = get_run_store()
+        models = sorted(set(store.columns().interners["model"].values))
+        self.cohort_options = [
+            *(f"model:{model}" for model in models),
+            *(f"tag:{experiment.id}" for experiment in self.experiments),
+        ]
+        if len(self.cohort_options) >= 2 and not self.cohort_a:
+            self.cohort_a, self.cohort_b = self.cohort_options[:2]
+        self._load_comparison()
+
+    def _load_comparison(self):
+        if not self.cohort_a or not self.cohort_b:
+            self.cohort_rows = []
+            return
+        rows = compare_cohorts(
+            parse_cohort(self.cohort_a),
+            parse_cohort(self.cohort_b),
+            get_run_store().evaluators(),
+        )
+        self.cohort_rows = [_format_comparison(row) for row in rows]
+
+    @rx.event
+    def set_cohort_a(self, cohort: str):
+        self.cohort_a = cohort
+        self._load_comparison()
+
+    @rx.event
+    def set_cohort_b(self, cohort: str):
+        self.cohort_b = cohort
+        self._load_comparison()
+
+    @rx.event
+    def refresh_comparison(self):
+        self._load_cohort_options()
+
+    def _transcript(self, run_id: str) -> list[dict[str, str]]:
+        """Transcript of one run through a small per-session LRU."""
+        transcript = self._transcripts.pop(run_id, None)
+        if transcript is None:
+            transcript = get_run_store().transcripts([run_id]).get(run_id, [])
+        self._transcripts[run_id] = transcript
+        while len(self._transcripts) > TRANSCRIPT_CACHE_SIZE:
+            self._transcripts.pop(next(iter(self._transcripts)))
+        return transcript
 
     @rx.event
     def toggle_detail(self, run_id: str):
         if self.expanded_run_id == run_id:
             self.expanded_run_id = ""
-        else:
-            self.expanded_run_id = run_id
+            self.expanded_transcript = []
+            self.expanded_feedback = RunFeedback()
+            self.expanded_scores = []
+            return
+        run = get_run_store().get(run_id, transcripts=False)
+        if run is None:
+            return
+        self.expanded_run_id = run_id
+        self.expanded_transcript = self._transcript(run_id)
+        self.expanded_feedback = RunFeedback.from_run(run)
+        self._load_scores()
+
+    def _load_scores(self):
+        self.expanded_scores = [
+            {"evaluator": name, "score": "n/a" if score is None else f"{score:.2f}"}
+            for name, score in get_run_store().scores(self.expanded_run_id).items()
+        ]
 
     @rx.event
     def export_data(self):
-        data = [
-            {
-                "id": r.id,
-                "timestamp": r.timestamp,
-                "status": r.status,
-                "model": r.model,
-                "tokens": r.tokens,
-                "cost": r.cost,
-                "input": r.input_text,
-                "output": r.output_text,
-                "rating": r.rating,
-                "feedback": r.feedback_comment,
-                "tags": r.tags,
-            }
-            for r in self.runs
-        ]
-        json_str = json.dumps(data, indent=2)
-        return rx.download(data=json_str, filename="evaluation_runs.json")
+        params = {k: v for k, v in self._filters().items() if v is not None}
+        params["format"] = self.export_format
+        if self.export_transcripts:
+            params["transcripts"] = "1"
+        url = f"{rx.config.get_config().api_url}/api/runs/export?{urlencode(params)}"
+        return rx.call_script(f"window.location.assign({json.dumps(url)})")
 
-    @rx.var
-    def chart_data_latency(self) -> list[dict[str, str | int | float]]:
-        data = []
-        runs = self.filtered_runs
-        if not runs:
-            return []
-        sorted_runs = sorted(runs, key=lambda x: x.timestamp)
-        recent_runs = sorted_runs[-20:]
-        for r in recent_runs:
-            data.append({"name": r.id, "latency": r.duration, "tokens": r.tokens})
-        return data
+    @rx.event
+    def set_export_format(self, value: str):
+        self.export_format = value
 
-    @rx.var
-    def chart_data_daily_volume(self) -> list[dict[str, str | int | float]]:
-        counts = {}
-        for r in self.runs:
-            date_key = r.timestamp.split(" ")[0]
-            counts[date_key] = counts.get(date_key, 0) + 1
-        sorted_dates = sorted(counts.keys())
-        return [{"date": d, "runs": counts[d]} for d in sorted_dates]
+    @rx.event
+    def set_export_transcripts(self, value: bool):
+        self.export_transcripts = value
 
     @rx.event
     def toggle_run_selection(self, run_id: str, checked: bool):
@@ -185,81 +487,126 @@ class EvaluationState(rx.State):
         elif run_id in self.selected_run_ids:
             self.selected_run_ids.remove(run_id)
 
+    @rx.event
+    def show_comparison(self, run_ids: list[str]):
+        self.selected_run_ids = list(run_ids)
+        self.set_comparison_open(True)
+
     @rx.event
     def set_comparison_open(self, is_open: bool):
         self.is_comparison_open = is_open
+        if is_open:
+            self.selected_runs_data = get_run_store().get_many(
+                self.selected_run_ids, transcripts=False
+            )
 
-    @rx.var
-    def selected_runs_data(self) -> list[Run]:
-        return [r for r in self.runs if r.id in self.selected_run_ids]
+    def _patch_feedback(self, run: Run | None):
+        """Sync only the edited run's feedback fields to the client.
+
+        The table rows do not show feedback, so ``filtered_runs`` is left
+        untouched and the delta is the one small ``expanded_feedback`` var.
+        """
+        if run is not None and run.id == self.expanded_run_id:
+            self.expanded_feedback = RunFeedback.from_run(run)
 
     @rx.event
     def set_thumb_feedback(self, run_id: str, value: str):
-        for r in self.runs:
-            if r.id == run_id:
-                r.feedback_thumb = value
-                break
-        self.runs = self.runs
+        self._patch_feedback(get_run_store().update(run_id, feedback_thumb=value))
 
     @rx.event
     def set_rating(self, run_id: str, rating: int):
-        for r in self.runs:
-            if r.id == run_id:
-                r.rating = rating
-                break
-        self.runs = self.runs
+        self._patch_feedback(get_run_store().update(run_id, rating=rating))
 
     @rx.event
     def update_comment(self, run_id: str, comment: str):
-        for r in self.runs:
-            if r.id == run_id:
-                r.feedback_comment = comment
-                break
-        self.runs = self.runs
+        self._patch_feedback(get_run_store().update(run_id, feedback_comment=comment))
         yield rx.toast("Feedback updated")
 
     @rx.event
     def add_tag(self, run_id: str, tag: str):
         if not tag.strip():
             return
-        for r in self.runs:
-            if r.id == run_id:
-                if tag not in r.tags:
-                    r.tags.append(tag)
-                break
-        self.runs = self.runs
+        self._patch_feedback(get_run_store().add_tag(run_id, tag))
 
     @rx.event
     def remove_tag(self, run_id: str, tag: str):
-        for r in self.runs:
-            if r.id == run_id:
-                if tag in r.tags:
-                    r.tags.remove(tag)
-                break
-        self.runs = self.runs
+        self._patch_feedback(get_run_store().remove_tag(run_id, tag))
 
     @rx.event
-    def add_run_from_chat(self, transcript: list[dict], model: str):
-        input_text = transcript[0]["content"] if transcript else ""
+    def add_run_from_chat(
+        self,
+        transcript: list[dict],
+        model: str,
+        duration: int | None = None,
+        first_token_ms: int = 0,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+        status: str = "success",
+        session_id: str = "",
+        cached: bool = False,
+    ):
+        store = get_run_store()
         output_text = transcript[-1]["content"] if transcript else ""
-        full_text = " ".join([m["content"] for m in transcript])
-        tokens = len(full_text.split()) * 1.3
-        cost = tokens / 1000 * 0.002
-        new_run = Run(
-            id=f"run_{random.randint(10000, 99999)}",
-            timestamp=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-            status="success",
-            duration=random.randint(800, 2500),
-            tokens=int(tokens),
-            cost=round(cost, 5),
-            model=model,
-            input_text=input_text,
-            output_text=output_text,
-            tags=["chat-session"],
-            transcript=transcript,
-            feedback_thumb="none",
-            rating=0,
-            feedback_comment="",
+        if prompt_tokens is None:
+            prompt_tokens = count_prompt_tokens(
+                model, [m for m in transcript if m["role"] != "assistant"]
+            )
+        if completion_tokens is None:
+            completion_tokens = sum(
+                count_tokens(m["content"], encoding_for_model(model))
+                for m in transcript
+                if m["role"] == "assistant"
+            )
+        tokens = prompt_tokens + completion_tokens
+        cost = (
+            0.0 if cached else completion_cost(model, prompt_tokens, completion_tokens)
         )
-        self.runs.insert(0, new_run)
-        self.runs = self.runs
\ No newline at end of file
+        if duration is None:
+            duration = random.randint(800, 2500)
+        run_id = f"chat_{session_id}" if session_id else ""
+        if run_id and run_id in store:
+            # The session keeps the model it started with, so its cumulative
+            # tokens and cost stay in one model's rollups.
+            changes = {
+                "output_text": output_text,
+                "first_token_ms": first_token_ms,
+                "cached": cached,
+            }
+            if status != "success":
+                changes["status"] = status
+            store.append_messages(
+                run_id,
+                transcript,
+                increments={
+                    "duration": duration,
+                    "tokens": tokens,
+                    "cost": round(cost, 6),
+                    "turns": 1,
+                    "cached_turns": int(cached),
+                },
+                **changes,
+            )
+            self._transcripts.pop(run_id, None)
+        else:
+            while not run_id or run_id in store:
+                run_id = f"run_{random.randint(10000, 99999)}"
+            store.add(
+                Run(
+                    id=run_id,
+                    timestamp=int(datetime.datetime.now().timestamp()),
+                    status=status,
+                    duration=duration,
+                    tokens=tokens,
+                    cost=round(cost, 6),
+                    model=model,
+                    input_text=transcript[0]["content"] if transcript else "",
+                    output_text=output_text,
+                    tags=["chat-session"],
+                    transcript=transcript,
+                    feedback_thumb="none",
+                    rating=0,
+                    feedback_comment="",
+                    first_token_ms=first_token_ms,
+                    cached=cached,
+                )
+            )
\ No newline at end of file
@@ -0,0 +1,162 @@
+import json
+import math
+
+from app.store.models import Run
+
+SKETCH_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch with bounded relative error.
+
+    Values are counted into buckets whose bounds grow geometrically, so
+    quantile estimates are within ``accuracy`` of the true value and the
+    sketch can be merged and updated (including removals) in O(1).
+    """
+
+    def __init__(self, accuracy: float = SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        if value <= 0:
+            return 0
+        return max(1, math.ceil(math.log(value) / self._log_gamma))
+
+    def _value(self, key: int) -> float:
+        if key == 0:
+            return 0.0
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        key = self._key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+
+    def remove(self, value: float, count: int = 1):
+        key = self._key(value)
+        remaining = self.buckets.get(key, 0) - count
+        if remaining > 0:
+            self.buckets[key] = remaining
+        else:
+            self.buckets.pop(key, None)
+        self.count = max(0, self.count - count)
+
+    def merge(self, other: "QuantileSketch"):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.buckets))
+
+    def min(self) -> float:
+        return self._value(min(self.buckets)) if self.buckets else 0.0
+
+    def max(self) -> float:
+        return self._value(max(self.buckets)) if self.buckets else 0.0
+
+    def to_json(self) -> str:
+        return json.dumps({"accuracy": self.accuracy, "buckets": self.buckets})
+
+    @classmethod
+    def from_json(cls, data: str) -> "QuantileSketch":
+        payload = json.loads(data)
+        sketch = cls(payload["accuracy"])
+        for key, count in payload["buckets"].items():
+            sketch.buckets[int(key)] = count
+        sketch.count = sum(sketch.buckets.values())
+        return sketch
+
+
+class RunAggregates:
+    """Running totals over a set of runs, updated per inserted or edited run."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_sum = 0
+        self.tokens_sum = 0
+        self.cost_sum = 0.0
+        self.duration_min: int | None = None
+        self.duration_max: int | None = None
+        self.latency = QuantileSketch()
+
+    def add(self, run: Run):
+        self.count += 1
+        self.duration_sum += run.duration
+        self.tokens_sum += run.tokens
+        self.cost_sum += run.cost
+        if self.duration_min is None or run.duration < self.duration_min:
+            self.duration_min = run.duration
+        if self.duration_max is None or run.duration > self.duration_max:
+            self.duration_max = run.duration
+        self.latency.add(run.duration)
+
+    def remove(self, run: Run):
+        self.count -= 1
+        self.duration_sum -= run.duration
+        self.tokens_sum -= run.tokens
+        self.cost_sum -= run.cost
+        self.latency.remove(run.duration)
+        if not self.count:
+            self.duration_min = self.duration_max = None
+        else:
+            if run.duration == self.duration_min:
+                self.duration_min = round(self.latency.min())
+            if run.duration == self.duration_max:
+                self.duration_max = round(self.latency.max())
+
+    def merge(self, other: "RunAggregates"):
+        self.count += other.count
+        self.duration_sum += other.duration_sum
+        self.tokens_sum += other.tokens_sum
+        self.cost_sum += other.cost_sum
+        for bound in (other.duration_min, other.duration_max):
+            if bound is None:
+                continue
+            if self.duration_min is None or bound < self.duration_min:
+                self.duration_min = bound
+            if self.duration_max is None or bound > self.duration_max:
+                self.duration_max = bound
+        self.latency.merge(other.latency)
+
+    @property
+    def average_duration(self) -> float:
+        return self.duration_sum / self.count if self.count else 0.0
+
+    def to_row(self) -> tuple:
+        return (
+            self.count,
+            self.duration_sum,
+            self.tokens_sum,
+            self.cost_sum,
+            self.duration_min,
+            self.duration_max,
+            self.latency.to_json(),
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "RunAggregates":
+        aggregates = cls()
+        (
+            aggregates.count,
+            aggregates.duration_sum,
+            aggregates.tokens_sum,
+            aggregates.cost_sum,
+            aggregates.duration_min,
+            aggregates.duration_max,
+            sketch,
+        ) = row
+        aggregates.latency = QuantileSketch.from_json(sketch)
+        return aggregates
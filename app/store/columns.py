@@ -0,0 +1,234 @@
+"""Column-oriented in-memory copy of the run table.
+
+Numeric fields live in NumPy arrays and categorical fields (model, status,
+feedback and tags) are interned to small integer ids, so a run costs a few
+dozen bytes instead of a full :class:`Run` object. Filters produce boolean
+masks and aggregates reduce over them without touching Python objects.
+Free-text fields stay in SQLite and are loaded only for the rows shown.
+"""
+
+import itertools
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+_NUMERIC_COLUMNS = {
+    "seq": np.int64,
+    "timestamp": np.int64,
+    "duration": np.int64,
+    "tokens": np.int64,
+    "cost": np.float64,
+    "first_token_ms": np.int32,
+    "rating": np.int8,
+    "cached": np.int8,
+    "updated_version": np.int64,
+    "turns": np.int32,
+    "cached_turns": np.int32,
+}
+_INTERNED_COLUMNS = {"model": np.int16, "status": np.int16, "feedback_thumb": np.int8}
+LOADED_COLUMNS = (*_NUMERIC_COLUMNS, *_INTERNED_COLUMNS)
+
+
+class Interner:
+    """Maps repeated strings to dense integer ids."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def id(self, value: str) -> int:
+        found = self._ids.get(value)
+        if found is None:
+            found = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return found
+
+    def ids_matching(self, value: str, ignore_case: bool = False) -> list[int]:
+        if ignore_case:
+            value = value.lower()
+            return [i for i, v in enumerate(self.values) if v.lower() == value]
+        found = self._ids.get(value)
+        return [] if found is None else [found]
+
+
+class RunColumns:
+    """Append-mostly columnar table of runs ordered by insertion sequence."""
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.size = 0
+        self.ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.arrays = {
+            name: np.zeros(INITIAL_CAPACITY, dtype)
+            for name, dtype in {**_NUMERIC_COLUMNS, **_INTERNED_COLUMNS}.items()
+        }
+        self.interners = {name: Interner() for name in _INTERNED_COLUMNS}
+        self.tags = Interner()
+        self._tag_runs = np.zeros(0, np.int32)
+        self._tag_ids = np.zeros(0, np.int32)
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        capacity = len(self.arrays["seq"])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, array in self.arrays.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[: self.size] = array[: self.size]
+            self.arrays[name] = grown
+
+    def append(self, ids: list[str], tags: list[list[str]], values: dict[str, list]):
+        """Append runs given as parallel lists of ids, tags and column values."""
+        if any(run_id in self.index for run_id in ids):
+            keep = [i for i, run_id in enumerate(ids) if run_id not in self.index]
+            ids = [ids[i] for i in keep]
+            tags = [tags[i] for i in keep]
+            values = {
+                name: [column[i] for i in keep] for name, column in values.items()
+            }
+        if not ids:
+            return
+        self._reserve(len(ids))
+        start = self.size
+        stop = start + len(ids)
+        for name in _NUMERIC_COLUMNS:
+            self.arrays[name][start:stop] = values[name]
+        for name, interner in self.interners.items():
+            lookup = {value: interner.id(value) for value in set(values[name])}
+            self.arrays[name][start:stop] = [lookup[value] for value in values[name]]
+        self.index.update(zip(ids, range(start, stop)))
+        self.ids.extend(ids)
+        tag_runs = [start + i for i, run_tags in enumerate(tags) for _ in run_tags]
+        if tag_runs:
+            tag_ids = [self.tags.id(tag) for run_tags in tags for tag in run_tags]
+            self._tag_runs = np.concatenate(
+                [self._tag_runs, np.array(tag_runs, np.int32)]
+            )
+            self._tag_ids = np.concatenate([self._tag_ids, np.array(tag_ids, np.int32)])
+        self.size = stop
+
+    def patch(self, run_id: str, changes: dict):
+        """Overwrite fields of one run, ignoring columns that are not held."""
+        i = self.index.get(run_id)
+        if i is None:
+            return
+        for name, value in changes.items():
+            if name in _NUMERIC_COLUMNS:
+                self.arrays[name][i] = value
+            elif name in self.interners:
+                self.arrays[name][i] = self.interners[name].id(value)
+        if "tags" in changes:
+            keep = self._tag_runs != i
+            tag_ids = [self.tags.id(tag) for tag in changes["tags"]]
+            self._tag_runs = np.concatenate(
+                [self._tag_runs[keep], np.full(len(tag_ids), i, np.int32)]
+            )
+            self._tag_ids = np.concatenate(
+                [self._tag_ids[keep], np.array(tag_ids, np.int32)]
+            )
+
+    def column(self, name: str) -> np.ndarray:
+        return self.arrays[name][: self.size]
+
+    def tags_of(self, index: int) -> list[str]:
+        ids = self._tag_ids[self._tag_runs == index]
+        return [self.tags.values[i] for i in ids]
+
+    def mask(
+        self,
+        model: str | None = None,
+        status: str | None = None,
+        tag: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        seqs: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Boolean mask of the runs matching every given filter.
+
+        ``since`` is inclusive and ``until`` exclusive, both epoch seconds.
+        ``seqs`` restricts the mask to runs with those sequence numbers, for
+        example the matches of a full-text search.
+        """
+        mask = np.ones(self.size, bool)
+        for name, value in (("model", model), ("status", status)):
+            if value is not None:
+                ids = self.interners[name].ids_matching(
+                    value, ignore_case=name == "status"
+                )
+                mask &= np.isin(self.column(name), ids)
+        if tag is not None:
+            tagged = np.zeros(self.size, bool)
+            for tag_id in self.tags.ids_matching(tag):
+                tagged[self._tag_runs[self._tag_ids == tag_id]] = True
+            mask &= tagged
+        if since is not None:
+            mask &= self.column("timestamp") >= since
+        if until is not None:
+            mask &= self.column("timestamp") < until
+        if seqs is not None:
+            mask &= np.isin(self.column("seq"), seqs)
+        return mask
+
+    def series(self, mask: np.ndarray, edges: list[int]) -> list[dict[str, int | float]]:
+        """Summaries of the masked runs between each edge and the next.
+
+        Each summary has the run count, token and cost totals and latency
+        percentiles of the runs whose timestamp falls in that range.
+        """
+        timestamps = self.column("timestamp")[mask]
+        order = np.argsort(timestamps, kind="stable")
+        bounds = np.searchsorted(timestamps[order], edges)
+        durations = self.column("duration")[mask][order]
+        totals = {
+            name: np.concatenate(([0], np.cumsum(self.column(name)[mask][order])))
+            for name in ("tokens", "cost")
+        }
+        rows = []
+        for low, high in itertools.pairwise(bounds):
+            p50, p95, p99 = (
+                np.percentile(durations[low:high], [50, 95, 99])
+                if high > low
+                else (0.0, 0.0, 0.0)
+            )
+            rows.append(
+                {
+                    "count": int(high - low),
+                    "tokens": int(totals["tokens"][high] - totals["tokens"][low]),
+                    "cost": float(totals["cost"][high] - totals["cost"][low]),
+                    "p50": float(p50),
+                    "p95": float(p95),
+                    "p99": float(p99),
+                }
+            )
+        return rows
+
+    def summarize(self, mask: np.ndarray) -> dict[str, int | float]:
+        durations = self.column("duration")[mask]
+        if not len(durations):
+            return {
+                "count": 0,
+                "average_duration": 0.0,
+                "p50": 0.0,
+                "p95": 0.0,
+                "p99": 0.0,
+                "tokens": 0,
+                "cost": 0.0,
+                "turns": 0,
+                "cached_turns": 0,
+            }
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+        return {
+            "count": len(durations),
+            "average_duration": float(durations.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "tokens": int(self.column("tokens")[mask].sum()),
+            "cost": float(self.column("cost")[mask].sum()),
+            "turns": int(self.column("turns")[mask].sum()),
+            "cached_turns": int(self.column("cached_turns")[mask].sum()),
+        }
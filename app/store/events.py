@@ -0,0 +1,151 @@
+"""Run change notifications fanned out to every backend worker.
+
+The store publishes an event after each committed insert or update. With a
+Redis URL configured (the same one the Reflex state manager uses) events go
+through a Redis pub/sub channel, so subscribers in every worker process see
+writes made by any of them, including the bulk ingestion CLI. Without Redis
+they are delivered to subscribers in the current process only.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import threading
+from collections.abc import AsyncIterator, Iterator
+
+import reflex as rx
+
+RUN_EVENTS_CHANNEL = "runs:events"
+SUBSCRIBER_QUEUE_SIZE = 10000
+RECONNECT_DELAY = 1.0
+
+
+class RunEvents:
+    def __init__(self, redis_url: str | None = None):
+        self.redis_url = redis_url
+        self._subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listeners: dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    def publish(
+        self, kind: str, run_ids: list[str], version: int, fields: list[str] = ()
+    ):
+        """Announce that ``run_ids`` were ``"created"`` or ``"updated"``.
+
+        Updates name the run ``fields`` they changed, so subscribers can
+        ignore edits to fields they do not show. Safe to call from any
+        thread. Events are best effort: a Redis outage never fails the write
+        that triggered them.
+        """
+        if run_ids:
+            self._send(
+                {
+                    "kind": kind,
+                    "run_ids": run_ids,
+                    "version": version,
+                    "fields": list(fields),
+                    "pid": os.getpid(),
+                }
+            )
+
+    def publish_experiment(self, experiment: dict):
+        """Announce the progress of a batch evaluation."""
+        self._send({"kind": "experiment", "experiment": experiment, "pid": os.getpid()})
+
+    def _send(self, event: dict):
+        if self.redis_url is None:
+            self._deliver(event)
+            return
+        import redis
+
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self.redis_url)
+        try:
+            self._redis.publish(RUN_EVENTS_CHANNEL, json.dumps(event))
+        except redis.RedisError:
+            pass
+
+    def _deliver(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                self._discard(loop, queue)
+
+    def _discard(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard((loop, queue))
+
+    async def _listen(self):
+        import redis
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.redis_url)
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(RUN_EVENTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._deliver(json.loads(message["data"]))
+            except redis.RedisError:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    @contextlib.contextmanager
+    def _queue(self) -> Iterator[asyncio.Queue]:
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((loop, queue))
+            if self.redis_url is not None:
+                listener = self._listeners.get(loop)
+                if listener is None or listener.done():
+                    self._listeners[loop] = loop.create_task(self._listen())
+        try:
+            yield queue
+        finally:
+            self._discard(loop, queue)
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        """Yield every run event published from now on, in any worker."""
+        with self._queue() as queue:
+            while True:
+                yield await queue.get()
+
+    async def batches(self, interval: float) -> AsyncIterator[list[dict]]:
+        """Yield the events published during each ``interval`` seconds.
+
+        A batch is yielded every interval even when it is empty, so the
+        consumer gets a regular chance to check whether it should stop.
+        """
+        with self._queue() as queue:
+            while True:
+                await asyncio.sleep(interval)
+                batch = []
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                yield batch
+
+
+def _offer(queue: asyncio.Queue, event: dict):
+    # A subscriber that has fallen this far behind reloads from the store
+    # anyway, so dropping is preferable to unbounded growth.
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+_run_events: RunEvents | None = None
+_run_events_lock = threading.Lock()
+
+
+def get_run_events() -> RunEvents:
+    global _run_events
+    if _run_events is None:
+        with _run_events_lock:
+            if _run_events is None:
+                _run_events = RunEvents(rx.config.get_config().redis_url)
+    return _run_events
@@ -0,0 +1,169 @@
+"""Streaming exports of the run store.
+
+Each exporter is a generator of byte chunks that walks the store one keyset
+page at a time, so memory stays bounded by ``EXPORT_BATCH_SIZE`` rows no
+matter how many runs match. Parquet output needs the optional ``pyarrow``
+package; CSV and JSONL have no extra dependencies.
+"""
+
+import csv
+import io
+import json
+from collections import namedtuple
+from collections.abc import Iterator
+
+from app.store.models import Run
+from app.store.run_store import RunStore
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = [
+    "id",
+    "timestamp",
+    "status",
+    "model",
+    "duration",
+    "first_token_ms",
+    "tokens",
+    "cost",
+    "input_text",
+    "output_text",
+    "expected",
+    "cached",
+    "tags",
+    "feedback_thumb",
+    "rating",
+    "feedback_comment",
+]
+
+
+ExportFormat = namedtuple("ExportFormat", ["extension", "media_type", "writer"])
+
+
+def _row(run: Run, transcripts: bool) -> dict:
+    row = {column: getattr(run, column) for column in EXPORT_COLUMNS}
+    if transcripts:
+        row["transcript"] = run.transcript
+    return row
+
+
+def _batched(runs: Iterator[Run], transcripts: bool) -> Iterator[list[dict]]:
+    batch = []
+    for run in runs:
+        batch.append(_row(run, transcripts))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_jsonl(runs: Iterator[Run], transcripts: bool) -> Iterator[bytes]:
+    for batch in _batched(runs, transcripts):
+        yield "".join(json.dumps(row) + "\n" for row in batch).encode()
+
+
+def export_csv(runs: Iterator[Run], transcripts: bool) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    columns = EXPORT_COLUMNS + (["transcript"] if transcripts else [])
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for batch in _batched(runs, transcripts):
+        for row in batch:
+            row["tags"] = ",".join(row["tags"])
+            if transcripts:
+                row["transcript"] = json.dumps(row["transcript"])
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_parquet(runs: Iterator[Run], transcripts: bool) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = [
+        ("id", pa.string()),
+        ("timestamp", pa.timestamp("s")),
+        ("status", pa.string()),
+        ("model", pa.string()),
+        ("duration", pa.int64()),
+        ("first_token_ms", pa.int64()),
+        ("tokens", pa.int64()),
+        ("cost", pa.float64()),
+        ("input_text", pa.string()),
+        ("output_text", pa.string()),
+        ("expected", pa.string()),
+        ("cached", pa.bool_()),
+        ("tags", pa.list_(pa.string())),
+        ("feedback_thumb", pa.string()),
+        ("rating", pa.int64()),
+        ("feedback_comment", pa.string()),
+    ]
+    if transcripts:
+        message = pa.struct(
+            [
+                ("role", pa.string()),
+                ("content", pa.string()),
+                ("created_at", pa.string()),
+            ]
+        )
+        fields.append(("transcript", pa.list_(message)))
+    schema = pa.schema(fields)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in _batched(runs, transcripts):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("csv", "text/csv", export_csv),
+    "jsonl": ExportFormat("jsonl", "application/x-ndjson", export_jsonl),
+    "parquet": ExportFormat(
+        "parquet", "application/vnd.apache.parquet", export_parquet
+    ),
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_runs(
+    store: RunStore, format: str, transcripts: bool = False, **filters
+) -> Iterator[bytes]:
+    """Stream the runs matching ``filters`` as ``format`` byte chunks."""
+    runs = store.iter_runs(EXPORT_BATCH_SIZE, transcripts, **filters)
+    return EXPORT_FORMATS[format].writer(runs, transcripts)
@@ -0,0 +1,230 @@
+"""Bulk ingestion of historical runs from JSONL or CSV.
+
+Records are parsed and validated against :class:`Run` one at a time and
+written to the store in batches, so each transaction updates the search
+index and aggregates once for the whole batch. Input is consumed as a
+stream of lines and never held in memory as a whole.
+
+Usage::
+
+    python -m app.store.ingest runs.jsonl [more.csv ...] [--batch-size 2000]
+
+The CSV layout matches the export: ``tags`` is comma separated and
+``transcript`` is a JSON list of messages.
+"""
+
+import argparse
+import codecs
+import csv
+import datetime
+import json
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from app.store.models import Run
+from app.store.run_store import RunStore, get_run_store
+
+INGEST_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 20
+
+
+class IngestError(ValueError):
+    pass
+
+
+@dataclass
+class IngestReport:
+    received: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def runs_per_second(self) -> float:
+        return self.received / self.seconds if self.seconds else 0.0
+
+    def reject(self, line: int, error: Exception):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            message = " ".join(str(error).split())
+            self.errors.append(f"record {line}: {message}")
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "seconds": round(self.seconds, 3),
+            "runs_per_second": round(self.runs_per_second, 1),
+            "errors": self.errors,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.inserted} inserted, {self.duplicates} duplicates, "
+            f"{self.rejected} rejected in {self.seconds:.1f}s "
+            f"({self.runs_per_second:,.0f} runs/s)"
+        )
+
+
+def _normalize_timestamp(value) -> int:
+    """Epoch seconds from an epoch number or an ISO 8601 string."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.datetime.fromisoformat(str(value).strip()).timestamp())
+    except ValueError:
+        raise IngestError(f"invalid timestamp {value!r}") from None
+
+
+def validate_record(record: dict) -> Run:
+    """Build a :class:`Run` from a decoded record, raising ``ValueError``."""
+    if not isinstance(record, dict):
+        raise IngestError("expected an object")
+    if "timestamp" in record:
+        record = {**record, "timestamp": _normalize_timestamp(record["timestamp"])}
+    return Run(**record)
+
+
+def _csv_record(row: dict) -> dict:
+    record = {k: v for k, v in row.items() if k and v not in ("", None)}
+    tags = record.get("tags", "")
+    record["tags"] = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    if "transcript" in record:
+        try:
+            record["transcript"] = json.loads(record["transcript"])
+        except json.JSONDecodeError as e:
+            raise IngestError(f"invalid transcript JSON: {e}") from None
+    return record
+
+
+def parse_jsonl(lines: Iterable[str]) -> Iterator[tuple[int, dict | Exception]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, IngestError(f"invalid JSON: {e}")
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[tuple[int, dict | Exception]]:
+    for number, row in enumerate(csv.DictReader(lines), 1):
+        try:
+            yield number, _csv_record(row)
+        except IngestError as e:
+            yield number, e
+
+
+PARSERS = {"jsonl": parse_jsonl, "csv": parse_csv}
+
+
+def format_for(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+class Ingester:
+    """Validates parsed records and writes them to the store in batches."""
+
+    def __init__(
+        self, store: RunStore, batch_size: int = INGEST_BATCH_SIZE, on_batch=None
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.report = IngestReport()
+        self._batch: list[Run] = []
+        self._started = time.perf_counter()
+
+    def feed(self, records: Iterable[tuple[int, dict | Exception]]):
+        for number, record in records:
+            self.report.received += 1
+            if isinstance(record, Exception):
+                self.report.reject(number, record)
+                continue
+            try:
+                self._batch.append(validate_record(record))
+            except ValueError as e:
+                self.report.reject(number, e)
+                continue
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if self._batch:
+            inserted = self.store.add_many(self._batch, batch_size=len(self._batch))
+            self.report.inserted += inserted
+            self.report.duplicates += len(self._batch) - inserted
+            self._batch = []
+        self.report.seconds = time.perf_counter() - self._started
+        if self.on_batch is not None:
+            self.on_batch(self.report)
+
+    def finish(self) -> IngestReport:
+        self.flush()
+        return self.report
+
+
+class LineSplitter:
+    """Turns a stream of UTF-8 byte chunks into complete lines."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+
+    def feed(self, chunk: bytes) -> list[str]:
+        lines = (self._partial + self._decoder.decode(chunk)).split("\n")
+        self._partial = lines.pop()
+        return [line + "\n" for line in lines]
+
+    def close(self) -> list[str]:
+        rest = self._partial + self._decoder.decode(b"", final=True)
+        self._partial = ""
+        return [rest] if rest else []
+
+
+def ingest(
+    store: RunStore,
+    lines: Iterable[str],
+    format: str = "jsonl",
+    batch_size: int = INGEST_BATCH_SIZE,
+    on_batch=None,
+) -> IngestReport:
+    ingester = Ingester(store, batch_size, on_batch)
+    ingester.feed(PARSERS[format](lines))
+    return ingester.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="JSONL or CSV files, - for stdin")
+    parser.add_argument("--format", choices=sorted(PARSERS))
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+    store = get_run_store()
+
+    def progress(report: IngestReport):
+        print(f"\r  {report.summary()}", end="", file=sys.stderr, flush=True)
+
+    for path in args.paths:
+        format = args.format or format_for(path)
+        if path == "-":
+            report = ingest(store, sys.stdin, format, args.batch_size, progress)
+        else:
+            with open(path, newline="", encoding="utf-8") as f:
+                report = ingest(store, f, format, args.batch_size, progress)
+        print(file=sys.stderr)
+        print(f"{path}: {report.summary()}")
+        for error in report.errors:
+            print(f"  {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
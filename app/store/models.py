@@ -0,0 +1,59 @@
+import reflex as rx
+from pydantic.v1 import Field
+
+
+class Run(rx.Base):
+    id: str
+    timestamp: int
+    status: str
+    duration: int
+    tokens: int
+    cost: float
+    model: str
+    input_text: str
+    output_text: str
+    tags: list[str]
+    transcript: list[dict[str, str]] = Field(default_factory=list)
+    feedback_thumb: str = "none"
+    rating: int = 0
+    feedback_comment: str = ""
+    first_token_ms: int = 0
+    expected: str = ""
+    cached: bool = False
+
+
+class RunFeedback(rx.Base):
+    """The editable feedback fields of one run."""
+
+    run_id: str = ""
+    feedback_thumb: str = "none"
+    rating: int = 0
+    feedback_comment: str = ""
+    tags: list[str] = Field(default_factory=list)
+
+    @classmethod
+    def from_run(cls, run: Run) -> "RunFeedback":
+        return cls(
+            run_id=run.id,
+            feedback_thumb=run.feedback_thumb,
+            rating=run.rating,
+            feedback_comment=run.feedback_comment,
+            tags=run.tags,
+        )
+
+
+class Experiment(rx.Base):
+    """Progress of one batch evaluation of a dataset against some models."""
+
+    id: str
+    dataset: str = ""
+    models: list[str] = Field(default_factory=list)
+    status: str = "running"
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    tokens: int = 0
+    cost: float = 0.0
+    started: int = 0
+    elapsed: float = 0.0
+    runs_per_second: float = 0.0
@@ -0,0 +1,45 @@
+"""Hourly and daily time buckets for the run rollup table.
+
+Each rollup cell is a :class:`RunAggregates` for one bucket, model and
+status, so charts over any time range merge a handful of pre-aggregated
+cells instead of scanning runs.
+"""
+
+import datetime
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = {
+    HOUR: ("%Y-%m-%d %H:00", datetime.timedelta(hours=1)),
+    DAY: ("%Y-%m-%d", datetime.timedelta(days=1)),
+}
+
+
+def bucket_for(timestamp: int, granularity: str) -> str:
+    """Label of the local-time bucket containing an epoch-seconds timestamp."""
+    return bucket_start(datetime.datetime.fromtimestamp(timestamp), granularity)
+
+
+def bucket_start(moment: datetime.datetime, granularity: str) -> str:
+    return moment.strftime(GRANULARITIES[granularity][0])
+
+
+def bucket_range(first: str, last: str, granularity: str) -> list[str]:
+    """Every bucket label from ``first`` to ``last`` inclusive."""
+    fmt, step = GRANULARITIES[granularity]
+    moment = datetime.datetime.strptime(first, fmt)
+    end = datetime.datetime.strptime(last, fmt)
+    buckets = []
+    while moment <= end:
+        buckets.append(moment.strftime(fmt))
+        moment += step
+    return buckets
+
+
+def bucket_edges(buckets: list[str], granularity: str) -> list[int]:
+    """Epoch seconds at which each bucket starts, then where the last one ends."""
+    fmt, step = GRANULARITIES[granularity]
+    starts = [datetime.datetime.strptime(bucket, fmt) for bucket in buckets]
+    if starts:
+        starts.append(starts[-1] + step)
+    return [int(start.timestamp()) for start in starts]
@@ -0,0 +1,1002 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from app.store.aggregates import RunAggregates
+from app.store.columns import LOADED_COLUMNS, RunColumns
+from app.store.events import get_run_events
+from app.store.models import Experiment, Run
+from app.store.rollups import (
+    DAY,
+    GRANULARITIES,
+    bucket_edges,
+    bucket_for,
+    bucket_range,
+)
+from app.store.search import fts_terms
+
+RUN_STORE_PATH = os.environ.get("RUN_STORE_PATH", "runs.db")
+INSERT_BATCH_SIZE = 500
+SQLITE_MAX_PARAMS = 900
+SEARCH_CACHE_SIZE = 16
+# Search rows are keyed by the run's seq shifted left by this many bits: the
+# run's own fields at offset 0 and transcript message n at offset n + 1.
+SEARCH_ROWID_BITS = 20
+
+SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    timestamp INTEGER NOT NULL,
+    status TEXT NOT NULL COLLATE NOCASE,
+    duration INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    model TEXT NOT NULL,
+    input_text TEXT NOT NULL,
+    output_text TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    feedback_thumb TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    feedback_comment TEXT NOT NULL,
+    first_token_ms INTEGER NOT NULL DEFAULT 0,
+    expected TEXT NOT NULL DEFAULT '',
+    cached INTEGER NOT NULL DEFAULT 0,
+    updated_version INTEGER NOT NULL DEFAULT 0,
+    turns INTEGER NOT NULL DEFAULT 1,
+    cached_turns INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (model, timestamp);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, timestamp);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated_version);
+
+CREATE TABLE IF NOT EXISTS run_tags (
+    tag TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    PRIMARY KEY (tag, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS run_tags_run ON run_tags (run_id);
+
+CREATE TABLE IF NOT EXISTS run_messages (
+    run_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS run_aggregates (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    duration_sum INTEGER NOT NULL,
+    tokens_sum INTEGER NOT NULL,
+    cost_sum REAL NOT NULL,
+    duration_min INTEGER,
+    duration_max INTEGER,
+    latency_sketch TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL COLLATE NOCASE,
+    count INTEGER NOT NULL,
+    duration_sum INTEGER NOT NULL,
+    tokens_sum INTEGER NOT NULL,
+    cost_sum REAL NOT NULL,
+    duration_min INTEGER,
+    duration_max INTEGER,
+    latency_sketch TEXT NOT NULL,
+    PRIMARY KEY (granularity, bucket, model, status)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS run_search USING fts5(
+    run_id, input_text, output_text, transcript, comment,
+    tokenize = "unicode61 tokenchars '_'",
+    prefix = '2 3'
+);
+
+CREATE TABLE IF NOT EXISTS experiments (
+    id TEXT PRIMARY KEY,
+    started INTEGER NOT NULL,
+    progress TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS experiments_started ON experiments (started);
+
+CREATE TABLE IF NOT EXISTS run_scores (
+    run_id TEXT NOT NULL,
+    evaluator TEXT NOT NULL,
+    version TEXT NOT NULL,
+    output_hash TEXT NOT NULL,
+    score REAL,
+    PRIMARY KEY (run_id, evaluator)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS run_scores_cache
+    ON run_scores (evaluator, version, output_hash);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES
+    ('version', 0), ('scores_version', 0), ('turns', 0), ('cached_turns', 0);
+"""
+
+
+def _write_aggregates(conn: sqlite3.Connection, aggregates: RunAggregates):
+    conn.execute(
+        "INSERT OR REPLACE INTO run_aggregates VALUES ('all', ?, ?, ?, ?, ?, ?, ?)",
+        aggregates.to_row(),
+    )
+
+
+_RollupRow = namedtuple("_RollupRow", "timestamp model status duration tokens cost")
+
+_RUN_COLUMNS = (
+    "id",
+    "timestamp",
+    "status",
+    "duration",
+    "tokens",
+    "cost",
+    "model",
+    "input_text",
+    "output_text",
+    "tags",
+    "feedback_thumb",
+    "rating",
+    "feedback_comment",
+    "first_token_ms",
+    "expected",
+    "cached",
+)
+_JSON_COLUMNS = {"tags"}
+_SELECT_RUN = f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs"
+_QUALIFIED_COLUMNS = ", ".join(f"runs.{c}" for c in _RUN_COLUMNS)
+_INSERT_RUN = (
+    f"INSERT OR IGNORE INTO runs ({', '.join(_RUN_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _RUN_COLUMNS)})"
+)
+_INSERT_TAG = "INSERT OR IGNORE INTO run_tags (tag, run_id) VALUES (?, ?)"
+_DELETE_TAG = "DELETE FROM run_tags WHERE tag = ? AND run_id = ?"
+_INSERT_MESSAGE = (
+    "INSERT INTO run_messages (run_id, position, role, content, created_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+# The id is indexed whole and split at underscores, so that "1000" and
+# "run_1000" both find run_1000.
+_INDEX_RUNS = f"""
+INSERT INTO run_search (rowid, run_id, input_text, output_text, comment)
+SELECT seq << {SEARCH_ROWID_BITS}, id || ' ' || replace(id, '_', ' '),
+    input_text, output_text, feedback_comment
+FROM runs
+"""
+_INDEX_MESSAGES = f"""
+INSERT INTO run_search (rowid, transcript)
+SELECT (runs.seq << {SEARCH_ROWID_BITS}) + run_messages.position + 1, content
+FROM runs JOIN run_messages ON run_messages.run_id = runs.id
+"""
+_INDEX_RUN = f"{_INDEX_RUNS} WHERE id = ?"
+_INDEX_NEW_MESSAGES = f"{_INDEX_MESSAGES} WHERE runs.id = ? AND position >= ?"
+_UNINDEX_RUN = (
+    f"DELETE FROM run_search WHERE rowid = "
+    f"(SELECT seq << {SEARCH_ROWID_BITS} FROM runs WHERE id = ?)"
+)
+_UNINDEX_MESSAGES = (
+    f"DELETE FROM run_search WHERE rowid > ? << {SEARCH_ROWID_BITS} "
+    f"AND rowid < (? + 1) << {SEARCH_ROWID_BITS}"
+)
+_BUMP_VERSION = "UPDATE store_meta SET value = value + 1 WHERE key = 'version'"
+_BUMP_SCORES_VERSION = (
+    "UPDATE store_meta SET value = value + 1 WHERE key = 'scores_version'"
+)
+# Per-run counters whose totals are kept in store_meta under the same name.
+_COUNTED_COLUMNS = ("turns", "cached_turns")
+_ADD_TOTAL = (
+    "INSERT INTO store_meta (key, value) "
+    "SELECT ?, IFNULL(SUM({}), 0) FROM runs WHERE {} "
+    "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value"
+)
+_SUBTRACT_TOTAL = (
+    "UPDATE store_meta SET value = value - (SELECT {} FROM runs WHERE id = ?) "
+    "WHERE key = ?"
+)
+_SEARCHED_COLUMNS = {"input_text", "output_text", "feedback_comment"}
+_SELECT_TOTALS = (
+    "SELECT timestamp, model, status, duration, tokens, cost FROM runs WHERE id = ?"
+)
+_SELECT_ROLLUP = (
+    "SELECT count, duration_sum, tokens_sum, cost_sum, duration_min, duration_max, "
+    "latency_sketch FROM run_rollups "
+    "WHERE granularity = ? AND bucket = ? AND model = ? AND status = ?"
+)
+_UPSERT_ROLLUP = (
+    "INSERT OR REPLACE INTO run_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_ROLLUP = (
+    "DELETE FROM run_rollups "
+    "WHERE granularity = ? AND bucket = ? AND model = ? AND status = ?"
+)
+
+
+_SELECT_COLUMNS = f"SELECT id, tags, {', '.join(LOADED_COLUMNS)} FROM runs"
+COLUMN_LOAD_BATCH = 5000
+
+
+def _run_params(run: Run) -> tuple:
+    return tuple(
+        json.dumps(getattr(run, c)) if c in _JSON_COLUMNS else getattr(run, c)
+        for c in _RUN_COLUMNS
+    )
+
+
+def _column_batch(rows: list[tuple]) -> tuple[list[str], list[list[str]], dict]:
+    """Split ``_SELECT_COLUMNS`` rows into the parallel lists RunColumns takes."""
+    if not rows:
+        return [], [], {}
+    ids, tags, *values = zip(*rows)
+    parsed = {text: json.loads(text) for text in set(tags)}
+    return list(ids), [parsed[text] for text in tags], dict(zip(LOADED_COLUMNS, values))
+
+
+def _message_params(run_id: str, position: int, message: dict[str, str]) -> tuple:
+    return (
+        run_id,
+        position,
+        message.get("role", ""),
+        message.get("content", ""),
+        message.get("created_at", ""),
+    )
+
+
+class RunStore:
+    """Run table shared by every session in the process, persisted to SQLite.
+
+    The database runs in WAL mode so several worker processes can read while
+    one writes. Each thread gets its own connection; sqlite3 caches the
+    prepared statements per connection.
+    """
+
+    def __init__(self, path: str = RUN_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._columns: RunColumns | None = None
+        self._columns_lock = threading.Lock()
+        self._searches: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._searches_lock = threading.Lock()
+        self._migrate()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self):
+        conn = self._conn
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            return
+        if version:
+            raise RuntimeError(
+                f"{self.path} has schema version {version}, expected {SCHEMA_VERSION}"
+            )
+        with self._write_lock:
+            conn.executescript(
+                f"BEGIN IMMEDIATE; {_SCHEMA} "
+                f"PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;"
+            )
+
+    @property
+    def version(self) -> int:
+        """Counter bumped by every committed write, from any process."""
+        row = self._conn.execute("SELECT value FROM store_meta WHERE key = 'version'")
+        return row.fetchone()[0]
+
+    @property
+    def scores_version(self) -> int:
+        """Counter bumped whenever automatic scores are saved."""
+        row = self._conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'scores_version'"
+        )
+        return row.fetchone()[0]
+
+    def _totals(self) -> dict[str, int]:
+        rows = self._conn.execute(
+            f"SELECT key, value FROM store_meta "
+            f"WHERE key IN ({', '.join('?' * len(_COUNTED_COLUMNS))})",
+            _COUNTED_COLUMNS,
+        )
+        return {column: 0 for column in _COUNTED_COLUMNS} | dict(rows)
+
+    def columns(self) -> RunColumns:
+        """Columnar copy of every run, kept current with this process's writes.
+
+        Writes from this process patch the table in place. Writes from other
+        processes are caught up on the next call: runs inserted since are
+        appended and runs edited since are patched, so only the rows that
+        changed are read. The first call loads the whole table; callers on
+        an event loop should make it in a worker thread.
+        """
+        version = self.version
+        with self._columns_lock:
+            if self._columns is None:
+                self._columns = self._load_columns()
+            elif self._columns.version != version:
+                self._catch_up(self._columns)
+            return self._columns
+
+    def _catch_up(self, columns: RunColumns):
+        seqs = columns.column("seq")
+        last_seq = int(seqs[-1]) if len(seqs) else 0
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN")
+            version = self.version
+            added = conn.execute(
+                f"{_SELECT_COLUMNS} WHERE seq > ? ORDER BY seq", (last_seq,)
+            ).fetchall()
+            edited = conn.execute(
+                f"{_SELECT_COLUMNS} WHERE updated_version > ?", (columns.version,)
+            ).fetchall()
+        columns.append(*_column_batch(added))
+        for row in edited:
+            values = dict(zip(LOADED_COLUMNS, row[2:]), tags=json.loads(row[1]))
+            columns.patch(row[0], values)
+        columns.version = version
+
+    def _load_columns(self) -> RunColumns:
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN")
+            columns = RunColumns(self.version)
+            rows = conn.execute(f"{_SELECT_COLUMNS} ORDER BY seq")
+            while batch := rows.fetchmany(COLUMN_LOAD_BATCH):
+                columns.append(*_column_batch(batch))
+        return columns
+
+    def _sync_columns(self, version: int, apply):
+        with self._columns_lock:
+            columns = self._columns
+            if columns is not None and columns.version == version - 1:
+                apply(columns)
+                columns.version = version
+
+    def __len__(self) -> int:
+        return self.aggregates().count
+
+    def is_empty(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM runs LIMIT 1").fetchone() is None
+
+    def __contains__(self, run_id: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,))
+        return row.fetchone() is not None
+
+    def _rows_to_runs(self, rows: list[tuple], transcripts: bool = True) -> list[Run]:
+        values = [dict(zip(_RUN_COLUMNS, row)) for row in rows]
+        messages = self.transcripts([v["id"] for v in values]) if transcripts else {}
+        for v in values:
+            for column in _JSON_COLUMNS:
+                v[column] = json.loads(v[column])
+            v["transcript"] = messages.get(v["id"], [])
+        return [Run(**v) for v in values]
+
+    def transcripts(self, run_ids: list[str]) -> dict[str, list[dict[str, str]]]:
+        transcripts = {}
+        for start in range(0, len(run_ids), SQLITE_MAX_PARAMS):
+            chunk = run_ids[start : start + SQLITE_MAX_PARAMS]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._conn.execute(
+                "SELECT run_id, role, content, created_at FROM run_messages "
+                f"WHERE run_id IN ({placeholders}) ORDER BY run_id, position",
+                chunk,
+            )
+            for run_id, role, content, created_at in rows:
+                transcripts.setdefault(run_id, []).append(
+                    {"role": role, "content": content, "created_at": created_at}
+                )
+        return transcripts
+
+    def messages(self, run_id: str, before: int, limit: int) -> list[dict[str, str]]:
+        """Up to ``limit`` transcript messages preceding position ``before``."""
+        rows = self._conn.execute(
+            "SELECT role, content, created_at FROM run_messages "
+            "WHERE run_id = ? AND position < ? ORDER BY position DESC LIMIT ?",
+            (run_id, before, limit),
+        ).fetchall()
+        return [
+            {"role": role, "content": content, "created_at": created_at}
+            for role, content, created_at in reversed(rows)
+        ]
+
+    def get(self, run_id: str, transcripts: bool = True) -> Run | None:
+        row = self._conn.execute(f"{_SELECT_RUN} WHERE id = ?", (run_id,)).fetchone()
+        return self._rows_to_runs([row], transcripts)[0] if row else None
+
+    def get_many(self, run_ids: list[str], transcripts: bool = True) -> list[Run]:
+        if not run_ids:
+            return []
+        placeholders = ", ".join("?" for _ in run_ids)
+        rows = self._conn.execute(
+            f"{_SELECT_RUN} WHERE id IN ({placeholders})", run_ids
+        ).fetchall()
+        by_id = {run.id: run for run in self._rows_to_runs(rows, transcripts)}
+        return [by_id[run_id] for run_id in run_ids if run_id in by_id]
+
+    def add(self, run: Run) -> Run:
+        self.add_many([run])
+        return run
+
+    def add_many(self, runs, batch_size: int = INSERT_BATCH_SIZE) -> int:
+        """Insert runs in batched transactions and return how many were new."""
+        inserted = 0
+        batch = []
+        for run in runs:
+            batch.append(run)
+            if len(batch) >= batch_size:
+                inserted += len(self._insert_batch(batch))
+                batch = []
+        if batch:
+            inserted += len(self._insert_batch(batch))
+        return inserted
+
+    def _existing_ids(self, run_ids: list[str]) -> set[str]:
+        rows = self._select_in("SELECT id FROM runs WHERE id IN ({})", run_ids)
+        return {run_id for (run_id,) in rows}
+
+    def _insert_batch(self, runs: list[Run]) -> list[Run]:
+        conn = self._conn
+        with self._write_lock, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            seen = self._existing_ids([run.id for run in runs])
+            added = []
+            for run in runs:
+                if run.id not in seen:
+                    seen.add(run.id)
+                    added.append(run)
+            if not added:
+                return added
+            (last_seq,) = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM runs"
+            ).fetchone()
+            conn.executemany(_INSERT_RUN, [_run_params(run) for run in added])
+            conn.executemany(
+                _INSERT_TAG, [(tag, run.id) for run in added for tag in run.tags]
+            )
+            conn.executemany(
+                _INSERT_MESSAGE,
+                [
+                    _message_params(run.id, position, message)
+                    for run in added
+                    for position, message in enumerate(run.transcript)
+                ],
+            )
+            conn.execute(f"{_INDEX_RUNS} WHERE seq > ?", (last_seq,))
+            conn.execute(f"{_INDEX_MESSAGES} WHERE runs.seq > ?", (last_seq,))
+            self._update_aggregates(added=added)
+            # A run keeps one cached flag, for its last turn.
+            conn.execute(
+                "UPDATE runs SET cached_turns = cached, turns = MAX(1, ("
+                "SELECT COUNT(*) FROM run_messages "
+                "WHERE run_id = runs.id AND role = 'user')) WHERE seq > ?",
+                (last_seq,),
+            )
+            for column in _COUNTED_COLUMNS:
+                conn.execute(_ADD_TOTAL.format(column, "seq > ?"), (column, last_seq))
+            conn.execute(_BUMP_VERSION)
+            version = self.version
+            batch = None
+            if self._columns is not None:
+                batch = _column_batch(
+                    conn.execute(
+                        f"{_SELECT_COLUMNS} WHERE seq > ? ORDER BY seq", (last_seq,)
+                    ).fetchall()
+                )
+        if batch is not None:
+            self._sync_columns(version, lambda columns: columns.append(*batch))
+        get_run_events().publish("created", [run.id for run in added], version)
+        return added
+
+    def _update_aggregates(self, added: list[Run] = (), removed: list[Run] = ()):
+        if not added and not removed:
+            return
+        aggregates = self.aggregates()
+        for run in removed:
+            aggregates.remove(run)
+        for run in added:
+            aggregates.add(run)
+        _write_aggregates(self._conn, aggregates)
+        self._update_rollups(added, removed)
+
+    def _update_rollups(self, added: list[Run], removed: list[Run]):
+        changes = {}
+        for sign, runs in ((-1, removed), (1, added)):
+            for run in runs:
+                for granularity in GRANULARITIES:
+                    key = (granularity, bucket_for(run.timestamp, granularity))
+                    key += (run.model, run.status.lower())
+                    changes.setdefault(key, []).append((sign, run))
+        conn = self._conn
+        for key, deltas in changes.items():
+            row = conn.execute(_SELECT_ROLLUP, key).fetchone()
+            cell = RunAggregates.from_row(row) if row else RunAggregates()
+            for sign, run in deltas:
+                if sign > 0:
+                    cell.add(run)
+                else:
+                    cell.remove(run)
+            if cell.count > 0:
+                conn.execute(_UPSERT_ROLLUP, (*key, *cell.to_row()))
+            else:
+                conn.execute(_DELETE_ROLLUP, key)
+
+    def aggregates(self) -> RunAggregates:
+        row = self._conn.execute(
+            "SELECT count, duration_sum, tokens_sum, cost_sum, duration_min, "
+            "duration_max, latency_sketch FROM run_aggregates WHERE key = 'all'"
+        ).fetchone()
+        return RunAggregates.from_row(row) if row else RunAggregates()
+
+    def update(self, run_id: str, **changes) -> Run | None:
+        return self._write(run_id, changes)
+
+    def append_messages(
+        self,
+        run_id: str,
+        messages: list[dict[str, str]],
+        increments: dict[str, int | float] | None = None,
+        **changes,
+    ) -> Run | None:
+        """Append messages to a run's transcript without rewriting it.
+
+        ``increments`` adds to numeric columns (for example per-turn duration,
+        tokens and cost) and ``changes`` overwrites columns, all in the same
+        transaction as the appended messages. The returned run leaves out
+        the transcript, which would otherwise be re-read on every append.
+        """
+        return self._write(run_id, changes, increments or {}, messages)
+
+    def _write(
+        self,
+        run_id: str,
+        changes: dict,
+        increments: dict[str, int | float] | None = None,
+        appended: list[dict[str, str]] = (),
+    ) -> Run | None:
+        increments = increments or {}
+        columns = [c for c in changes if c in _RUN_COLUMNS and c != "id"]
+        if not (columns or increments or appended or "transcript" in changes):
+            return self.get(run_id)
+        assignments = [f"{c} = ?" for c in columns]
+        params = [
+            json.dumps(changes[c]) if c in _JSON_COLUMNS else changes[c]
+            for c in columns
+        ]
+        for column, amount in increments.items():
+            assignments.append(f"{column} = {column} + ?")
+            params.append(amount)
+        touched = changes.keys() | increments.keys()
+        conn = self._conn
+        with self._write_lock, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            affects_totals = not touched.isdisjoint(_RollupRow._fields)
+            old = conn.execute(_SELECT_TOTALS, (run_id,)).fetchone()
+            if old is None:
+                return None
+            counted = [c for c in _COUNTED_COLUMNS if c in touched]
+            for column in counted:
+                conn.execute(_SUBTRACT_TOTAL.format(column), (run_id, column))
+            if assignments:
+                conn.execute(
+                    f"UPDATE runs SET {', '.join(assignments)} WHERE id = ?",
+                    (*params, run_id),
+                )
+            for column in counted:
+                conn.execute(_ADD_TOTAL.format(column, "id = ?"), (column, run_id))
+            if "tags" in changes:
+                conn.execute("DELETE FROM run_tags WHERE run_id = ?", (run_id,))
+                conn.executemany(
+                    _INSERT_TAG, [(tag, run_id) for tag in changes["tags"]]
+                )
+            if "transcript" in changes:
+                conn.execute("DELETE FROM run_messages WHERE run_id = ?", (run_id,))
+                (seq,) = conn.execute(
+                    "SELECT seq FROM runs WHERE id = ?", (run_id,)
+                ).fetchone()
+                conn.execute(_UNINDEX_MESSAGES, (seq, seq))
+                appended = [*changes["transcript"], *appended]
+            if appended:
+                (start,) = conn.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM run_messages "
+                    "WHERE run_id = ?",
+                    (run_id,),
+                ).fetchone()
+                conn.executemany(
+                    _INSERT_MESSAGE,
+                    [
+                        _message_params(run_id, start + offset, message)
+                        for offset, message in enumerate(appended)
+                    ],
+                )
+                # Only the new messages are tokenized, so a turn costs the
+                # same however long the transcript already is.
+                conn.execute(_INDEX_NEW_MESSAGES, (run_id, start))
+            if not touched.isdisjoint(_SEARCHED_COLUMNS):
+                conn.execute(_UNINDEX_RUN, (run_id,))
+                conn.execute(_INDEX_RUN, (run_id,))
+            if affects_totals:
+                new = conn.execute(_SELECT_TOTALS, (run_id,)).fetchone()
+                self._update_aggregates(
+                    added=[_RollupRow(*new)], removed=[_RollupRow(*old)]
+                )
+            conn.execute(_BUMP_VERSION)
+            version = self.version
+            # Lets other processes patch their columnar copy of just this run.
+            conn.execute(
+                "UPDATE runs SET updated_version = ? WHERE id = ?", (version, run_id)
+            )
+            row = conn.execute(f"{_SELECT_COLUMNS} WHERE id = ?", (run_id,)).fetchone()
+        values = dict(zip(LOADED_COLUMNS, row[2:]), tags=json.loads(row[1]))
+        self._sync_columns(version, lambda columns: columns.patch(run_id, values))
+        fields = touched | {"transcript"} if appended else touched
+        get_run_events().publish("updated", [run_id], version, sorted(fields))
+        return self.get(run_id, transcripts=not appended)
+
+    def add_tag(self, run_id: str, tag: str) -> Run | None:
+        run = self.get(run_id, transcripts=False)
+        if run is None or tag in run.tags:
+            return None
+        return self.update(run_id, tags=[*run.tags, tag])
+
+    def remove_tag(self, run_id: str, tag: str) -> Run | None:
+        run = self.get(run_id, transcripts=False)
+        if run is None or tag not in run.tags:
+            return None
+        return self.update(run_id, tags=[t for t in run.tags if t != tag])
+
+    def _filtered(
+        self,
+        model: str | None = None,
+        status: str | None = None,
+        tag: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        before: tuple[int, int] | None = None,
+    ) -> tuple[str, list]:
+        """WHERE clause and parameters for a filtered scan of the runs table."""
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("(runs.timestamp, runs.seq) < (?, ?)")
+            params.extend(before)
+        if model is not None:
+            clauses.append("runs.model = ?")
+            params.append(model)
+        if status is not None:
+            clauses.append("runs.status = ?")
+            params.append(status)
+        if tag is not None:
+            clauses.append("runs.id IN (SELECT run_id FROM run_tags WHERE tag = ?)")
+            params.append(tag)
+        if since is not None:
+            clauses.append("runs.timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("runs.timestamp < ?")
+            params.append(until)
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def page(
+        self,
+        limit: int,
+        before: tuple[int, int] | None = None,
+        transcripts: bool = True,
+        search: str | None = None,
+        **filters,
+    ) -> tuple[list[Run], tuple[int, int] | None]:
+        """Keyset page of runs, newest first, strictly older than ``before``.
+
+        Runs are ordered by timestamp, then by insertion sequence, so
+        imported history sorts below newer runs. Cursors are
+        ``(timestamp, seq)`` pairs. Returns the runs and the cursor for the
+        following page, or ``None`` when this is the last page. A negative
+        ``limit`` returns every match.
+        """
+        matches = self._search_seqs(search)
+        if matches is None:
+            clause, params = self._filtered(before=before, **filters)
+            rows = self._conn.execute(
+                f"SELECT runs.seq, {_QUALIFIED_COLUMNS} FROM runs{clause} "
+                "ORDER BY runs.timestamp DESC, runs.seq DESC LIMIT ?",
+                (*params, limit + 1 if limit >= 0 else -1),
+            ).fetchall()
+        else:
+            # Searches are paged from the columnar table: the matches are
+            # known up front, so only the rows shown are read from SQLite.
+            columns = self.columns()
+            mask = columns.mask(seqs=matches, **filters)
+            seqs = columns.column("seq")[mask]
+            timestamps = columns.column("timestamp")[mask]
+            if before is not None:
+                older = (timestamps < before[0]) | (
+                    (timestamps == before[0]) & (seqs < before[1])
+                )
+                seqs, timestamps = seqs[older], timestamps[older]
+            seqs = seqs[np.lexsort((seqs, timestamps))[::-1]]
+            seqs = seqs[: limit + 1] if limit >= 0 else seqs
+            by_seq = {
+                row[0]: row
+                for row in self._select_in(
+                    f"SELECT seq, {_QUALIFIED_COLUMNS} FROM runs WHERE seq IN ({{}})",
+                    seqs.tolist(),
+                )
+            }
+            rows = [by_seq[seq] for seq in seqs.tolist() if seq in by_seq]
+        if limit < 0:
+            limit = len(rows)
+        runs = self._rows_to_runs([row[1:] for row in rows[:limit]], transcripts)
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = (runs[-1].timestamp, rows[limit - 1][0])
+        return runs, next_cursor
+
+    def iter_runs(
+        self, batch_size: int = INSERT_BATCH_SIZE, transcripts: bool = True, **filters
+    ):
+        """Yield every matching run, newest first, one keyset page at a time."""
+        before = None
+        while True:
+            runs, before = self.page(batch_size, before, transcripts, **filters)
+            yield from runs
+            if before is None:
+                return
+
+    def count(self, **filters) -> int:
+        if all(value is None for value in filters.values()):
+            return len(self)
+        columns = self.columns()
+        return int(self._mask(columns, **filters).sum())
+
+    def _mask(self, columns: RunColumns, search: str | None = None, **filters):
+        return columns.mask(seqs=self._search_seqs(search), **filters)
+
+    def _search_seqs(self, search: str | None) -> np.ndarray | None:
+        """Sorted seqs of the runs matching every part of ``search``.
+
+        Parts are matched separately because a run's fields and messages
+        are indexed as separate rows. Results are cached per store version.
+        """
+        terms = fts_terms(search) if search else []
+        if not terms:
+            return None
+        key = (self.version, *terms)
+        with self._searches_lock:
+            found = self._searches.get(key)
+        if found is not None:
+            return found
+        for term in terms:
+            # One concatenated string is much cheaper to fetch than a tuple
+            # per matching row. Rows come in rowid order, so a run's rows
+            # are adjacent and duplicates are dropped without sorting.
+            (text,) = self._conn.execute(
+                f"SELECT group_concat(rowid >> {SEARCH_ROWID_BITS}) FROM run_search "
+                "WHERE run_search MATCH ?",
+                (term,),
+            ).fetchone()
+            seqs = np.array(text.split(",") if text else [], np.int64)
+            if len(seqs):
+                seqs = seqs[np.append(True, seqs[1:] != seqs[:-1])]
+            found = seqs if found is None else np.intersect1d(found, seqs, True)
+        with self._searches_lock:
+            self._searches[key] = found
+            while len(self._searches) > SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        return found
+
+    def summary(self, **filters) -> dict[str, int | float]:
+        """Count, latency percentiles and token and cost totals of the matches.
+
+        Without filters the running aggregates are read instead of scanning
+        the runs; the percentiles then come from their latency sketch.
+        """
+        if all(value is None for value in filters.values()):
+            aggregates = self.aggregates()
+            if aggregates.count:
+                latency = aggregates.latency
+                return {
+                    "count": aggregates.count,
+                    "average_duration": aggregates.average_duration,
+                    "p50": latency.quantile(0.5),
+                    "p95": latency.quantile(0.95),
+                    "p99": latency.quantile(0.99),
+                    "tokens": aggregates.tokens_sum,
+                    "cost": aggregates.cost_sum,
+                    **self._totals(),
+                }
+        columns = self.columns()
+        return columns.summarize(self._mask(columns, **filters))
+
+    def rollups(
+        self,
+        granularity: str = DAY,
+        start: str | None = None,
+        end: str | None = None,
+        model: str | None = None,
+        status: str | None = None,
+    ) -> list[tuple[str, RunAggregates]]:
+        """Per-bucket aggregates between ``start`` and ``end`` inclusive.
+
+        Buckets with no runs are filled with empty aggregates, so the result
+        is a continuous series. Without ``start`` it begins at the oldest run.
+        """
+        clauses = ["granularity = ?"]
+        params = [granularity]
+        for column, value in (("bucket >=", start), ("bucket <=", end)):
+            if value is not None:
+                clauses.append(f"{column} ?")
+                params.append(value)
+        for column, value in (("model", model), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        rows = self._conn.execute(
+            "SELECT bucket, count, duration_sum, tokens_sum, cost_sum, duration_min, "
+            f"duration_max, latency_sketch FROM run_rollups WHERE {' AND '.join(clauses)}",
+            params,
+        )
+        cells = {}
+        for bucket, *row in rows:
+            cell = RunAggregates.from_row(row)
+            if bucket in cells:
+                cells[bucket].merge(cell)
+            else:
+                cells[bucket] = cell
+        if not cells:
+            return []
+        buckets = bucket_range(start or min(cells), end or max(cells), granularity)
+        return [(bucket, cells.get(bucket) or RunAggregates()) for bucket in buckets]
+
+    def series(
+        self,
+        granularity: str = DAY,
+        start: str | None = None,
+        end: str | None = None,
+        **filters,
+    ) -> list[tuple[str, dict[str, int | float]]]:
+        """Per-bucket summaries of the matches, like :meth:`rollups`.
+
+        Computed from the columnar table, for filters such as search and
+        tags that the rollup cells do not break down by.
+        """
+        columns = self.columns()
+        mask = self._mask(columns, **filters)
+        timestamps = columns.column("timestamp")[mask]
+        if not len(timestamps):
+            return []
+        buckets = bucket_range(
+            start or bucket_for(int(timestamps.min()), granularity),
+            end or bucket_for(int(timestamps.max()), granularity),
+            granularity,
+        )
+        rows = columns.series(mask, bucket_edges(buckets, granularity))
+        if not any(row["count"] for row in rows):
+            return []
+        return list(zip(buckets, rows))
+
+    def save_experiment(self, experiment: Experiment):
+        """Record an experiment's progress and announce it to dashboards."""
+        conn = self._conn
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO experiments VALUES (?, ?, ?)",
+                (experiment.id, experiment.started, experiment.json()),
+            )
+        get_run_events().publish_experiment(experiment.dict())
+
+    def experiments(self, limit: int = 10) -> list[Experiment]:
+        """The most recently started experiments, newest first."""
+        rows = self._conn.execute(
+            "SELECT progress FROM experiments ORDER BY started DESC LIMIT ?", (limit,)
+        )
+        return [Experiment.parse_raw(progress) for (progress,) in rows]
+
+    def _select_in(self, sql: str, values: list, *params) -> list[tuple]:
+        """Run ``sql`` with its ``{}`` expanded to placeholders for ``values``."""
+        rows = []
+        for start in range(0, len(values), SQLITE_MAX_PARAMS):
+            chunk = values[start : start + SQLITE_MAX_PARAMS]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows.extend(self._conn.execute(sql.format(placeholders), (*params, *chunk)))
+        return rows
+
+    def score_keys(
+        self, evaluator: str, run_ids: list[str]
+    ) -> dict[str, tuple[str, str]]:
+        """The evaluator version and output hash each run was last scored at."""
+        rows = self._select_in(
+            "SELECT run_id, version, output_hash FROM run_scores "
+            "WHERE evaluator = ? AND run_id IN ({})",
+            run_ids,
+            evaluator,
+        )
+        return {run_id: (version, output_hash) for run_id, version, output_hash in rows}
+
+    def cached_scores(
+        self, evaluator: str, version: str, output_hashes: list[str]
+    ) -> dict[str, float | None]:
+        """Scores already computed for identical outputs by the same evaluator."""
+        rows = self._select_in(
+            "SELECT output_hash, score FROM run_scores "
+            "WHERE evaluator = ? AND version = ? AND output_hash IN ({})",
+            output_hashes,
+            evaluator,
+            version,
+        )
+        return dict(rows)
+
+    def save_scores(self, rows: list[tuple[str, str, str, str, float | None]]):
+        """Store ``(run_id, evaluator, version, output_hash, score)`` rows."""
+        if not rows:
+            return
+        conn = self._conn
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO run_scores VALUES (?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(_BUMP_SCORES_VERSION)
+        get_run_events().publish("scored", sorted({row[0] for row in rows}), 0)
+
+    def score_column(self, columns: RunColumns, evaluator: str) -> np.ndarray:
+        """One evaluator's scores aligned with ``columns``, NaN where unscored."""
+        rows = self._conn.execute(
+            "SELECT runs.seq, run_scores.score FROM run_scores "
+            "JOIN runs ON runs.id = run_scores.run_id "
+            "WHERE run_scores.evaluator = ? AND run_scores.score IS NOT NULL",
+            (evaluator,),
+        ).fetchall()
+        scores = np.full(columns.size, np.nan)
+        if rows:
+            seqs, values = np.array(rows).T
+            column = columns.column("seq")
+            index = np.searchsorted(column, seqs)
+            found = index < columns.size
+            found[found] = column[index[found]] == seqs[found]
+            scores[index[found]] = values[found]
+        return scores
+
+    def evaluators(self) -> list[str]:
+        rows = self._conn.execute("SELECT DISTINCT evaluator FROM run_scores")
+        return sorted(name for (name,) in rows)
+
+    def scores(self, run_id: str) -> dict[str, float | None]:
+        rows = self._conn.execute(
+            "SELECT evaluator, score FROM run_scores WHERE run_id = ? "
+            "ORDER BY evaluator",
+            (run_id,),
+        )
+        return dict(rows)
+
+
+_run_store: RunStore | None = None
+_run_store_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    global _run_store
+    if _run_store is None:
+        with _run_store_lock:
+            if _run_store is None:
+                _run_store = RunStore()
+    return _run_store
@@ -0,0 +1,23 @@
+import re
+
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w")
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def fts_terms(text: str) -> list[str]:
+    """Translate a search box query into FTS5 MATCH expressions.
+
+    Quoted segments become phrase queries and bare words become prefix
+    queries. A run matches when every part matches somewhere in it.
+    """
+    parts = []
+    for phrase, term in _QUERY_PART.findall(text):
+        if phrase and _WORD.search(phrase):
+            parts.append(_quote(phrase))
+        elif term and _WORD.search(term):
+            parts.append(f"{_quote(term)}*")
+    return parts
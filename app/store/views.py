@@ -0,0 +1,137 @@
+import functools
+import threading
+from collections import OrderedDict
+
+from app.store.models import Run
+from app.store.run_store import RunStore, get_run_store
+
+VIEW_CACHE_SIZE = 64
+
+
+class FilteredView:
+    """One filter combination evaluated against one version of the run store.
+
+    Pages, the match count and the metric summary are computed on first use
+    and shared by every session that asks for the same filters. Paged runs
+    are summaries: their transcripts are left empty.
+    """
+
+    def __init__(self, store: RunStore, filters: dict[str, str | None]):
+        self._store = store
+        self._filters = filters
+        self._pages: dict[tuple, tuple[list[Run], tuple[int, int] | None]] = {}
+        self._count: int | None = None
+        self._summary: dict[str, int | float] | None = None
+        self._series: dict[tuple, list[dict]] = {}
+        self._lock = threading.Lock()
+
+    def page(
+        self, limit: int, before: tuple[int, int] | None = None
+    ) -> tuple[list[Run], tuple[int, int] | None]:
+        key = (limit, before)
+        with self._lock:
+            if key not in self._pages:
+                self._pages[key] = self._store.page(
+                    limit, before, transcripts=False, **self._filters
+                )
+            runs, cursor = self._pages[key]
+        return list(runs), cursor
+
+    @property
+    def total_count(self) -> int:
+        with self._lock:
+            if self._count is None:
+                self._count = self._store.count(**self._filters)
+            return self._count
+
+    def summary(self) -> dict[str, int | float]:
+        with self._lock:
+            if self._summary is None:
+                self._summary = self._store.summary(**self._filters)
+                self._count = self._summary["count"]
+            return dict(self._summary)
+
+    def time_series(
+        self, granularity: str, start: str | None, end: str | None
+    ) -> list[dict[str, str | int | float]]:
+        key = (granularity, start, end)
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = [
+                    _chart_row(bucket, **row)
+                    for bucket, row in self._store.series(
+                        granularity, start, end, **self._filters
+                    )
+                ]
+            return list(self._series[key])
+
+
+_views: OrderedDict[tuple, FilteredView] = OrderedDict()
+_views_lock = threading.Lock()
+
+
+def filtered_view(**filters: str | None) -> FilteredView:
+    store = get_run_store()
+    key = (store.version, *sorted(filters.items()))
+    with _views_lock:
+        view = _views.get(key)
+        if view is None:
+            view = _views[key] = FilteredView(store, filters)
+            if len(_views) > VIEW_CACHE_SIZE:
+                _views.popitem(last=False)
+        else:
+            _views.move_to_end(key)
+    return view
+
+
+def _chart_row(
+    bucket: str, count: int, tokens: int, cost: float, p50: float, p95: float, p99: float
+) -> dict[str, str | int | float]:
+    return {
+        "bucket": bucket[5:],
+        "runs": count,
+        "tokens": tokens,
+        "cost": round(cost, 4),
+        "p50": round(p50),
+        "p95": round(p95),
+        "p99": round(p99),
+    }
+
+
+def time_series(
+    granularity: str,
+    start: str | None,
+    end: str | None,
+    search: str | None = None,
+    model: str | None = None,
+    status: str | None = None,
+    tag: str | None = None,
+) -> list[dict[str, str | int | float]]:
+    """Chart rows for each bucket in range.
+
+    Model and status filters are read from the rollup table. The rollups
+    do not break down by search or tag, so with either of those the rows
+    are computed from the filtered view's matching runs.
+    """
+    if search or tag:
+        view = filtered_view(search=search, model=model, status=status, tag=tag)
+        return view.time_series(granularity, start, end)
+    store = get_run_store()
+    return list(_time_series(store.version, granularity, start, end, model, status))
+
+
+@functools.lru_cache(maxsize=VIEW_CACHE_SIZE)
+def _time_series(version, granularity, start, end, model, status) -> tuple:
+    rows = get_run_store().rollups(granularity, start, end, model, status)
+    return tuple(
+        _chart_row(
+            bucket,
+            cell.count,
+            cell.tokens_sum,
+            cell.cost_sum,
+            cell.latency.quantile(0.5),
+            cell.latency.quantile(0.95),
+            cell.latency.quantile(0.99),
+        )
+        for bucket, cell in rows
+    )
@@ -1,3 +1,11 @@
+import os
+
 import reflex as rx
 
-config = rx.Config(app_name="app", plugins=[rx.plugins.TailwindV3Plugin()])
+# With REDIS_URL set, sessions live in Redis and the backend can run several
+# workers that share state, run events and the SQLite run store.
+config = rx.Config(
+    app_name="app",
+    plugins=[rx.plugins.TailwindV3Plugin()],
+    redis_url=os.environ.get("REDIS_URL"),
+)
@@ -0,0 +1,42 @@
+import itertools
+
+import pytest
+
+from app.store.models import Run
+from app.store.run_store import RunStore
+
+BASE_TIMESTAMP = 1_700_000_000
+
+
+@pytest.fixture
+def store(tmp_path) -> RunStore:
+    return RunStore(str(tmp_path / "runs.db"))
+
+
+@pytest.fixture
+def make_run():
+    """Factory for runs with distinct ids and increasing timestamps."""
+    numbers = itertools.count()
+
+    def make(**fields) -> Run:
+        number = next(numbers)
+        values = {
+            "id": f"run_{number}",
+            "timestamp": BASE_TIMESTAMP + number * 60,
+            "status": "success",
+            "duration": 100 + number,
+            "tokens": 10,
+            "cost": 0.01,
+            "model": "model-a",
+            "input_text": f"question {number}",
+            "output_text": f"answer {number}",
+            "tags": [],
+            "transcript": [
+                {"role": "user", "content": f"question {number}", "created_at": ""},
+                {"role": "assistant", "content": f"answer {number}", "created_at": ""},
+            ],
+        }
+        values.update(fields)
+        return Run(**values)
+
+    return make
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.llm.admission import AdmissionController, Overloaded
+
+
+def test_limits_requests_in_flight_per_model():
+    async def scenario():
+        admission = AdmissionController(max_pending=10, max_in_flight=2)
+        running = peak = 0
+
+        async def request(model):
+            nonlocal running, peak
+            async with admission.admit(model):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(request("m") for _ in range(6)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_rejects_requests_that_wait_too_long():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0.05)
+        async with admission.admit("m"):
+            assert admission.waiting("m")
+            with pytest.raises(Overloaded) as rejected:
+                async with admission.admit("m"):
+                    pass
+        assert not admission.waiting("m")
+        return rejected.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429 and error.retry_after > 0
+
+
+def test_only_queued_requests_count_against_the_pending_limit():
+    async def scenario():
+        admission = AdmissionController(max_pending=1, max_in_flight=1)
+        release = asyncio.Event()
+
+        async def hold(model):
+            async with admission.admit(model):
+                await release.wait()
+
+        holders = [asyncio.create_task(hold(model)) for model in ("a", "b", "a")]
+        await asyncio.sleep(0.01)
+        # "a" and "b" are running; only the second "a" waits, filling the queue.
+        with pytest.raises(Overloaded, match="already queued"):
+            async with admission.admit("b"):
+                pass
+        release.set()
+        await asyncio.gather(*holders)
+        return admission._pending
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_a_new_generation_supersedes_the_last():
+    async def scenario():
+        admission = AdmissionController()
+        events = []
+
+        async def generation(name):
+            await admission.supersede("session")
+            try:
+                await asyncio.sleep(1)
+                events.append(f"{name} finished")
+            except asyncio.CancelledError:
+                events.append(f"{name} cancelled")
+                raise
+            finally:
+                admission.release("session")
+
+        first = asyncio.create_task(generation("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(generation("second"))
+        await asyncio.sleep(0.01)
+        assert admission.cancel("session")
+        await asyncio.gather(first, second, return_exceptions=True)
+        return events
+
+    assert asyncio.run(scenario()) == ["first cancelled", "second cancelled"]
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app import api
+
+
+def call(endpoint, query: bytes = b"", token: str | None = None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    request = Request(
+        {"type": "http", "method": "POST", "query_string": query, "headers": headers},
+        receive,
+    )
+    return asyncio.run(endpoint(request))
+
+
+@pytest.mark.parametrize("endpoint", [api.import_runs, api.start_experiment])
+def test_write_endpoints_need_the_admin_token(endpoint, monkeypatch):
+    assert call(endpoint, token="secret").status_code == 403
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret")
+    assert call(endpoint).status_code == 401
+    assert call(endpoint, token="wrong").status_code == 401
+
+
+@pytest.mark.parametrize("concurrency", [b"0", b"-3", b"many"])
+def test_experiments_reject_bad_concurrency(concurrency, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret")
+    query = b"models=stub-small&concurrency=" + concurrency
+    assert call(api.start_experiment, query, token="secret").status_code == 400
@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+import pytest
+
+from app.evals import compare
+from app.evals.compare import cohort_stats, compare_cohorts
+
+
+@pytest.fixture
+def cohorts(store, make_run, monkeypatch):
+    monkeypatch.setattr(compare, "get_run_store", lambda: store)
+    monkeypatch.setattr(compare, "_cohorts", OrderedDict())
+    runs = [
+        make_run(model=("model-a", "model-b")[i % 2], duration=100 + 10 * i)
+        for i in range(40)
+    ]
+    store.add_many(runs)
+    return runs
+
+
+def test_compares_means_of_two_cohorts(cohorts):
+    rows = {
+        row["metric"]: row
+        for row in compare_cohorts({"model": "model-a"}, {"model": "model-b"})
+    }
+    latency = rows["duration"]
+    assert (latency["a_count"], latency["b_count"]) == (20, 20)
+    assert latency["delta"] == pytest.approx(10)
+    assert latency["delta_low"] <= 10 <= latency["delta_high"]
+    assert rows["error"]["a_mean"] == 0
+
+
+def test_cohort_stats_survive_writes_to_other_cohorts(store, make_run, cohorts):
+    before = cohort_stats("duration", model="model-a")
+    store.add(make_run(model="model-b"))
+    store.update(cohorts[1].id, duration=5)
+    assert cohort_stats("duration", model="model-a") is before
+    store.update(cohorts[0].id, duration=5)
+    after = cohort_stats("duration", model="model-a")
+    assert after is not before and after.count == 20
+    store.update(cohorts[2].id, model="model-b")
+    assert cohort_stats("duration", model="model-a").count == 19
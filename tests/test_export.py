@@ -0,0 +1,13 @@
+import io
+
+import pytest
+
+from app.store.export import export_runs
+
+
+def test_parquet_export_has_every_run(store, make_run):
+    pq = pytest.importorskip("pyarrow.parquet")
+    store.add_many([make_run() for _ in range(3)])
+    data = b"".join(export_runs(store, "parquet", model="model-a"))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 3
@@ -0,0 +1,89 @@
+import io
+
+import pytest
+
+from app.store.export import export_runs
+from app.store.ingest import ingest
+from app.store.run_store import RunStore
+
+
+@pytest.mark.parametrize("format", ["jsonl", "csv"])
+def test_export_then_ingest_round_trips(store, make_run, tmp_path, format):
+    runs = [
+        make_run(tags=["x", "y"], feedback_comment='says "hi", twice', cached=True),
+        make_run(status="error", expected="answer"),
+        make_run(transcript=[]),
+    ]
+    store.add_many(runs)
+    data = b"".join(export_runs(store, format, transcripts=True))
+    copy = RunStore(str(tmp_path / "copy.db"))
+    report = ingest(copy, io.StringIO(data.decode(), newline=""), format)
+    assert (report.inserted, report.rejected) == (3, 0)
+    assert copy.get_many([run.id for run in runs]) == runs
+    again = ingest(copy, io.StringIO(data.decode(), newline=""), format)
+    assert (again.inserted, again.duplicates) == (0, 3)
+
+
+
+def test_ingested_sessions_count_every_turn(make_run, tmp_path):
+    turn = [{"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}]
+    source = RunStore(str(tmp_path / "source.db"))
+    source.add_many([make_run(transcript=turn * 3, cached=True), make_run()])
+    data = b"".join(export_runs(source, "jsonl", transcripts=True))
+    copy = RunStore(str(tmp_path / "copy.db"))
+    ingest(copy, io.StringIO(data.decode()), "jsonl")
+    for summary in (copy.summary(), copy.summary(model="model-a")):
+        assert (summary["turns"], summary["cached_turns"]) == (4, 1)
+
+
+def test_ingest_reports_bad_records(store):
+    lines = [
+        (
+            '{"id": "ok", "timestamp": "2024-01-01T00:00:00", "status": "success", '
+            '"duration": 1, "tokens": 1, "cost": 0, "model": "m", "input_text": "", '
+            '"output_text": "", "tags": []}\n'
+        ),
+        "not json\n",
+        '{"id": "missing-fields"}\n',
+    ]
+    report = ingest(store, lines, batch_size=1)
+    assert (report.received, report.inserted, report.rejected) == (3, 1, 2)
+    assert len(report.errors) == 2
+
+
+def test_import_flushes_when_the_client_disconnects(
+    store, make_run, tmp_path, monkeypatch
+):
+    import asyncio
+
+    from starlette.requests import ClientDisconnect, Request
+
+    from app import api
+
+    monkeypatch.setattr(api, "get_run_store", lambda: store)
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret")
+    source = RunStore(str(tmp_path / "source.db"))
+    source.add_many([make_run() for _ in range(2)])
+    body = b"".join(export_runs(source, "jsonl"))
+    messages = [
+        {"type": "http.request", "body": body, "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    request = Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "query_string": b"",
+            "headers": [(b"authorization", b"Bearer secret")],
+        },
+        receive,
+    )
+    with pytest.raises(ClientDisconnect):
+        # asyncio.run waits for the ingest thread, which must see the end.
+        asyncio.run(api.import_runs(request))
+    assert len(store) == 2
+
@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.llm.providers import (
+    OpenAICompatibleProvider,
+    ProviderConfig,
+    ProviderError,
+    SimulatedProvider,
+    Usage,
+)
+
+
+def _provider(stream) -> OpenAICompatibleProvider:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=stream())
+
+    provider = OpenAICompatibleProvider(ProviderConfig(name="test", max_retries=0))
+    provider._client = httpx.AsyncClient(
+        base_url="http://test", transport=httpx.MockTransport(handler)
+    )
+    return provider
+
+
+async def _collect(provider) -> list:
+    events = []
+    async for event in provider.stream_chat("m", [{"role": "user", "content": "hi"}]):
+        events.append(event)
+    return events
+
+
+def test_streams_deltas_then_usage():
+    async def stream():
+        yield b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        yield b'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        yield b'data: {"choices": [], "usage": {"prompt_tokens": 3, '
+        yield b'"completion_tokens": 2}}\n\ndata: [DONE]\n\n'
+
+    events = asyncio.run(_collect(_provider(stream)))
+    assert events == ["Hel", "lo", Usage(3, 2)]
+
+
+def test_errors_mid_stream_are_provider_errors():
+    async def stream():
+        yield b'data: {"choices": [{"delta": {"content": "partial"}}]}\n\n'
+        raise httpx.ReadTimeout("read timed out")
+
+    with pytest.raises(ProviderError, match="ReadTimeout"):
+        asyncio.run(_collect(_provider(stream)))
+
+
+@pytest.mark.parametrize("line", [b"data: {not json\n\n", b"data: 42\n\n"])
+def test_malformed_chunks_are_provider_errors(line):
+    async def stream():
+        yield line
+
+    with pytest.raises(ProviderError, match="malformed chunk"):
+        asyncio.run(_collect(_provider(stream)))
+
+
+def test_simulated_provider_leaves_usage_to_the_tokenizer():
+    events = asyncio.run(_collect(SimulatedProvider(ProviderConfig(name="sim"))))
+    assert events and all(isinstance(event, str) for event in events)
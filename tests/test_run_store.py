@@ -0,0 +1,301 @@
+import datetime
+
+import pytest
+
+from app.store.rollups import DAY, HOUR
+from app.store.run_store import RunStore
+
+
+def test_add_and_get_round_trip(store, make_run):
+    run = make_run(tags=["a", "b"], feedback_comment="ok")
+    store.add(run)
+    assert store.get(run.id) == run
+    assert store.get(run.id, transcripts=False).transcript == []
+    assert run.id in store
+    assert store.get("missing") is None
+
+
+def test_add_many_skips_existing_ids(store, make_run):
+    runs = [make_run() for _ in range(5)]
+    assert store.add_many(runs[:3]) == 3
+    assert store.add_many(runs, batch_size=2) == 2
+    assert len(store) == 5
+
+
+def test_pages_are_keyset_newest_first(store, make_run):
+    runs = [make_run() for _ in range(23)]
+    store.add_many(runs)
+    seen, before = [], None
+    while True:
+        page, before = store.page(5, before, transcripts=False)
+        seen.extend(run.id for run in page)
+        if before is None:
+            break
+    assert seen == [run.id for run in reversed(runs)]
+    assert [run.id for run in store.iter_runs(4)] == seen
+
+
+def test_pages_order_imported_history_by_timestamp(store, make_run):
+    recent = [make_run() for _ in range(6)]
+    store.add_many(recent)
+    history = [
+        make_run(timestamp=recent[0].timestamp - 3600, model="model-b")
+        for _ in range(6)
+    ]
+    store.add_many(history)
+    # Runs sharing a timestamp fall back to insertion order.
+    expected = [run.id for run in reversed(recent + history)]
+    expected = expected[6:] + expected[:6]
+    for search in (None, "question"):
+        assert [run.id for run in store.iter_runs(4, search=search)] == expected
+    assert [run.id for run in store.iter_runs(4, model="model-b")] == expected[6:]
+
+
+def _matches(run, model=None, status=None, tag=None, since=None, until=None):
+    return (
+        model in (None, run.model)
+        and status in (None, run.status)
+        and (tag is None or tag in run.tags)
+        and (since is None or run.timestamp >= since)
+        and (until is None or run.timestamp < until)
+    )
+
+
+def test_filters_match_a_scan(store, make_run):
+    runs = [
+        make_run(
+            model=("model-a", "model-b")[i % 2],
+            status=("success", "error", "success")[i % 3],
+            tags=["even"] if i % 2 == 0 else [],
+        )
+        for i in range(30)
+    ]
+    store.add_many(runs)
+    for filters in (
+        {"model": "model-b"},
+        {"status": "error"},
+        {"tag": "even"},
+        {"model": "model-a", "status": "error"},
+        {"since": runs[10].timestamp, "until": runs[20].timestamp},
+    ):
+        expected = [run.id for run in reversed(runs) if _matches(run, **filters)]
+        assert store.count(**filters) == len(expected), filters
+        assert [run.id for run in store.iter_runs(7, **filters)] == expected
+
+
+def test_search_covers_text_transcript_and_comments(store, make_run):
+    store.add(make_run(input_text="kubernetes rollout"))
+    store.add(
+        make_run(
+            transcript=[{"role": "user", "content": "mention of zebras"}],
+        )
+    )
+    other = store.add(make_run())
+    assert store.count(search="kubern") == 1
+    assert store.count(search="zebras") == 1
+    assert store.count(search="walrus") == 0
+    store.update(other.id, feedback_comment="walrus noted")
+    assert [run.id for run in store.page(10, search="walrus")[0]] == [other.id]
+    assert store.count(search="") == len(store)
+
+
+def test_search_finds_runs_by_partial_id(store, make_run):
+    store.add_many([make_run(id=f"run_{n}") for n in (1000, 1001, 2000)])
+    assert [run.id for run in store.page(10, search="1000")[0]] == ["run_1000"]
+    assert store.count(search="run_1000") == 1
+    assert store.count(search="100") == 2
+
+
+def test_searches_combined_with_filters(store, make_run):
+    runs = [
+        make_run(
+            input_text=("needle here" if i % 3 == 0 else "hay"),
+            model=("model-a", "model-b")[i % 2],
+            status=("success", "error")[i % 4 == 0],
+            tags=["even"] if i % 2 == 0 else [],
+        )
+        for i in range(40)
+    ]
+    store.add_many(runs)
+    needles = [run for run in runs if "needle" in run.input_text]
+    for filters in (
+        {"model": "model-a"},
+        {"status": "error"},
+        {"tag": "even"},
+        {"model": "model-b", "status": "success"},
+    ):
+        expected = [run.id for run in reversed(needles) if _matches(run, **filters)]
+        assert store.count(search="needle", **filters) == len(expected), filters
+        page, _ = store.page(100, search="needle", **filters)
+        assert [run.id for run in page] == expected
+
+
+def test_search_indexes_each_message_once(store, make_run):
+    run = store.add(make_run())
+    for turn in range(3):
+        store.append_messages(
+            run.id,
+            [
+                {"role": "user", "content": f"turn{turn} question"},
+                {"role": "assistant", "content": f"turn{turn} reply"},
+            ],
+        )
+    # One row for the run's own fields plus one per message.
+    (rows,) = store._conn.execute("SELECT COUNT(*) FROM run_search").fetchone()
+    assert rows == 1 + 2 + 6
+    assert store.count(search="turn0 turn2") == 1
+    assert store.count(search='"turn0 reply"') == 1
+    assert store.count(search='"turn0 turn2"') == 0
+    store.update(run.id, transcript=[{"role": "user", "content": "replaced"}])
+    assert store.count(search="turn1") == 0
+    assert store.count(search="replaced") == 1
+    (rows,) = store._conn.execute("SELECT COUNT(*) FROM run_search").fetchone()
+    assert rows == 2
+
+
+def test_updates_publish_the_fields_they_change(store, make_run, monkeypatch):
+    from app.store.events import RunEvents
+
+    sent = []
+    monkeypatch.setattr(RunEvents, "_send", lambda self, event: sent.append(event))
+    run = store.add(make_run())
+    store.update(run.id, rating=3)
+    store.append_messages(
+        run.id, [{"role": "user", "content": "more"}], increments={"tokens": 1}
+    )
+    assert [event["fields"] for event in sent if event["kind"] == "updated"] == [
+        ["rating"],
+        ["tokens", "transcript"],
+    ]
+
+
+def test_append_messages_extends_the_transcript(store, make_run):
+    run = store.add(make_run(duration=100, tokens=10))
+    turn = [
+        {"role": "user", "content": "follow up", "created_at": ""},
+        {"role": "assistant", "content": "second answer", "created_at": ""},
+    ]
+    updated = store.append_messages(
+        run.id, turn, increments={"duration": 50, "tokens": 5}, output_text="second"
+    )
+    assert updated.transcript == []
+    assert (updated.duration, updated.tokens) == (150, 15)
+    assert store.get(run.id).transcript == [*run.transcript, *turn]
+    assert store.messages(run.id, before=4, limit=2) == turn
+    assert store.count(search="follow") == 1
+    assert store.aggregates().duration_sum == 150
+
+
+def test_aggregates_and_rollups_follow_edits(store, make_run):
+    runs = [make_run(duration=100 * (i + 1)) for i in range(4)]
+    store.add_many(runs)
+    store.update(runs[0].id, duration=1000, status="error")
+    aggregates = store.aggregates()
+    assert aggregates.count == 4
+    assert aggregates.duration_sum == 1000 + 200 + 300 + 400
+    assert aggregates.duration_max == pytest.approx(1000, rel=0.02)
+    ((bucket, cell),) = store.rollups(DAY)
+    day = datetime.datetime.fromtimestamp(runs[0].timestamp).strftime("%Y-%m-%d")
+    assert bucket == day
+    assert cell.count == 4 and cell.duration_sum == aggregates.duration_sum
+    ((_, errors),) = store.rollups(DAY, status="error")
+    assert errors.count == 1
+
+
+
+def test_series_match_rollups_and_follow_search_and_tags(store, make_run):
+    hour = 3600
+    runs = [
+        make_run(timestamp=1_700_000_000 + i * hour, tokens=i, tags=["x"] * (i % 2))
+        for i in range(6)
+    ]
+    runs[4].input_text = "needle"
+    store.add_many(runs)
+    for bucket, cell in store.rollups(HOUR):
+        ((_, row),) = store.series(HOUR, bucket, bucket)
+        assert (row["count"], row["tokens"]) == (cell.count, cell.tokens_sum)
+    tagged = store.series(HOUR, tag="x")
+    assert [row["tokens"] for _, row in tagged] == [1, 0, 3, 0, 5]
+    assert tagged[0][0] == store.rollups(HOUR)[1][0]
+    ((_, found),) = store.series(HOUR, search="needle")
+    assert found["count"] == 1 and found["p50"] == runs[4].duration
+    assert store.series(HOUR, search="walrus") == []
+
+
+def test_unfiltered_summary_reads_the_running_totals(store, make_run):
+    runs = [make_run(duration=100 * (i + 1), cached=i % 3 == 0) for i in range(90)]
+    store.add_many(runs)
+    store.update(runs[0].id, tokens=20)
+    store.append_messages(runs[1].id, [], increments={"turns": 1, "cached_turns": 1})
+    summary = store.summary()
+    scanned = store.columns().summarize(store.columns().mask())
+    assert summary["count"] == scanned["count"] == 90
+    assert summary["turns"] == scanned["turns"] == 91
+    assert summary["cached_turns"] == scanned["cached_turns"] == 31
+    assert summary["tokens"] == scanned["tokens"] == 910
+    assert summary["average_duration"] == scanned["average_duration"]
+    assert summary["p95"] == pytest.approx(scanned["p95"], rel=0.02)
+
+
+def test_hit_rate_counts_every_chat_turn(store, make_run):
+    run = store.add(make_run(cached=True))
+    turn = [{"role": "user", "content": "again"}]
+    for cached in (False, False, True):
+        store.append_messages(
+            run.id,
+            turn,
+            increments={"turns": 1, "cached_turns": int(cached)},
+            cached=cached,
+        )
+    summary = store.summary()
+    assert (summary["turns"], summary["cached_turns"]) == (4, 2)
+    assert store.summary(model="model-a")["cached_turns"] == 2
+
+
+def test_tags_are_added_and_removed(store, make_run):
+    run = store.add(make_run(tags=["one"]))
+    assert store.add_tag(run.id, "two").tags == ["one", "two"]
+    assert store.add_tag(run.id, "two") is None
+    assert store.remove_tag(run.id, "one").tags == ["two"]
+    assert store.count(tag="one") == 0
+    assert store.count(tag="two") == 1
+
+
+def test_columns_are_patched_by_local_writes(store, make_run):
+    store.add_many([make_run() for _ in range(3)])
+    columns = store.columns()
+    run = store.add(make_run(tokens=99))
+    store.update(run.id, status="error")
+    assert store.columns() is columns
+    assert columns.version == store.version
+    assert store.summary(status="error")["tokens"] == 99
+    assert store.summary()["count"] == 4
+
+
+def test_columns_see_writes_from_other_processes(store, make_run, tmp_path):
+    first = store.add(make_run())
+    columns = store.columns()
+    other = RunStore(store.path)
+    other.add(make_run(model="model-b"))
+    assert store.summary(model="model-b")["count"] == 1
+    assert store.count(model="model-b") == 1
+    other.update(first.id, status="error", tags=["flaky"])
+    other.add(make_run(status="error"))
+    assert store.count(status="error") == 2
+    assert store.count(tag="flaky") == 1
+    # Caught up in place rather than reloaded.
+    assert store.columns() is columns
+    assert columns.version == store.version
+
+
+def test_experiments_are_listed_newest_first(store):
+    from app.store.models import Experiment
+
+    store.save_experiment(Experiment(id="old", started=1))
+    store.save_experiment(Experiment(id="new", started=2))
+    store.save_experiment(Experiment(id="old", started=1, completed=3))
+    assert [(e.id, e.completed) for e in store.experiments()] == [
+        ("new", 0),
+        ("old", 3),
+    ]
+
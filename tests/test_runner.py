@@ -0,0 +1,29 @@
+import asyncio
+
+from app.evals import runner
+from app.evals.runner import BatchRunner, DatasetItem
+from app.llm.providers import ProviderConfig, SimulatedProvider
+
+
+class BrokenProvider(SimulatedProvider):
+    async def stream_chat(self, model, messages, **params):
+        raise RuntimeError("provider bug")
+        yield ""
+
+
+def test_unexpected_provider_errors_are_recorded_as_error_runs(store, monkeypatch):
+    provider = BrokenProvider(ProviderConfig(name="broken"))
+    monkeypatch.setattr(runner, "get_provider", lambda model: provider)
+    dataset = [
+        DatasetItem(id=str(i), messages=[{"role": "user", "content": f"q{i}"}])
+        for i in range(10)
+    ]
+    batch = BatchRunner(dataset, ["m"], concurrency=1, store=store)
+    experiment = asyncio.run(asyncio.wait_for(batch.run(), 10))
+    assert experiment.status == "finished"
+    assert (experiment.completed, experiment.failed) == (10, 10)
+    assert store.count(status="error") == 10
+    run = store.get(f"{experiment.id}-0-m")
+    assert run.output_text == "[Error: RuntimeError('provider bug')]"
+    (saved,) = store.experiments()
+    assert saved.status == "finished" and saved.completed == 10
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.evals import evaluators
+from app.evals.evaluators import EmbeddingSimilarity, ExactMatch, JsonValid, LLMJudge
+from app.evals.scoring import ScoringEngine, ScoringReport
+
+
+def test_scores_are_computed_once_and_reused(store, make_run):
+    first = make_run(output_text="Paris", expected="paris")
+    runs = [
+        first,
+        make_run(output_text="Lyon", expected="paris"),
+        make_run(output_text="Paris", expected="paris", input_text=first.input_text),
+        make_run(output_text='{"a": 1}'),
+    ]
+    store.add_many(runs)
+    engine = ScoringEngine([ExactMatch(), JsonValid()], store, processes=1)
+    try:
+        report = asyncio.run(engine.score_all())
+        assert store.scores(runs[0].id) == {"exact": 1.0, "json": 0.0}
+        assert store.scores(runs[1].id)["exact"] == 0.0
+        assert store.scores(runs[3].id) == {"exact": None, "json": 1.0}
+        assert (report.computed, report.reused) == (6, 2)
+        again = ScoringEngine([ExactMatch()], store, processes=1)
+        assert asyncio.run(again.score_all()).unchanged == 4
+        store.update(runs[1].id, input_text=first.input_text, output_text="Paris")
+        asyncio.run(again.score_runs([store.get(runs[1].id)]))
+        assert store.scores(runs[1].id)["exact"] == 1.0
+        assert again.report.reused == 1
+    finally:
+        engine.close()
+    assert store.evaluators() == ["exact", "json"]
+
+
+def test_model_backed_scores_are_keyed_by_model(store, make_run, monkeypatch):
+    from app.llm import providers
+
+    monkeypatch.setattr(providers, "available_models", lambda: ["model-b"])
+    assert LLMJudge().cache_version == "1:model-b"
+    assert LLMJudge("model-a").cache_version == "1:model-a"
+
+    store.add_many([make_run(output_text="Paris", expected="paris")])
+    engine = ScoringEngine([EmbeddingSimilarity()], store, processes=1)
+    try:
+        assert asyncio.run(engine.score_all()).computed == 1
+        monkeypatch.setattr(evaluators, "embedding_backend", lambda: "other-model")
+        engine.report = ScoringReport()
+        report = asyncio.run(engine.score_all())
+        assert (report.computed, report.unchanged) == (1, 0)
+    finally:
+        engine.close()